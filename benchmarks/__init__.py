@@ -0,0 +1,3 @@
+"""
+Benchmarks and load-test tooling (run from the project root, see README)
+"""
@@ -0,0 +1,266 @@
+"""
+Benchmark harness for the feature and prediction pipelines
+Runs fetch_latest_features against the recorded fixtures (see
+market_fixtures.py), the day/week/month predictors and the plot endpoints
+through the Flask test client. Reports throughput, p50/p99 latency and
+peak traced memory for each, and compares them with a saved baseline:
+any regression beyond the tolerance makes the run exit with status 1.
+
+    python -m benchmarks.bench                      # run and compare with benchmarks/baseline.json
+    python -m benchmarks.bench --save-baseline      # record this machine's baseline
+    python -m benchmarks.bench --only predict_month_range --iterations 50
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Settings for a reproducible, offline app: in-memory market cache, no
+# price store, quiet request logs and a private cache directory
+BENCH_ENV = {
+    'GOLDSENSE_MARKET_CACHE': 'memory',
+    'GOLDSENSE_PRICE_STORE': 'off',
+    'GOLDSENSE_REQUEST_LOG': 'off',
+    'GOLDSENSE_MODEL_WATCH_INTERVAL': '3600',
+    'GOLDSENSE_SNAPSHOT_INTERVAL': '3600',
+    'GOLDSENSE_CACHE_DIR': os.path.join(tempfile.gettempdir(), 'goldsense_bench'),
+}
+
+# Iterations used to trace peak memory (tracing slows calls down, so it is a separate pass)
+MEMORY_ITERATIONS = 3
+
+
+class Benchmark:
+    """A named operation timed `iterations` times after `warmup` untimed calls"""
+
+    def __init__(self, name, run, iterations, warmup=2, setup=None):
+        self.name = name
+        self.run = run
+        self.iterations = iterations
+        self.warmup = warmup
+        self.setup = setup  # Called before every call, outside the timing
+
+    def _call(self):
+        if self.setup is not None:
+            self.setup()
+        # The app logs with print(); keep it out of the report (writing to a buffer is cheap)
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            self.run()
+            return time.perf_counter() - started
+
+    def measure(self, iterations=None):
+        iterations = iterations or self.iterations
+        for _ in range(self.warmup):
+            self._call()
+        timings = np.array([self._call() for _ in range(iterations)])
+
+        tracemalloc.start()
+        try:
+            for _ in range(min(iterations, MEMORY_ITERATIONS)):
+                tracemalloc.reset_peak()
+                self._call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'iterations': iterations,
+            'throughput': iterations / timings.sum(),
+            'p50_ms': float(np.percentile(timings, 50) * 1000),
+            'p99_ms': float(np.percentile(timings, 99) * 1000),
+            'peak_kib': peak / 1024,
+        }
+
+
+def median_result(runs):
+    """Per-metric median of several measure() results (one noisy pass doesn't set the bar)"""
+    return {key: float(np.median([run[key] for run in runs])) if key != 'iterations' else runs[0][key]
+            for key in runs[0]}
+
+
+def check_consistency(webapp, client):
+    """/api/predict and /api/predict/batch must give the same price for the same features"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        day = client.post('/api/predict', json={'type': 'day'}).get_json()
+        features = dict(webapp.feature_refresher.current().features)
+        batch = client.post('/api/predict/batch', json={'features': [features]}).get_json()
+    single = day['prediction']['next_day']
+    batched = batch['predictions'][0]['next_day']
+    if not np.isclose(single, batched, rtol=1e-9):
+        raise SystemExit(f"❌ /api/predict ({single}) and /api/predict/batch ({batched}) disagree")
+
+
+def build_benchmarks():
+    """Benchmarks over the real app module, with yfinance replaced by the fixtures"""
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+
+    from benchmarks.market_fixtures import install
+    install()
+    # The scaler warns on every unnamed feature matrix; that's not what we measure
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from webapp import app as webapp
+        # Like the gunicorn master: plots warm up inline, not behind the timed calls
+        webapp.load_models(preloaded=True)
+        features = webapp.fetch_latest_features()
+    if features is None:
+        raise SystemExit("❌ Could not build features from the fixtures")
+    bundle = webapp.model_registry.current
+    client = webapp.app.test_client()
+    check_consistency(webapp, client)
+
+    def get(path):
+        def run():
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} answered {response.status_code}')
+            response.get_data()
+        return run
+
+    return [
+        Benchmark('fetch_latest_features', webapp.fetch_latest_features, 20,
+                  setup=webapp.market_cache.clear),
+        Benchmark('predict_next_day', lambda: webapp.predict_next_day(dict(features), bundle), 200),
+        Benchmark('predict_week_range', lambda: webapp.predict_week_range(dict(features), bundle), 50),
+        Benchmark('predict_month_range', lambda: webapp.predict_month_range(dict(features), bundle), 20),
+        Benchmark('predict_month_intervals',
+                  lambda: webapp.predict_month_range(dict(features), bundle, webapp.FORECAST_PATHS), 10),
+        Benchmark('plot_comparison_json', get('/api/plot/comparison'), 100),
+        Benchmark('plot_metrics_table_png', get('/api/plot/image/metrics_table.png'), 100),
+        # What a cache miss costs: the render itself, in the render pool
+        Benchmark('plot_comparison_render',
+                  lambda: webapp.plot_cache.render_pool.render('comparison', bundle.metadata['metrics'], 'png'), 10),
+        Benchmark('available_plots', get('/api/available_plots'), 200),
+    ]
+
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'system': platform.system(), 'cpus': os.cpu_count()}
+
+
+def compare(results, baseline, tolerance, memory_tolerance, min_delta_ms=1.0, min_delta_kib=64.0):
+    """
+    Regression messages for results that are worse than the baseline.
+    A metric regresses when it is past the relative tolerance and also worse
+    by at least min_delta_ms (latency; throughput as time per operation) or
+    min_delta_kib (memory) - on sub-millisecond timings 30% is just noise.
+    """
+    def slower(value, base, slack):
+        return value > base * (1 + slack) and value - base >= min_delta_ms
+
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        checks = [
+            ('p50_ms', slower(result['p50_ms'], base['p50_ms'], tolerance)),
+            # Tail latency and mean throughput move with outliers, so they get twice the slack
+            ('p99_ms', slower(result['p99_ms'], base['p99_ms'], 2 * tolerance)),
+            ('throughput', result['throughput'] > 0 and base['throughput'] > 0 and
+             slower(1000 / result['throughput'], 1000 / base['throughput'], 2 * tolerance)),
+            ('peak_kib', result['peak_kib'] > base['peak_kib'] * (1 + memory_tolerance) and
+             result['peak_kib'] - base['peak_kib'] >= min_delta_kib),
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append(f"{name}.{metric}: {result[metric]:.2f} vs baseline {base[metric]:.2f}")
+    return regressions
+
+
+def print_table(results, baseline):
+    base_results = baseline.get('results', {}) if baseline else {}
+    print(f"{'benchmark':<26}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>11}{'p50 vs base':>13}")
+    for name, r in results.items():
+        base = base_results.get(name)
+        delta = f"{(r['p50_ms'] / base['p50_ms'] - 1) * 100:+.1f}%" if base and base['p50_ms'] else '-'
+        print(f"{name:<26}{r['throughput']:>10.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['peak_kib']:>11.0f}{delta:>13}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GoldSense pipeline benchmarks')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    parser.add_argument('--only', nargs='+', help='Run only these benchmarks')
+    parser.add_argument('--iterations', type=int, help='Iterations for every benchmark')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='Measure every benchmark this many times and keep the median '
+                             '(use the same value for the baseline and the comparison)')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='Allowed slowdown before failing (0.3 = 30%%; p99 and throughput get twice this)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.2, help='Allowed peak memory growth')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Latency differences smaller than this never count as regressions')
+    parser.add_argument('--min-delta-kib', type=float, default=64.0,
+                        help='Peak memory differences smaller than this never count as regressions')
+    args = parser.parse_args(argv)
+
+    benchmarks = build_benchmarks()
+    if args.only:
+        unknown = set(args.only) - {b.name for b in benchmarks}
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        benchmarks = [b for b in benchmarks if b.name in args.only]
+
+    results = {}
+    for benchmark in benchmarks:
+        print(f"⏱️  {benchmark.name}...", file=sys.stderr)
+        results[benchmark.name] = median_result([benchmark.measure(args.iterations)
+                                                 for _ in range(max(args.runs, 1))])
+
+    report = {'environment': environment(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        # Nothing to compare with means nothing was checked - don't let CI pass on it
+        print(f"❌ No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 1
+    if baseline.get('environment') != report['environment']:
+        print(f"⚠️  Baseline was recorded on {baseline.get('environment')}, "
+              f"this run is {report['environment']}")
+
+    regressions = compare(results, baseline, args.tolerance, args.memory_tolerance,
+                          args.min_delta_ms, args.min_delta_kib)
+    if regressions:
+        print(f"❌ {len(regressions)} PERFORMANCE REGRESSION(S) against {args.baseline}:")
+        for message in regressions:
+            print(f"   {message}")
+        return 1
+    print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Load generator for the gunicorn app
+Closed-loop clients post a mix of /api/predict requests for a fixed time
+and report throughput, p50/p99 latency and the status breakdown. Two
+scenarios run against gunicorn (wsgi:app) fed by the stand-in market data
+server from upstream_server.py:
+
+  ceiling        doubles the number of clients until throughput stops
+                 growing or errors appear, and reports the ceiling
+  slow-upstream  steady load while the upstream goes from healthy to
+                 slower than the per-ticker fetch timeout and back, to show
+                 how request latency and data staleness behave
+
+    python -m benchmarks.loadgen ceiling --spawn
+    python -m benchmarks.loadgen slow-upstream --spawn --slow-latency 15
+    python -m benchmarks.loadgen ceiling --target http://10.0.0.5:8080 --upstream http://10.0.0.6:8765
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import requests
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Request mix: (weight, path, JSON body)
+REQUEST_MIX = [
+    (6, '/api/predict', {'type': 'day'}),
+    (3, '/api/predict', {'type': 'week'}),
+    (1, '/api/predict', {'type': 'month'}),
+]
+
+# App settings for spawned servers: market data from the stand-in, refreshed
+# often enough that upstream faults show up during a short scenario
+SPAWN_ENV = {
+    'GOLDSENSE_MARKET_CACHE': 'memory',
+    'GOLDSENSE_MARKET_CACHE_TTL': '5',
+    'GOLDSENSE_SNAPSHOT_INTERVAL': '5',
+    'GOLDSENSE_PRICE_STORE': 'off',
+    'GOLDSENSE_REQUEST_LOG': 'off',
+}
+
+
+def run_load(target, clients, duration, timeout=30.0, mix=REQUEST_MIX, seed=0):
+    """
+    `clients` threads sending requests back to back for `duration` seconds.
+    Returns throughput, latency percentiles, status counts and the share
+    of responses flagged stale.
+    """
+    weights = [weight for weight, _, _ in mix]
+    deadline = time.time() + duration
+    lock = threading.Lock()
+    latencies, statuses, stale = [], Counter(), Counter()
+
+    def client(index):
+        session = requests.Session()
+        rng = random.Random(seed + index)
+        while time.time() < deadline:
+            _, path, body = rng.choices(mix, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = session.post(target + path, json=body, timeout=timeout)
+                status = response.status_code
+                payload = response.json() if status == 200 else {}
+            except requests.Timeout:
+                status, payload = 'timeout', {}
+            except (requests.RequestException, ValueError):
+                status, payload = 'error', {}
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+                if 'stale' in payload:
+                    stale[bool(payload['stale'])] += 1
+
+    started = time.time()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    timings = np.array(latencies) if latencies else np.zeros(1)
+    total = sum(statuses.values())
+    ok = statuses.get(200, 0)
+    return {
+        'clients': clients,
+        'requests': total,
+        'throughput': ok / elapsed,
+        'p50_ms': float(np.percentile(timings, 50) * 1000),
+        'p99_ms': float(np.percentile(timings, 99) * 1000),
+        'max_ms': float(timings.max() * 1000),
+        'error_rate': (total - ok) / total if total else 0.0,
+        'stale_rate': stale[True] / sum(stale.values()) if stale else 0.0,
+        'statuses': {str(status): count for status, count in statuses.items()},
+    }
+
+
+def print_result(label, r):
+    print(f"{label:<16}{r['clients']:>8}{r['throughput']:>10.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+          f"{r['max_ms']:>10.0f}{r['error_rate']:>9.1%}{r['stale_rate']:>8.1%}  {r['statuses']}")
+
+
+def print_header():
+    print(f"{'phase':<16}{'clients':>8}{'ok/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'max ms':>10}{'errors':>9}{'stale':>8}  statuses")
+
+
+def ceiling(target, args):
+    """
+    Double the clients until two steps in a row gain less than --min-gain
+    throughput (one flat step can be noise) or errors exceed --max-errors
+    """
+    print_header()
+    results, best, flat = [], None, 0
+    clients = args.start_clients
+    while clients <= args.max_clients:
+        result = run_load(target, clients, args.duration, args.timeout)
+        results.append(result)
+        print_result('ramp', result)
+        if result['error_rate'] > args.max_errors:
+            print(f"⚠️  Error rate {result['error_rate']:.1%} at {clients} clients")
+            break
+        if best is not None and result['throughput'] < best['throughput'] * (1 + args.min_gain):
+            flat += 1
+        else:
+            flat = 0
+        if best is None or result['throughput'] > best['throughput']:
+            best = result
+        if flat >= 2:
+            break
+        clients *= 2
+    if best is not None:
+        print(f"✅ Throughput ceiling: {best['throughput']:.1f} req/s at {best['clients']} clients "
+              f"(p99 {best['p99_ms']:.0f} ms)")
+    return {'scenario': 'ceiling', 'results': results, 'ceiling': best}
+
+
+def slow_upstream(target, args):
+    """Healthy -> slow (or failing) upstream -> healthy, under steady load"""
+    if not args.upstream:
+        raise SystemExit("❌ slow-upstream needs --upstream (or --spawn) to control the stand-in server")
+    control = args.upstream.rstrip('/') + '/control'
+    phases = [
+        ('healthy', {'latency': 0, 'error_rate': 0}),
+        ('slow upstream', {'latency': args.slow_latency, 'error_rate': args.slow_error_rate}),
+        ('recovered', {'latency': 0, 'error_rate': 0}),
+    ]
+    print_header()
+    results = []
+    for label, settings in phases:
+        requests.post(control, json=settings, timeout=5).raise_for_status()
+        result = run_load(target, args.clients, args.duration, args.timeout)
+        result['phase'] = label
+        result['upstream'] = requests.get(control, timeout=5).json()
+        results.append(result)
+        print_result(label, result)
+    return {'scenario': 'slow-upstream', 'results': results}
+
+
+def wait_until_up(url, timeout=120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code < 500:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def spawn(args):
+    """Start the stand-in upstream in this process and gunicorn (wsgi:app) as a child"""
+    from benchmarks.upstream_server import UpstreamServer
+    upstream = UpstreamServer(('127.0.0.1', args.upstream_port)).start()
+    env = dict(os.environ, **SPAWN_ENV, GOLDSENSE_MARKET_DATA_URL=upstream.url)
+    bind = f'127.0.0.1:{args.port}'
+    command = [sys.executable, '-m', 'gunicorn', '--bind', bind, '--workers', str(args.workers),
+               '--timeout', '120', 'wsgi:app']
+    log = open(args.server_log, 'w')
+    server = subprocess.Popen(command, cwd=PROJECT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    target = f'http://{bind}'
+    print(f"🚀 gunicorn {bind} ({args.workers} workers), upstream {upstream.url}, log {args.server_log}")
+    if not wait_until_up(target + '/health'):
+        server.terminate()
+        raise SystemExit(f"❌ gunicorn did not come up, see {args.server_log}")
+    # The first predict builds each worker's snapshot; don't count that as load
+    for _ in range(args.workers * 2):
+        requests.post(target + '/api/predict', json={'type': 'day'}, timeout=60)
+    return target, upstream, server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GoldSense load generator')
+    parser.add_argument('scenario', choices=['ceiling', 'slow-upstream'])
+    parser.add_argument('--target', default='http://127.0.0.1:8080', help='App base URL')
+    parser.add_argument('--upstream', help='Stand-in market data server base URL')
+    parser.add_argument('--spawn', action='store_true', help='Start gunicorn and the stand-in upstream here')
+    parser.add_argument('--port', type=int, default=8080, help='Port for the spawned gunicorn')
+    parser.add_argument('--upstream-port', type=int, default=8765, help='Port for the spawned upstream')
+    parser.add_argument('--workers', type=int, default=2, help='Workers for the spawned gunicorn')
+    parser.add_argument('--server-log', default='loadtest_server.log', help='Output of the spawned gunicorn')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per step or phase')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Client timeout per request')
+    parser.add_argument('--clients', type=int, default=16, help='Clients for slow-upstream')
+    parser.add_argument('--start-clients', type=int, default=1)
+    parser.add_argument('--max-clients', type=int, default=256)
+    parser.add_argument('--min-gain', type=float, default=0.05, help='Stop ramping below this throughput gain')
+    parser.add_argument('--max-errors', type=float, default=0.01, help='Stop ramping above this error rate')
+    parser.add_argument('--slow-latency', type=float, default=15.0, help='Upstream latency in the slow phase')
+    parser.add_argument('--slow-error-rate', type=float, default=0.0, help='Upstream error rate in the slow phase')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    server = None
+    target = args.target
+    if args.spawn:
+        target, upstream, server = spawn(args)
+        args.upstream = upstream.url
+    try:
+        report = (ceiling if args.scenario == 'ceiling' else slow_upstream)(target, args)
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Recorded market data fixtures and a local yfinance stand-in
+Each ticker the feature vector needs has a CSV of daily OHLCV bars in
+benchmarks/fixtures. FixtureMarket.download() has yf.download's signature
+and replays those bars re-dated to end at the requested end date, so
+benchmarks and load tests never call Yahoo Finance and always see the same
+prices. Latency and errors can be injected to simulate a slow upstream.
+
+    python -m benchmarks.market_fixtures record     # re-record from Yahoo Finance
+    python -m benchmarks.market_fixtures generate   # seeded synthetic bars (offline)
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Every ticker fetched by webapp/fetch_engine.py
+TICKERS = ['GC=F', 'GLD', 'SI=F', 'CL=F', 'DX-Y.NYB']
+
+# Bars per fixture (about a year of trading days)
+FIXTURE_DAYS = 260
+
+# Starting level and daily volatility for generated fixtures
+SYNTHETIC_PARAMS = {
+    'GC=F': (2650.0, 0.009),
+    'GLD': (243.0, 0.009),
+    'SI=F': (31.0, 0.012),
+    'CL=F': (72.0, 0.015),
+    'DX-Y.NYB': (104.0, 0.004),
+}
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class UpstreamError(RuntimeError):
+    """Injected upstream failure"""
+
+
+def fixture_path(ticker):
+    return os.path.join(FIXTURE_DIR, f'{ticker}.csv')
+
+
+def load_fixture(ticker):
+    """Recorded bars for ticker (DataFrame indexed by date), None if not recorded"""
+    path = fixture_path(ticker)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, index_col='Date', parse_dates=True)[COLUMNS]
+
+
+def replay(bars, start=None, end=None):
+    """
+    bars re-dated onto the business days before end (exclusive, like
+    yfinance) and cut at start, so fixtures always look current.
+    """
+    end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    dates = pd.bdate_range(end=end - pd.Timedelta(days=1), periods=len(bars))
+    frame = bars.set_axis(pd.DatetimeIndex(dates, name='Date'))
+    if start is not None:
+        frame = frame.loc[pd.Timestamp(start).normalize():]
+    return frame
+
+
+class FixtureMarket:
+    """yf.download replacement serving recorded bars with optional latency and errors"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, failing=(), seed=0):
+        self.latency = latency        # Seconds added to every call
+        self.jitter = jitter          # Extra uniform random delay, 0..jitter seconds
+        self.error_rate = error_rate  # Probability a call fails
+        self.failing = set(failing)   # Tickers that always fail
+        self.fixtures = {ticker: load_fixture(ticker) for ticker in TICKERS}
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def simulate_faults(self):
+        """Sleep for the configured latency, then maybe raise UpstreamError"""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise UpstreamError('Injected upstream error')
+
+    def history(self, ticker, start=None, end=None):
+        """Bars for one ticker, or None when it isn't recorded or is set to fail"""
+        bars = self.fixtures.get(ticker)
+        if bars is None or ticker in self.failing:
+            return None
+        return replay(bars, start, end)
+
+    def download(self, tickers, start=None, end=None, progress=False, auto_adjust=True,
+                 timeout=None, **kwargs):
+        """Same call and result shape as yf.download: (Price, Ticker) columns"""
+        self.simulate_faults()
+        names = tickers.split() if isinstance(tickers, str) else list(tickers)
+        frames = {}
+        for ticker in names:
+            data = self.history(ticker, start, end)
+            if data is not None:
+                frames[ticker] = data
+        if not frames:
+            # yfinance reports failed tickers and returns an empty frame
+            return pd.DataFrame()
+        data = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+        data.columns.names = ['Price', 'Ticker']
+        return data
+
+
+def install(market=None):
+    """Route yfinance.download to a FixtureMarket (returns the market)"""
+    import yfinance
+    market = market or FixtureMarket()
+    yfinance.download = market.download
+    return market
+
+
+def generate(days=FIXTURE_DAYS, seed=42):
+    """Write seeded geometric random walk fixtures (for machines without network)"""
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-06-30', periods=days, name='Date')
+    gold_returns = rng.normal(0.0002, SYNTHETIC_PARAMS['GC=F'][1], days)
+    for ticker in TICKERS:
+        level, vol = SYNTHETIC_PARAMS[ticker]
+        if ticker in ('GC=F', 'GLD'):
+            # The ETF tracks the futures, with a little tracking error
+            returns = gold_returns + (rng.normal(0, 0.001, days) if ticker == 'GLD' else 0)
+        else:
+            returns = rng.normal(0.0002, vol, days)
+        close = level * np.exp(np.cumsum(returns))
+        open_ = close * np.exp(rng.normal(0, vol / 3, days))
+        spread = np.abs(rng.normal(0, vol / 2, days))
+        frame = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + spread),
+            'Low': np.minimum(open_, close) * (1 - spread),
+            'Close': close,
+            'Volume': rng.integers(20_000, 250_000, days),
+        }, index=dates)
+        frame.round(4).to_csv(fixture_path(ticker))
+        print(f"✅ {ticker}: {days} synthetic bars")
+
+
+def record(days=FIXTURE_DAYS):
+    """Download the last `days` bars of every ticker from Yahoo Finance"""
+    import yfinance as yf
+    from webapp.fetch_engine import normalize_frame
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for ticker in TICKERS:
+        data = normalize_frame(yf.download(ticker, period='2y', progress=False, auto_adjust=True), ticker)
+        if data is None:
+            print(f"❌ {ticker}: no data")
+            continue
+        data = data[COLUMNS].tail(days)
+        data.index.name = 'Date'
+        data.round(4).to_csv(fixture_path(ticker))
+        print(f"✅ {ticker}: {len(data)} bars recorded")
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command == 'record':
+        record()
+    elif command == 'generate':
+        generate()
+    else:
+        print("Usage: python -m benchmarks.market_fixtures record|generate")
+        sys.exit(2)
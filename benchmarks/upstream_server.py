@@ -0,0 +1,168 @@
+"""
+Stand-in market data server
+Serves the recorded fixtures (see market_fixtures.py) over HTTP in the
+format webapp.fetch_engine.http_download reads, with injectable latency
+and errors, so the app can be load-tested without calling Yahoo Finance:
+
+    python -m benchmarks.upstream_server --port 8765 --latency 0.2 --error-rate 0.05
+    GOLDSENSE_MARKET_DATA_URL=http://127.0.0.1:8765 gunicorn wsgi:app
+
+GET  /download?tickers=GC=F+GLD&start=YYYY-MM-DD&end=YYYY-MM-DD  CSV bars
+GET  /control   current fault settings and call counters (JSON)
+POST /control   change them while running, e.g. {"latency": 15, "error_rate": 0}
+"""
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from benchmarks.market_fixtures import FixtureMarket, UpstreamError
+
+# Fault settings that POST /control may change
+CONTROLS = ('latency', 'jitter', 'error_rate', 'error_status', 'failing')
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    """Routes for the stand-in server (the FixtureMarket is on self.server.market)"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload), 'application/json')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/download':
+            self._download(parse_qs(url.query))
+        elif url.path == '/control':
+            self._send_json(200, self.server.settings())
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/control':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            self.server.configure(**json.loads(self.rfile.read(length) or b'{}'))
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(200, self.server.settings())
+
+    def _download(self, query):
+        market = self.server.market
+        tickers = ' '.join(query.get('tickers', [])).split()
+        start = query.get('start', [None])[0]
+        end = query.get('end', [None])[0]
+        try:
+            market.simulate_faults()
+        except UpstreamError as e:
+            self.server.stats['errors'] += 1
+            self._send_json(self.server.error_status, {'error': str(e)})
+            return
+
+        frames = []
+        for ticker in tickers:
+            data = market.history(ticker, start, end)
+            if data is not None:
+                frames.append(data.assign(Ticker=ticker).reset_index())
+        if not frames:
+            self.server.stats['empty'] += 1
+            self._send(200, 'Date,Ticker,Open,High,Low,Close,Volume\n', 'text/csv')
+            return
+        rows = pd.concat(frames)[['Date', 'Ticker', 'Open', 'High', 'Low', 'Close', 'Volume']]
+        self.server.stats['served'] += 1
+        self._send(200, rows.to_csv(index=False, date_format='%Y-%m-%d'), 'text/csv')
+
+
+class UpstreamServer(ThreadingHTTPServer):
+    """HTTP server around a FixtureMarket whose faults can be changed at runtime"""
+
+    daemon_threads = True
+
+    def __init__(self, address, market=None, error_status=500, verbose=False):
+        super().__init__(address, UpstreamHandler)
+        self.market = market or FixtureMarket()
+        self.error_status = error_status
+        self.verbose = verbose
+        self.stats = {'served': 0, 'errors': 0, 'empty': 0}
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients that time out close the connection before a slow answer is written
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def configure(self, **settings):
+        unknown = set(settings) - set(CONTROLS)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        with self._lock:
+            for name, value in settings.items():
+                if name == 'failing':
+                    self.market.failing = set(value.split() if isinstance(value, str) else value)
+                elif name == 'error_status':
+                    self.error_status = int(value)
+                else:
+                    setattr(self.market, name, float(value))
+
+    def settings(self):
+        market = self.market
+        return {'latency': market.latency, 'jitter': market.jitter, 'error_rate': market.error_rate,
+                'error_status': self.error_status, 'failing': sorted(market.failing),
+                'calls': market.calls, **self.stats}
+
+    def start(self):
+        """Serve from a daemon thread (returns self)"""
+        threading.Thread(target=self.serve_forever, name='upstream-server', daemon=True).start()
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stand-in market data server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every download')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random delay, 0..JITTER seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of downloads that fail')
+    parser.add_argument('--error-status', type=int, default=500, help='HTTP status of injected failures')
+    parser.add_argument('--fail', nargs='*', default=[], help='Tickers that never return data')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args(argv)
+
+    market = FixtureMarket(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                           failing=args.fail)
+    server = UpstreamServer((args.host, args.port), market, args.error_status, args.verbose)
+    print(f"📡 Market data stand-in on {server.url} (latency {args.latency}s, errors {args.error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration (picked up automatically from the project root)
+Loads the app and its models once in the master process so forked
+workers share the model pages copy-on-write and skip the cold start.
+Workers are threaded, so each one serves many slow clients at once while
+sharing a single copy of the models.
+"""
+import gc
+import os
+
+preload_app = True
+
+# gthread: one thread per in-flight request (GOLDSENSE_WORKER_CLASS=sync for the old behaviour)
+worker_class = os.environ.get('GOLDSENSE_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GOLDSENSE_THREADS', '32'))
+
+
+def when_ready(server):
+    """Runs in the master after the app is imported, before workers fork"""
+    from webapp.app import load_models
+
+    if load_models(preloaded=True):
+        server.log.info("Models preloaded in master")
+    # Keep preloaded objects out of GC scans so workers don't dirty shared pages
+    gc.freeze()
@@ -0,0 +1,8 @@
+"""
+Development server: python -m webapp (python webapp/app.py runs this too)
+Render workers skip re-importing a package's __main__, so they only load
+what the render function needs.
+"""
+from webapp.app import main
+
+main()
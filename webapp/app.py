@@ -3,45 +3,95 @@ Gold Price Prediction Web Application
 Flask API for predicting gold prices using trained ML models
 With model performance visualization
 """
-from flask import Flask, render_template, request, jsonify, send_file
+if __name__ == '__main__':
+    # `python app.py` serves from the importable webapp.app module instead (see
+    # webapp/__main__.py): render workers re-import the main script, and this file
+    # builds the whole app at import time
+    import os, runpy, sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    runpy.run_module('webapp', run_name='__main__', alter_sys=True)
+    sys.exit()
+
+from flask import Flask, render_template, request, jsonify, send_file, g
 import numpy as np
 import pandas as pd
-import joblib
+import hmac
+import json
 import os
-from datetime import datetime, timedelta
-import yfinance as yf
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 import traceback
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend
-import matplotlib.pyplot as plt
-import seaborn as sns
 from io import BytesIO
-import base64
 
 # Get the directory where this file is located
 WEBAPP_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Make the webapp package importable when this file is run directly
+if os.path.dirname(WEBAPP_DIR) not in sys.path:
+    sys.path.insert(0, os.path.dirname(WEBAPP_DIR))
+
+from webapp.market_cache import create_market_cache
+from webapp.fetch_engine import create_fetch_engine
+from webapp.upstream_guard import STATE_NAMES
+from webapp.price_store import create_price_store
+from webapp.feature_snapshot import create_snapshot_refresher
+from webapp.prediction_cache import create_prediction_cache
+from webapp.plot_cache import create_plot_cache
+from webapp.plots import FORMATS as PLOT_FORMATS
+from webapp.render_pool import RenderUnavailable, create_render_pool
+from webapp.inference_pool import InferenceUnavailable, create_inference_pool
+from webapp.asset_manifest import IMMUTABLE_MAX_AGE, create_asset_manifest
+from webapp.telemetry import log, telemetry
+from webapp.profiler import create_profiler
+from webapp.feature_layout import FeatureLayout
+from webapp.model_registry import ModelRegistry
+from webapp.backtest import DEFAULT_CHUNK, DEFAULT_WINDOW, open_sources, run_backtest
+from webapp.feature_engine import BAR_COLUMNS, DAY_KEY, HISTORY_KEY, day_number, defaulted_series, market_features
+from webapp.forecasting import (baseline_change, baseline_noise, forecast_path, forecast_paths,
+                                 is_reasonable, model_predict, percentile_bands, predict_rows)
+
 # Create Flask app with explicit paths
 app = Flask(__name__,
             template_folder=os.path.join(WEBAPP_DIR, 'templates'),
             static_folder=os.path.join(WEBAPP_DIR, 'static'))
 
+# Paths that never need models or market data
+STATIC_PREFIXES = ('/static', '/assets')
+
 # Add request logging middleware
 @app.before_request
 def log_request():
-    global model, scaler_X, scaler_y, feature_names, metadata
-    
-    print(f"🌐 {request.method} {request.path} from {request.remote_addr}")
+    g.request_started = time.perf_counter()
+    start_profile()
+    log(f"🌐 {request.method} {request.path} from {request.remote_addr}")
     
     # Auto-load models on first request if not loaded
-    if model is None and not request.path.startswith('/static'):
-        print("📦 Auto-loading models on first request...")
-        load_models()
+    if model_registry.current.model is None and not request.path.startswith(STATIC_PREFIXES):
+        log("📦 Auto-loading models on first request...")
+        model_registry.ensure_loaded()
+    
+    # (Re)start the feature refresher and model watcher in this worker process
+    if not request.path.startswith(STATIC_PREFIXES):
+        feature_refresher.start()
+        model_registry.start_watching()
 
 @app.after_request
 def log_response(response):
-    print(f"📤 Response status: {response.status_code}")
-    return response
+    started = g.get('request_started')
+    if started is not None:
+        # Label by route pattern, not the raw path, to keep the series bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        telemetry.observe_request(route, request.method, response.status_code,
+                                  time.perf_counter() - started)
+    log(f"📤 Response status: {response.status_code}")
+    return finish_profile(response)
+
+@app.teardown_request
+def stop_profile(exc):
+    # after_request is skipped if a response can't be built; don't leave the sampler running
+    profiler.stop()
 
 # Model paths - use absolute path relative to this file
 def get_models_dir():
@@ -68,80 +118,70 @@ def get_models_dir():
     return webapp_models
 
 MODEL_DIR = get_models_dir()
-SCALER_X_PATH = os.path.join(MODEL_DIR, 'scaler_X.pkl')
-SCALER_Y_PATH = os.path.join(MODEL_DIR, 'scaler_y.pkl')
-FEATURE_NAMES_PATH = os.path.join(MODEL_DIR, 'feature_names.pkl')
-METADATA_PATH = os.path.join(MODEL_DIR, 'metadata.pkl')
-
-# Global variables
-model = None
-scaler_X = None
-scaler_y = None
-feature_names = None
-metadata = None
-
-def load_models():
-    """Load trained models and scalers"""
-    global model, scaler_X, scaler_y, feature_names, metadata
-    
-    try:
-        print(f"📂 Models directory: {MODEL_DIR}")
-        
-        # Load scalers and feature names first
-        scaler_X = joblib.load(SCALER_X_PATH)
-        scaler_y = joblib.load(SCALER_Y_PATH)
-        feature_names = joblib.load(FEATURE_NAMES_PATH)
-        print("✅ Loaded scalers and features")
-        
-        # Try different model file formats
-        model_loaded = False
-        
-        # Try loading Keras model (.h5)
-        h5_path = os.path.join(MODEL_DIR, 'best_model.h5')
-        if os.path.exists(h5_path):
-            try:
-                from tensorflow import keras
-                model = keras.models.load_model(h5_path)
-                print("✅ Loaded Keras model (best_model.h5)")
-                model_loaded = True
-            except Exception as e:
-                print(f"⚠️  Could not load .h5 model: {e}")
-        
-        # Try loading pickle model
-        if not model_loaded:
-            for model_file in ['best_model.pkl', 'best_model_metadata.pkl']:
-                model_path = os.path.join(MODEL_DIR, model_file)
-                if os.path.exists(model_path):
-                    try:
-                        model = joblib.load(model_path)
-                        print(f"✅ Loaded pickle model ({model_file})")
-                        model_loaded = True
-                        break
-                    except Exception as e:
-                        continue
-        
-        if not model_loaded:
-            print("❌ No model file found!")
-            return False
-        
-        # Try to load metadata (contains performance metrics)
-        try:
-            metadata = joblib.load(METADATA_PATH)
-            print("✅ Models and metadata loaded successfully")
-        except:
-            metadata = {
-                'model_type': 'Unknown',
-                'trained_date': 'Unknown',
-                'metrics': {}
-            }
-            print("⚠️  Models loaded, but no metadata found")
-        
-        return True
-    except Exception as e:
-        print(f"❌ Error loading models: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+
+# Maximum rows accepted by /api/predict/batch
+MAX_BATCH_SIZE = int(os.environ.get('GOLDSENSE_MAX_BATCH_SIZE', '1000'))
+
+# Simulated paths behind prediction intervals ("uncertainty": true), and the most a request may ask for
+FORECAST_PATHS = int(os.environ.get('GOLDSENSE_FORECAST_PATHS', '2000'))
+MAX_FORECAST_PATHS = int(os.environ.get('GOLDSENSE_MAX_FORECAST_PATHS', '20000'))
+
+# One /api/backtest at a time per worker; each one reads the whole stored history
+backtest_lock = threading.Lock()
+
+# Day/week/month results per (model version, feature snapshot, horizon)
+prediction_cache = create_prediction_cache()
+
+# Sampling profiler for admin-requested and 1-in-N requests (see profiler.py)
+profiler = create_profiler()
+
+# Model calls run on a few dedicated threads, however many requests are waiting;
+# a profiled request's model calls are sampled on those threads too
+inference_pool = create_inference_pool(wrap=profiler.wrap)
+
+# Performance charts rendered once per metrics version (see plot_cache.py),
+# drawn in separate processes so renders don't stall predictions
+plot_cache = create_plot_cache(create_render_pool())
+
+# Training visualizations, indexed on first use with hashed resized copies (see asset_manifest.py)
+asset_manifest = create_asset_manifest(os.path.join(WEBAPP_DIR, 'visual'))
+
+# Shared cache for downloaded price history (see market_cache.py)
+market_cache = create_market_cache()
+# Daily history kept locally so refreshes only download recent bars (see price_store.py)
+price_store = create_price_store(os.path.dirname(WEBAPP_DIR))
+fetch_engine = create_fetch_engine(market_cache, price_store)
+
+# Market features are rebuilt in the background and read by /api/predict
+feature_refresher = create_snapshot_refresher(lambda: fetch_latest_features())
+
+def latest_snapshot_features():
+    """Current market features for model canary checks (never fetches)"""
+    snapshot = feature_refresher.latest()
+    return dict(snapshot.features) if snapshot is not None else None
+
+def on_model_swap(bundle):
+    # Cached predictions belong to the previous model
+    prediction_cache.clear()
+    # Render the charts for the new metrics before anyone asks for them. In the
+    # gunicorn master there is no traffic to protect, so draw inline; anywhere
+    # else the swap may be running inside a request, so warm up in the background
+    if bundle.load_info.get('preloaded', False):
+        plot_cache.warm(bundle.metadata, inline=True)
+    else:
+        threading.Thread(target=plot_cache.warm, args=(bundle.metadata,),
+                         name='plot-warmup', daemon=True).start()
+
+# Model, scalers, feature layout and metadata as one swappable bundle
+model_registry = ModelRegistry(
+    MODEL_DIR,
+    on_swap=on_model_swap,
+    canary=latest_snapshot_features,
+    watch_interval=float(os.environ.get('GOLDSENSE_MODEL_WATCH_INTERVAL', '60')))
+
+def load_models(preloaded=False):
+    """Load trained models and scalers (preloaded=True when called in the gunicorn master)"""
+    return model_registry.load(preloaded=preloaded) is not None
 
 def fetch_latest_features():
     """Fetch latest market data for prediction"""
@@ -150,152 +190,17 @@ def fetch_latest_features():
         end_date = datetime.now()
         start_date = end_date - timedelta(days=90)  # Extended to 90 days for more data
         
-        print(f"📊 Fetching market data from {start_date.date()} to {end_date.date()}...")
-        
-        # Fetch data with error handling
-        def safe_download(ticker, name):
-            try:
-                # Use auto_adjust=True for more accurate prices
-                data = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=True)
-                if len(data) > 0:
-                    last_price = float(data['Close'].iloc[-1])
-                    print(f"✅ {name}: {len(data)} days, Last: ${last_price:.2f}")
-                    return data
-                else:
-                    print(f"⚠️  {name}: No data")
-                    return None
-            except Exception as e:
-                print(f"❌ {name}: {str(e)[:50]}")
-                return None
-        
-        # Fetch gold data - Use accurate gold futures or spot price
-        # As of Nov 2025: Gold is trading above $4,000/oz
-        gold = None
-        gold_price_multiplier = 1.0
-        
-        gold_tickers = [
-            ('GC=F', 'Gold Futures', 1.0),     # Direct futures price (most accurate for spot)
-            ('GLD', 'Gold ETF (SPDR)', 10.9),  # GLD typically ~1/10th of gold price
-        ]
-        
-        for ticker, name, multiplier in gold_tickers:
-            test_gold = safe_download(ticker, name)
-            if test_gold is not None and len(test_gold) > 0:
-                gold = test_gold
-                gold_price_multiplier = multiplier
-                print(f"✅ Using {name} ({ticker}) for gold price (multiplier: {multiplier}x)")
-                break
-        
-        if gold is None or len(gold) == 0:
-            raise Exception("Cannot fetch gold price data from any source")
-        
-        # Fetch other markets
-        silver = safe_download('SI=F', 'Silver')
-        oil = safe_download('CL=F', 'Oil')
-        usd = safe_download('DX-Y.NYB', 'USD Index')
-        
-        # Get last valid values - handle both adjusted and non-adjusted data
-        def get_last_value(df, col='Close'):
-            if df is not None and len(df) > 0:
-                # Try 'Close' first, then 'Adj Close'
-                for column in [col, 'Adj Close', 'Close']:
-                    if column in df.columns:
-                        val = df[column].dropna().iloc[-1] if len(df[column].dropna()) > 0 else 0
-                        return float(val.item() if hasattr(val, 'item') else val)
-            return 0
-        
-        # Build features matching the model's expected input
-        features = {}
-        
-        # Basic OHLCV for Gold - apply multiplier for ETF conversion
-        features['Gold_Open'] = get_last_value(gold, 'Open') * gold_price_multiplier
-        features['Gold_High'] = get_last_value(gold, 'High') * gold_price_multiplier
-        features['Gold_Low'] = get_last_value(gold, 'Low') * gold_price_multiplier
-        features['Gold_Close'] = get_last_value(gold, 'Close') * gold_price_multiplier
-        features['Gold_Volume'] = get_last_value(gold, 'Volume')
-        
-        # Silver data
-        if silver is not None and len(silver) > 0:
-            features['Silver_Open'] = get_last_value(silver, 'Open')
-            features['Silver_High'] = get_last_value(silver, 'High')
-            features['Silver_Low'] = get_last_value(silver, 'Low')
-            features['Silver_Close'] = get_last_value(silver, 'Close')
-            features['Silver_Volume'] = get_last_value(silver, 'Volume')
-        else:
-            # Default values based on typical silver prices
-            features['Silver_Open'] = 31.0
-            features['Silver_High'] = 31.5
-            features['Silver_Low'] = 30.5
-            features['Silver_Close'] = 31.0
-            features['Silver_Volume'] = 100000
-        
-        # Gold/Silver ratios
-        if features['Silver_Close'] > 0:
-            features['G/S_Open'] = features['Gold_Open'] / features['Silver_Open'] if features['Silver_Open'] > 0 else 0
-            features['G/S_High'] = features['Gold_High'] / features['Silver_High'] if features['Silver_High'] > 0 else 0
-            features['G/S_Low'] = features['Gold_Low'] / features['Silver_Low'] if features['Silver_Low'] > 0 else 0
-            features['G/S_Close'] = features['Gold_Close'] / features['Silver_Close']
-        else:
-            features['G/S_Open'] = 75
-            features['G/S_High'] = 76
-            features['G/S_Low'] = 74
-            features['G/S_Close'] = 75
-        
-        # Technical indicators - apply multiplier
-        if gold is not None and len(gold) >= 30:
-            # Get close prices - try both 'Close' and 'Adj Close'
-            if 'Close' in gold.columns:
-                close_prices = gold['Close'].dropna() * gold_price_multiplier
-            elif 'Adj Close' in gold.columns:
-                close_prices = gold['Adj Close'].dropna() * gold_price_multiplier
-            else:
-                close_prices = gold.iloc[:, 3].dropna() * gold_price_multiplier  # Usually 4th column is close
-            
-            features['Gold_MA7'] = float(close_prices.tail(7).mean())
-            features['Gold_MA14'] = float(close_prices.tail(14).mean())
-            features['Gold_MA30'] = float(close_prices.tail(30).mean())
-            features['Gold_Volatility_7'] = float(close_prices.tail(7).std())
-            features['Gold_Volatility_14'] = float(close_prices.tail(14).std())
-            features['Gold_Volatility_30'] = float(close_prices.tail(30).std())
-            
-            # Returns
-            if len(close_prices) >= 8:
-                features['Gold_Return_1d'] = float(((close_prices.iloc[-1] - close_prices.iloc[-2]) / close_prices.iloc[-2] * 100))
-                features['Gold_Return_7d'] = float(((close_prices.iloc[-1] - close_prices.iloc[-8]) / close_prices.iloc[-8] * 100))
-            else:
-                features['Gold_Return_1d'] = 0
-                features['Gold_Return_7d'] = 0
-        else:
-            # Default values
-            features['Gold_MA7'] = features['Gold_Close']
-            features['Gold_MA14'] = features['Gold_Close']
-            features['Gold_MA30'] = features['Gold_Close']
-            features['Gold_Volatility_7'] = 10
-            features['Gold_Volatility_14'] = 15
-            features['Gold_Volatility_30'] = 20
-            features['Gold_Return_1d'] = 0
-            features['Gold_Return_7d'] = 0
-        
-        # Oil data
-        if oil is not None and len(oil) > 0:
-            features['Oil_Close'] = get_last_value(oil, 'Close')
-        else:
-            features['Oil_Close'] = 75.0  # Typical oil price
+        log(f"📊 Fetching market data from {start_date.date()} to {end_date.date()}...")
         
-        # USD Index
-        if usd is not None and len(usd) > 0:
-            features['DXY_Close'] = get_last_value(usd, 'Close')
-        else:
-            features['DXY_Close'] = 105.0  # Typical DXY value
+        # Fetch all tickers concurrently (see fetch_engine.py)
+        market_data = fetch_engine.fetch(start_date, end_date)
         
-        # Additional ratios if needed
-        if features['Oil_Close'] > 0:
-            features['Gold_Oil_Ratio'] = features['Gold_Close'] / features['Oil_Close']
-        else:
-            features['Gold_Oil_Ratio'] = 30
+        with telemetry.stage('feature_build'):
+            features = build_features(market_data)
         
-        print(f"✅ Current Gold Price: ${features['Gold_Close']:.2f} per troy ounce")
-        print(f"📈 Features extracted: {len(features)}")
+        log(f"✅ Current Gold Price: ${features['Gold_Close']:.2f} per troy ounce")
+        # The close history and bar day ride along in the dict but aren't features
+        log(f"📈 Features extracted: {len(features.keys() - {HISTORY_KEY, DAY_KEY})}")
         
         return features
         
@@ -304,90 +209,71 @@ def fetch_latest_features():
         traceback.print_exc()
         return None
 
-def predict_next_day(features_dict):
+def build_features(market_data, as_of=None):
+    """Build the model feature dict from downloaded market data (optionally as of a past date)"""
+    if market_data['gold'] is None:
+        raise Exception("Cannot fetch gold price data from any source")
+    
+    features = market_features(market_data, [as_of])[0]
+    if features is None:
+        raise ValueError(f"No gold data on or before {as_of}")
+    return features
+
+def predict_next_day(features_dict, bundle=None):
     """Predict next day gold price"""
     try:
         current_price = features_dict.get('Gold_Close', 2000)
+        bundle = bundle or model_registry.current
+        model, scaler_X, scaler_y = bundle.model, bundle.scaler_X, bundle.scaler_y
         
         # If model is properly loaded, use it
         if model is not None and hasattr(model, 'predict'):
-            # Create feature vector in correct order
-            feature_vector = []
-            missing_features = []
+            # Fill the feature row in correct order (NaN/inf replaced with 0)
+            X, missing_mask = bundle.layout.fill(features_dict)
             
-            for fname in feature_names:
-                if fname in features_dict:
-                    feature_vector.append(features_dict[fname])
-                else:
-                    feature_vector.append(0)
-                    missing_features.append(fname)
-            
-            if missing_features and len(missing_features) < 10:
+            if missing_mask and FeatureLayout.count_missing(missing_mask) < 10:
+                missing_features = bundle.layout.missing_names(missing_mask)
                 print(f"⚠️  Missing features (using 0): {missing_features[:5]}...")
             
-            # Check for NaN or inf values
-            feature_vector = np.array(feature_vector, dtype=np.float64)
-            if np.any(np.isnan(feature_vector)) or np.any(np.isinf(feature_vector)):
-                print(f"⚠️  Invalid values in features, replacing with 0")
-                feature_vector = np.nan_to_num(feature_vector, nan=0.0, posinf=0.0, neginf=0.0)
-            
             # Scale features
-            X = feature_vector.reshape(1, -1)
-            X_scaled = scaler_X.transform(X)
+            with telemetry.stage('scale', pipeline='day'):
+                X_scaled = scaler_X.transform(X)
             
             # Predict - handle both Keras and sklearn models
-            try:
-                # For Keras models (LSTM/GRU) - needs 3D input
-                if hasattr(model, 'predict') and 'tensorflow' in str(type(model)):
-                    # Reshape for LSTM input: (batch, timesteps, features)
-                    X_scaled_3d = X_scaled.reshape(1, 1, -1)
-                    y_scaled = model.predict(X_scaled_3d, verbose=0)
-                else:
-                    # For sklearn models
-                    y_scaled = model.predict(X_scaled)
-            except:
-                # Fallback - try as-is
-                y_scaled = model.predict(X_scaled)
+            with telemetry.stage('model_predict', pipeline='day'):
+                y_scaled = model_predict(model, X_scaled)
             
             # Inverse transform
-            if len(y_scaled.shape) > 1:
-                y_pred = scaler_y.inverse_transform(y_scaled.reshape(-1, 1))[0][0]
-            else:
-                y_pred = scaler_y.inverse_transform([[y_scaled[0]]])[0][0]
+            with telemetry.stage('inverse_transform', pipeline='day'):
+                if len(y_scaled.shape) > 1:
+                    y_pred = scaler_y.inverse_transform(y_scaled.reshape(-1, 1))[0][0]
+                else:
+                    y_pred = scaler_y.inverse_transform([[y_scaled[0]]])[0][0]
             
-            # Sanity check: prediction should be within 10% of current price
-            if y_pred < 100 or y_pred > 10000 or abs(y_pred - current_price) > current_price * 0.15:
+            # Sanity check: prediction should be within 15% of current price
+            if not is_reasonable(y_pred, current_price):
                 print(f"⚠️  Model prediction unreasonable: ${y_pred:.2f} (current: ${current_price:.2f})")
                 # Fall through to baseline prediction
             else:
-                print(f"✅ Model predicted: ${y_pred:.2f} (current: ${current_price:.2f})")
+                log(f"✅ Model predicted: ${y_pred:.2f} (current: ${current_price:.2f})")
                 return float(y_pred)
         
         # Baseline prediction using simple trend analysis
-        print("📊 Using baseline prediction (trend + volatility)")
+        log("📊 Using baseline prediction (trend + volatility)")
         
         # Calculate short-term trend from moving averages
         ma7 = features_dict.get('Gold_MA7', current_price)
         ma14 = features_dict.get('Gold_MA14', current_price)
         
-        # Calculate trend direction
-        trend = 0.0
-        if abs(ma7 - current_price) > 0.01 and abs(ma14 - current_price) > 0.01:
-            trend = (ma7 - ma14) / ma14 * 0.5  # Dampen the trend
+        # Add small random component for volatility (the same for the same features)
+        random_factor = baseline_noise(features_dict)
         
-        # Add small random component for volatility
-        volatility = features_dict.get('Gold_Volatility_7', 10)
-        import random
-        random.seed(int(datetime.now().timestamp()))
-        random_factor = random.uniform(-0.003, 0.005)  # -0.3% to +0.5%
-        
-        # Combine factors
-        predicted_change = trend + random_factor
-        predicted_change = max(-0.02, min(0.02, predicted_change))  # Cap at ±2%
+        # Combine trend direction and noise
+        predicted_change = baseline_change(current_price, ma7, ma14, random_factor)
         
         y_pred = current_price * (1 + predicted_change)
         
-        print(f"✅ Baseline predicted: ${y_pred:.2f} (change: {predicted_change*100:+.2f}%, current: ${current_price:.2f})")
+        log(f"✅ Baseline predicted: ${y_pred:.2f} (change: {predicted_change*100:+.2f}%, current: ${current_price:.2f})")
         return float(y_pred)
         
     except Exception as e:
@@ -397,46 +283,86 @@ def predict_next_day(features_dict):
         current_price = features_dict.get('Gold_Close', 2000)
         return float(current_price * 1.001)
 
-def predict_week_range(current_features):
-    """Predict price range for next week"""
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def check_feature_row(features):
+    """Raise ValueError unless a /api/predict/batch feature set is usable"""
+    if not isinstance(features, dict):
+        raise ValueError("Each feature set must be an object")
+    price = features.get('Gold_Close')
+    if not is_number(price) or not 0 < price < float('inf'):
+        raise ValueError("Gold_Close must be a positive number")
+    for name, value in features.items():
+        if name == HISTORY_KEY:
+            if not isinstance(value, list) or not all(is_number(v) and v > 0 for v in value):
+                raise ValueError(f"{HISTORY_KEY} must be a list of positive numbers")
+        elif not is_number(value):
+            raise ValueError(f"{name} must be a number")
+
+def predict_batch(feature_dicts, bundle=None):
+    """
+    Predict next day gold price for many feature dicts at once.
+    All rows go through the scaler and model as one matrix; rows whose
+    prediction fails the sanity check get the baseline prediction.
+    Returns (predictions, sources) arrays in input order.
+    """
+    n = len(feature_dicts)
+    bundle = bundle or model_registry.current
+    current = np.array([float(f['Gold_Close']) for f in feature_dicts], dtype=np.float64)
+    ma7 = np.array([float(f.get('Gold_MA7', c)) for f, c in zip(feature_dicts, current)])
+    ma14 = np.array([float(f.get('Gold_MA14', c)) for f, c in zip(feature_dicts, current)])
+    X = bundle.layout.fill_matrix(feature_dicts)[0] if bundle.layout is not None else np.empty((n, 0))
+    # Each row gets the noise predict_next_day would give the same features
+    random_factors = np.array([baseline_noise(f) for f in feature_dicts])
+    predictions, from_model = predict_rows(X, current, ma7, ma14, bundle.model, bundle.scaler_X,
+                                           bundle.scaler_y, random_factors)
+    sources = np.where(from_model, 'model', 'baseline')
+    
+    log(f"✅ Batch predicted {n} rows ({int(from_model.sum())} model, {int(n - from_model.sum())} baseline)")
+    return predictions, sources
+
+def forecast_intervals(features, horizon, paths, bundle=None):
+    """Percentile bands per forecast day from `paths` simulated forecasts"""
+    bundle = bundle or model_registry.current
+    closes, method = forecast_paths(features, horizon, paths, bundle.model, bundle.scaler_X,
+                                    bundle.scaler_y, bundle.layout)
+    return {'paths': paths, 'method': method, **percentile_bands(closes)}
+
+def predict_week_range(current_features, bundle=None, paths=0):
+    """Predict price range for next week (with percentile bands from `paths` simulations)"""
     try:
-        predictions = []
-        
-        # Predict 7 days ahead
-        for day in range(7):
-            pred = predict_next_day(current_features)
-            if pred is not None:
-                predictions.append(pred)
-                # Update features for next prediction (simplified)
-                current_features['Gold_Close'] = pred
+        bundle = bundle or model_registry.current
+        # Predict 7 days ahead, rolling the technical indicators forward each day
+        predictions = forecast_path(current_features, 7, bundle.model, bundle.scaler_X,
+                                    bundle.scaler_y, bundle.layout)
         
         if predictions:
-            return {
+            result = {
                 'min': float(np.min(predictions)),
                 'max': float(np.max(predictions)),
                 'avg': float(np.mean(predictions)),
                 'daily': predictions
             }
+            if paths:
+                result['intervals'] = forecast_intervals(current_features, 7, paths, bundle)
+            return result
         return None
         
     except Exception as e:
         print(f"Error predicting week: {e}")
         return None
 
-def predict_month_range(current_features):
-    """Predict price range for next month"""
+def predict_month_range(current_features, bundle=None, paths=0):
+    """Predict price range for next month (with percentile bands from `paths` simulations)"""
     try:
-        predictions = []
-        
-        # Predict 30 days ahead
-        for day in range(30):
-            pred = predict_next_day(current_features)
-            if pred is not None:
-                predictions.append(pred)
-                current_features['Gold_Close'] = pred
+        bundle = bundle or model_registry.current
+        # Predict 30 days ahead, rolling the technical indicators forward each day
+        predictions = forecast_path(current_features, 30, bundle.model, bundle.scaler_X,
+                                    bundle.scaler_y, bundle.layout)
         
         if predictions:
-            return {
+            result = {
                 'min': float(np.min(predictions)),
                 'max': float(np.max(predictions)),
                 'avg': float(np.mean(predictions)),
@@ -445,25 +371,24 @@ def predict_month_range(current_features):
                     for i in range(0, len(predictions), 7)
                 ]
             }
+            if paths:
+                result['intervals'] = forecast_intervals(current_features, 30, paths, bundle)
+            return result
         return None
         
     except Exception as e:
         print(f"Error predicting month: {e}")
         return None
 
+def cached_prediction(horizon, snapshot, bundle, compute):
+    """Return a cached result for this model/snapshot/horizon or compute it"""
+    key = (bundle.version, snapshot.digest, horizon)
+    return prediction_cache.get_or_compute(key, compute)
+
 @app.route('/')
 def home():
     """Home page"""
     try:
-        print(f"📍 Home route accessed")
-        print(f"📂 Template folder: {app.template_folder}")
-        print(f"📄 Looking for: index.html")
-        
-        # Check if template exists
-        template_path = os.path.join(app.template_folder, 'index.html')
-        print(f"📄 Full path: {template_path}")
-        print(f"✅ Exists: {os.path.exists(template_path)}")
-        
         return render_template('index.html')
     except Exception as e:
         print(f"❌ Error in home route: {e}")
@@ -474,6 +399,14 @@ def home():
             'templates_exist': os.path.exists(app.template_folder)
         }), 500
 
+def inference_unavailable(e):
+    """503 for a prediction the inference pool can't take right now"""
+    print(f"⏳ {e}")
+    response = jsonify({'success': False, 'error': 'Server busy, try again shortly', 'detail': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '2'
+    return response
+
 @app.route('/api/predict', methods=['POST'])
 def api_predict():
     """API endpoint for predictions"""
@@ -481,50 +414,77 @@ def api_predict():
         data = request.get_json()
         prediction_type = data.get('type', 'day')  # day, week, or month
         
-        # Fetch latest features
-        features = fetch_latest_features()
-        if features is None:
+        # Prediction intervals: "uncertainty": true, or an explicit number of simulated paths
+        try:
+            paths = int(data.get('paths') or (FORECAST_PATHS if data.get('uncertainty') else 0))
+        except (TypeError, ValueError):
+            paths = -1
+        if not 0 <= paths <= MAX_FORECAST_PATHS:
+            return jsonify({
+                'success': False,
+                'error': f'paths must be between 0 and {MAX_FORECAST_PATHS}'
+            }), 400
+        
+        # Read the latest feature snapshot (refreshed in the background)
+        snapshot = feature_refresher.current()
+        if snapshot is None:
             return jsonify({
                 'success': False,
                 'error': 'Failed to fetch market data'
             }), 500
+        features = dict(snapshot.features)
+        
+        # One model bundle for the whole request, even if a reload swaps it meanwhile
+        bundle = model_registry.current
         
         result = {
             'success': True,
             'timestamp': datetime.now().isoformat(),
             'current_price': features.get('Gold_Close', 0),
             'unit': 'USD per troy ounce',
-            'currency': 'USD'
+            'currency': 'USD',
+            'model_version': bundle.version,
+            **feature_refresher.status(snapshot)
         }
         
         # Predict based on type
         if prediction_type == 'day':
-            next_day = predict_next_day(features)
+            next_day = cached_prediction('day', snapshot, bundle,
+                                         lambda: inference_pool.run(predict_next_day, features, bundle))
             if next_day:
                 result['prediction'] = {
                     'next_day': next_day,
                     'change': next_day - features['Gold_Close'],
                     'change_percent': ((next_day - features['Gold_Close']) / features['Gold_Close']) * 100
                 }
+                if paths:
+                    result['prediction']['intervals'] = cached_prediction(
+                        ('day', paths), snapshot, bundle,
+                        lambda: inference_pool.run(forecast_intervals, features, 1, paths, bundle))
             else:
                 return jsonify({'success': False, 'error': 'Prediction failed'}), 500
                 
         elif prediction_type == 'week':
-            week_pred = predict_week_range(features.copy())
+            week_pred = cached_prediction(('week', paths), snapshot, bundle,
+                                          lambda: inference_pool.run(predict_week_range, features.copy(), bundle, paths))
             if week_pred:
                 result['prediction'] = week_pred
             else:
                 return jsonify({'success': False, 'error': 'Week prediction failed'}), 500
                 
         elif prediction_type == 'month':
-            month_pred = predict_month_range(features.copy())
+            month_pred = cached_prediction(('month', paths), snapshot, bundle,
+                                           lambda: inference_pool.run(predict_month_range, features.copy(), bundle, paths))
             if month_pred:
                 result['prediction'] = month_pred
             else:
                 return jsonify({'success': False, 'error': 'Month prediction failed'}), 500
         
-        return jsonify(result)
+        with telemetry.stage('serialize', route='predict'):
+            return jsonify(result)
         
+    except InferenceUnavailable as e:
+        return inference_unavailable(e)
     except Exception as e:
         print(f"API Error: {e}")
         traceback.print_exc()
@@ -533,16 +493,343 @@ def api_predict():
             'error': str(e)
         }), 500
 
+@app.route('/api/predict/batch', methods=['POST'])
+def api_predict_batch():
+    """
+    Batch next-day predictions in one call.
+    Body: {"features": [{...}, ...]} with feature dicts, or
+          {"dates": ["2025-01-02", ...]} to predict as of past market dates.
+    Results are returned in request order.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        feature_dicts = data.get('features')
+        dates = data.get('dates')
+        
+        if feature_dicts is None and dates is None:
+            return jsonify({'success': False, 'error': 'Provide "features" or "dates"'}), 400
+        items = feature_dicts if feature_dicts is not None else dates
+        if not isinstance(items, list) or len(items) == 0:
+            return jsonify({'success': False, 'error': 'Expected a non-empty list'}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'Batch too large ({len(items)} > {MAX_BATCH_SIZE})'
+            }), 400
+        
+        errors = {}
+        defaulted = None
+        if feature_dicts is not None:
+            for i, features in enumerate(feature_dicts):
+                try:
+                    check_feature_row(features)
+                except ValueError as e:
+                    return jsonify({'success': False, 'error': f'Invalid feature set at index {i}: {e}',
+                                    'index': i}), 400
+            rows = feature_dicts
+        else:
+            # Build the feature set for each as-of date from one download
+            as_of = []
+            for i, d in enumerate(dates):
+                try:
+                    if not isinstance(d, str):
+                        raise ValueError(f"expected a date string, got {d!r}")
+                    day = pd.Timestamp(d)
+                    if pd.isna(day):
+                        raise ValueError(f"{d!r} is not a date")
+                except (ValueError, TypeError, OverflowError) as e:
+                    return jsonify({'success': False, 'error': f'Invalid date at index {i}: {e}',
+                                    'index': i}), 400
+                as_of.append(day.tz_convert(None) if day.tzinfo is not None else day)
+            start_date = min(as_of) - timedelta(days=90)
+            end_date = max(as_of) + timedelta(days=1)
+            market_data = fetch_engine.fetch(
+                start_date, end_date,
+                range_key=f'{start_date:%Y%m%d}-{end_date:%Y%m%d}')
+            if market_data['gold'] is None:
+                raise Exception("Cannot fetch gold price data from any source")
+            # Every as-of date from one vectorized pass over the history (see feature_engine.py)
+            with telemetry.stage('feature_build', pipeline='batch'):
+                rows = market_features(market_data, as_of)
+                # Silver/oil/DXY with no bar by that date are filled with defaults - say so
+                defaulted = defaulted_series(market_data, as_of)
+            for i, row in enumerate(rows):
+                if row is None:
+                    errors[i] = f"No gold data on or before {as_of[i]}"
+        
+        valid = [row for i, row in enumerate(rows) if i not in errors]
+        predictions, sources = inference_pool.run(predict_batch, valid) if valid else ([], [])
+        predicted = iter(zip(predictions, sources))
+        
+        results = []
+        for i, row in enumerate(rows):
+            if i in errors:
+                results.append({'success': False, 'error': errors[i], 'as_of': dates[i]})
+                continue
+            pred, source = next(predicted)
+            current_price = float(row['Gold_Close'])
+            item = {
+                'success': True,
+                'current_price': current_price,
+                'next_day': float(pred),
+                'change': float(pred) - current_price,
+                'change_percent': (float(pred) - current_price) / current_price * 100,
+                'source': str(source)
+            }
+            if defaulted is not None:
+                item['as_of'] = dates[i]
+                item['defaulted_series'] = defaulted[i]
+            results.append(item)
+        
+        with telemetry.stage('serialize', route='predict_batch'):
+            return jsonify({
+                'success': True,
+                'timestamp': datetime.now().isoformat(),
+                'count': len(results),
+                'unit': 'USD per troy ounce',
+                'currency': 'USD',
+                'predictions': results
+            })
+        
+    except InferenceUnavailable as e:
+        return inference_unavailable(e)
+    except Exception as e:
+        print(f"Batch API Error: {e}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/backtest')
+def backtest():
+    """
+    Backtest the current model over the stored daily history (see backtest.py).
+    Streams one JSON object per line: 'start', a 'chunk' event with running
+    and rolling MAE/RMSE/MAPE after every batch of bars, then 'summary'.
+    Optional ?start=, ?end= (YYYY-MM-DD), ?window= and ?chunk=.
+    """
+    try:
+        start = pd.Timestamp(request.args['start']) if request.args.get('start') else None
+        end = pd.Timestamp(request.args['end']) if request.args.get('end') else None
+        window = min(max(int(request.args.get('window', DEFAULT_WINDOW)), 1), 10000)
+        chunk = min(max(int(request.args.get('chunk', DEFAULT_CHUNK)), 100), 50000)
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': f'Invalid parameter: {e}'}), 400
+    
+    model_registry.ensure_loaded()
+    bundle = model_registry.current
+    if not backtest_lock.acquire(blocking=False):
+        return jsonify({'success': False, 'error': 'A backtest is already running'}), 429, {'Retry-After': '5'}
+    try:
+        sources = open_sources(price_store, chunk)
+    except ValueError as e:
+        backtest_lock.release()
+        return jsonify({'success': False, 'error': str(e)}), 404
+    
+    def stream():
+        try:
+            for event in run_backtest(bundle, sources, start, end, window, run=inference_pool.run):
+                yield json.dumps(event) + '\n'
+        except InferenceUnavailable as e:
+            yield json.dumps({'event': 'error', 'error': str(e)}) + '\n'
+    
+    response = app.response_class(stream(), mimetype='application/x-ndjson')
+    # Released when the server closes the response, even if the client left mid-stream
+    response.call_on_close(backtest_lock.release)
+    return response
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for deployment monitoring"""
-    models_loaded = model is not None and scaler_X is not None
+    bundle = model_registry.current
+    load_info = bundle.load_info
+    models_loaded = bundle.model is not None and bundle.scaler_X is not None
     return jsonify({
         'status': 'healthy' if models_loaded else 'unhealthy',
         'models_loaded': models_loaded,
+        'model_version': bundle.version,
+        'model_load_seconds': load_info.get('seconds'),
+        'artifact_mode': load_info.get('artifact_mode'),
+        # Loaded by the gunicorn master and shared with this forked worker
+        'preloaded': load_info.get('preloaded', False) and load_info.get('pid') != os.getpid(),
+        'upstream': {source: status['state'] for source, status in fetch_engine.status().items()},
         'timestamp': datetime.now().isoformat()
     })
 
+# Circuit state name -> gauge value
+CIRCUIT_STATES = {name: value for value, name in STATE_NAMES.items()}
+
+def collect_app_metrics():
+    """Cache, pool and model counters for /metrics"""
+    def events(stats):
+        return [({'event': event}, count) for event, count in stats.items()]
+
+    snapshot = feature_refresher.latest()
+    breakers = fetch_engine.status()
+    return [
+        ('market_cache_events_total', 'counter', 'Market data cache lookups and upstream calls',
+         events({**market_cache.stats, 'coalesced': market_cache.coalesced})),
+        ('upstream_circuit_state', 'gauge', 'Upstream circuit breaker state (0 closed, 1 half-open, 2 open)',
+         [({'source': source}, CIRCUIT_STATES[status['state']]) for source, status in breakers.items()]),
+        ('upstream_circuit_events_total', 'counter', 'Upstream calls, failures and fast rejections',
+         [({'source': source, 'event': event}, status[event])
+          for source, status in breakers.items() for event in ('calls', 'failed', 'rejected', 'opened')]),
+        ('prediction_cache_events_total', 'counter', 'Prediction cache lookups',
+         [({'event': 'hits'}, prediction_cache.hits), ({'event': 'misses'}, prediction_cache.misses)]),
+        ('plot_cache_events_total', 'counter', 'Plot cache lookups and renders', events(plot_cache.stats)),
+        ('render_pool_events_total', 'counter', 'Plot render pool outcomes',
+         events(plot_cache.render_pool.stats)),
+        ('inference_pool_events_total', 'counter', 'Inference pool outcomes', events(inference_pool.stats)),
+        ('model_version', 'gauge', 'Version of the model bundle serving requests',
+         [({}, model_registry.current.version)]),
+        ('feature_updates_total', 'counter', 'Intraday ticks and bars applied to or ignored by the live features',
+         events(feature_refresher.updates)),
+        ('snapshot_age_seconds', 'gauge', 'Age of the market feature snapshot',
+         [({}, snapshot.age_seconds())] if snapshot is not None else []),
+    ]
+
+telemetry.add_collector(collect_app_metrics)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms and counters for this worker (Prometheus text format)"""
+    return telemetry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+def is_admin_request():
+    """True when the request carries the GOLDSENSE_ADMIN_TOKEN (admin endpoints are off without it)"""
+    token = os.environ.get('GOLDSENSE_ADMIN_TOKEN')
+    # Constant-time compare; bytes because compare_digest rejects non-ASCII str
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+def start_profile():
+    """
+    Profile this request when an admin asks for it (?profile=1 or
+    X-Profile: 1 stores it, ?profile=collapsed returns it) or when it is
+    one of the 1-in-N sampled requests (GOLDSENSE_PROFILE_EVERY).
+    """
+    if request.path.startswith(STATIC_PREFIXES + ('/api/admin/profiles',)) or request.path == '/metrics':
+        return
+    mode = request.args.get('profile') or request.headers.get('X-Profile')
+    if mode and mode not in ('0', 'off') and is_admin_request():
+        g.profile_mode = 'collapsed' if mode == 'collapsed' else 'store'
+    elif profiler.should_sample():
+        g.profile_mode = 'sample'
+    else:
+        return
+    profiler.start(request.url_rule.rule if request.url_rule else request.path)
+
+def finish_profile(response):
+    """Stop this request's profile and store or return it"""
+    profile = profiler.stop()
+    if profile is None:
+        return response
+    mode = g.get('profile_mode')
+    if mode == 'collapsed':
+        # Flamegraph input in place of the normal body; the real status is kept in a header
+        profiled = app.response_class(profile.collapsed(), mimetype='text/plain')
+        profiled.headers['X-Profile-Status'] = str(response.status_code)
+        profiled.headers['X-Profile-Duration'] = f'{profile.duration:.4f}'
+        return profiled
+    if mode == 'sample' and not profile.samples:
+        return response  # Finished between two samples
+    profile_id = profiler.save(profile)
+    if mode == 'store' and profile_id:
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+@app.route('/api/admin/profiles')
+def admin_profiles():
+    """
+    Stored profiles. ?aggregate=1 merges them (optionally ?route=api_predict)
+    into one collapsed profile for flamegraph.pl or speedscope.
+    """
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    if request.args.get('aggregate'):
+        return profiler.aggregate(request.args.get('route')), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    return jsonify({'success': True, 'pid': os.getpid(), 'profiles': profiler.list(), **profiler.status()})
+
+@app.route('/api/admin/profiles/<profile_id>')
+def admin_profile(profile_id):
+    """One stored profile in the collapsed stack format"""
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    path = profiler.path(profile_id)
+    if not os.path.exists(path):
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='text/plain')
+
+@app.route('/api/admin/models')
+def admin_models():
+    """Model registry status for this worker"""
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    return jsonify({'success': True, 'pid': os.getpid(), **model_registry.status()})
+
+@app.route('/api/admin/reload', methods=['POST'])
+def admin_reload():
+    """Reload model artifacts in the background and swap them in once validated"""
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    started = model_registry.reload_in_background()
+    return jsonify({
+        'success': True,
+        'reload_started': started,
+        'message': 'Reload started' if started else 'A reload is already running',
+        'pid': os.getpid(),
+        'model_version': model_registry.current.version
+    }), 202
+
+def market_update(item, kind):
+    """One /api/admin/ticks item as a refresher update; raises ValueError if malformed"""
+    if not isinstance(item, dict) or item.get('series') not in BAR_COLUMNS:
+        raise ValueError(f"Each {kind} needs a series: {', '.join(BAR_COLUMNS)}")
+    if kind == 'tick':
+        price = float(item['price'])
+        if not 0 < price < float('inf'):
+            raise ValueError(f"Invalid tick price: {item['price']}")
+        return ('tick', item['series'], price, day_number(item['time']), float(item.get('volume', 0)))
+    if item['series'] == 'gold' and not float(item.get('Close', 0)) > 0:
+        raise ValueError("A gold bar needs a positive Close")
+    bar = {part: float(item[part]) for part in BAR_COLUMNS[item['series']] if item.get(part) is not None}
+    return ('bar', item['series'], bar, day_number(item['date']), 0.0)
+
+@app.route('/api/admin/ticks', methods=['POST'])
+def admin_ticks():
+    """
+    Intraday market updates for this worker's features, in order:
+    {"ticks": [{"series": "gold", "price": 2651.2, "time": "2025-01-02T15:04:05", "volume": 10}],
+     "bars": [{"series": "silver", "date": "2025-01-02", "Open": .., "High": .., "Low": .., "Close": .., "Volume": ..}]}
+    Bars are applied before ticks. Gold prices are USD per ounce.
+    """
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    data = request.get_json(silent=True) or {}
+    items = [(item, 'bar') for item in data.get('bars') or []] + [(item, 'tick') for item in data.get('ticks') or []]
+    if not items:
+        return jsonify({'success': False, 'error': 'Provide "ticks" or "bars"'}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'success': False, 'error': f'Too many updates ({len(items)} > {MAX_BATCH_SIZE})'}), 400
+    try:
+        updates = [market_update(item, kind) for item, kind in items]
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Invalid update: {e}'}), 400
+    
+    applied, ignored = feature_refresher.ingest(updates)
+    snapshot = feature_refresher.latest()
+    if snapshot is None:
+        return jsonify({'success': False, 'error': 'Failed to fetch market data'}), 500
+    return jsonify({
+        'success': True,
+        'applied': applied,
+        'ignored': ignored,
+        'pid': os.getpid(),
+        'current_price': snapshot.features.get('Gold_Close'),
+        **feature_refresher.status(snapshot)
+    })
+
 @app.route('/debug')
 def debug_info():
     """Debug endpoint to check configuration"""
@@ -565,8 +852,9 @@ def get_metrics():
     """Get model performance metrics"""
     try:
         # Try to load models if not already loaded
-        if model is None or metadata is None:
-            load_models()
+        model_registry.ensure_loaded()
+        bundle = model_registry.current
+        metadata = bundle.metadata
         
         if metadata is None:
             return jsonify({
@@ -579,7 +867,7 @@ def get_metrics():
         metrics_data = metadata.get('metrics', {})
         model_type = metadata.get('model_type', 'Ensemble ML Model')
         trained_date = metadata.get('trained_date', 'N/A')
-        n_features = metadata.get('n_features', len(feature_names) if feature_names else 0)
+        n_features = metadata.get('n_features', len(bundle.feature_names) if bundle.feature_names else 0)
         
         return jsonify({
             'success': True,
@@ -597,65 +885,62 @@ def get_metrics():
             'error': str(e)
         }), 200
 
+def plot_response(response, plot, etag):
+    """Add cache validators to a plot response; answers revalidations with 304"""
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(plot.last_modified, timezone.utc)
+    response.cache_control.no_cache = True  # Always revalidate (cheap with the ETag)
+    return response.make_conditional(request)
+
+def render_unavailable(e):
+    """503 for a plot that can't be rendered right now"""
+    print(f"⏳ {e}")
+    response = jsonify({'error': 'Plot rendering busy, try again shortly', 'detail': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+def send_plot(plot):
+    """Binary response for a cached plot (gzipped when precompressed and accepted)"""
+    compressed = plot_cache.get_gzip(plot)
+    if compressed is not None and 'gzip' in request.accept_encodings:
+        response = send_file(BytesIO(compressed), mimetype=plot.mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+        etag = f'{plot.etag}-gz'
+    elif plot.path and os.path.exists(plot.path):
+        # Stream the on-disk copy (lets the server use sendfile)
+        response = send_file(plot.path, mimetype=plot.mimetype, etag=False)
+        etag = plot.etag
+    else:
+        response = send_file(BytesIO(plot.data), mimetype=plot.mimetype)
+        etag = plot.etag
+    if compressed is not None:
+        response.vary.add('Accept-Encoding')
+    return plot_response(response, plot, etag)
+
+def plot_json(name):
+    """JSON {'success', 'plot': base64 PNG} response for a cached plot"""
+    metadata = model_registry.current.metadata
+    if metadata is None or 'metrics' not in metadata:
+        return jsonify({'error': 'No metrics available'}), 404
+
+    plot = plot_cache.get(name, metadata)
+    if plot is None:
+        return jsonify({'error': 'No metrics available'}), 404
+
+    response = jsonify({
+        'success': True,
+        'plot': plot_cache.get_base64(plot)
+    })
+    return plot_response(response, plot, f'{plot.etag}-json')
+
 @app.route('/api/plot/comparison')
 def plot_comparison():
     """Generate model comparison plot"""
     try:
-        if metadata is None or 'metrics' not in metadata:
-            return jsonify({'error': 'No metrics available'}), 404
-        
-        metrics = metadata['metrics']
-        
-        # Prepare data for plotting
-        models = []
-        r2_scores = []
-        mae_scores = []
-        
-        for model_name, model_metrics in metrics.items():
-            if isinstance(model_metrics, dict) and 'r2' in model_metrics:
-                models.append(model_name.upper())
-                r2_scores.append(model_metrics['r2'])
-                mae_scores.append(model_metrics['mae'])
-        
-        # Create figure with subplots
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-        
-        # R² Score comparison
-        colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#6C5CE7']
-        bars1 = ax1.barh(models, r2_scores, color=colors[:len(models)])
-        ax1.set_xlabel('R² Score', fontsize=12, fontweight='bold')
-        ax1.set_title('Model Performance: R² Score', fontsize=14, fontweight='bold')
-        ax1.set_xlim(0, 1)
-        ax1.grid(True, alpha=0.3, axis='x')
-        
-        # Add value labels
-        for i, (bar, score) in enumerate(zip(bars1, r2_scores)):
-            ax1.text(score + 0.01, i, f'{score:.4f}', va='center', fontsize=10)
-        
-        # MAE comparison
-        bars2 = ax2.barh(models, mae_scores, color=colors[:len(models)])
-        ax2.set_xlabel('MAE ($)', fontsize=12, fontweight='bold')
-        ax2.set_title('Model Performance: Mean Absolute Error', fontsize=14, fontweight='bold')
-        ax2.grid(True, alpha=0.3, axis='x')
-        
-        # Add value labels
-        for i, (bar, score) in enumerate(zip(bars2, mae_scores)):
-            ax2.text(score + 0.5, i, f'${score:.2f}', va='center', fontsize=10)
-        
-        plt.tight_layout()
-        
-        # Convert plot to base64
-        img = BytesIO()
-        plt.savefig(img, format='png', dpi=100, bbox_inches='tight')
-        img.seek(0)
-        plot_url = base64.b64encode(img.getvalue()).decode()
-        plt.close()
-        
-        return jsonify({
-            'success': True,
-            'plot': plot_url
-        })
-        
+        return plot_json('comparison')
+    except RenderUnavailable as e:
+        return render_unavailable(e)
     except Exception as e:
         print(f"Error generating plot: {e}")
         traceback.print_exc()
@@ -665,122 +950,64 @@ def plot_comparison():
 def metrics_table():
     """Generate detailed metrics table image"""
     try:
-        if metadata is None or 'metrics' not in metadata:
-            return jsonify({'error': 'No metrics available'}), 404
-        
-        metrics = metadata['metrics']
-        
-        # Prepare data
-        data = []
-        for model_name, model_metrics in metrics.items():
-            if isinstance(model_metrics, dict):
-                data.append({
-                    'Model': model_name.upper(),
-                    'R² Score': f"{model_metrics.get('r2', 0):.4f}",
-                    'MAE ($)': f"${model_metrics.get('mae', 0):.2f}",
-                    'RMSE ($)': f"${model_metrics.get('rmse', 0):.2f}",
-                    'MAPE (%)': f"{model_metrics.get('mape', 0):.2f}%"
-                })
-        
-        df = pd.DataFrame(data)
-        
-        # Create figure
-        fig, ax = plt.subplots(figsize=(12, len(data) * 0.8))
-        ax.axis('tight')
-        ax.axis('off')
-        
-        # Create table
-        table = ax.table(cellText=df.values, colLabels=df.columns,
-                        cellLoc='center', loc='center',
-                        colColours=['#4ECDC4']*len(df.columns))
-        
-        table.auto_set_font_size(False)
-        table.set_fontsize(11)
-        table.scale(1, 2.5)
-        
-        # Style header
-        for i in range(len(df.columns)):
-            table[(0, i)].set_facecolor('#2C3E50')
-            table[(0, i)].set_text_props(weight='bold', color='white')
-        
-        # Alternate row colors
-        for i in range(1, len(df) + 1):
-            for j in range(len(df.columns)):
-                if i % 2 == 0:
-                    table[(i, j)].set_facecolor('#ECF0F1')
-                else:
-                    table[(i, j)].set_facecolor('#FFFFFF')
-        
-        plt.title('Model Performance Comparison', fontsize=16, fontweight='bold', pad=20)
-        
-        # Convert to base64
-        img = BytesIO()
-        plt.savefig(img, format='png', dpi=100, bbox_inches='tight')
-        img.seek(0)
-        plot_url = base64.b64encode(img.getvalue()).decode()
-        plt.close()
-        
-        return jsonify({
-            'success': True,
-            'plot': plot_url
-        })
-        
+        return plot_json('metrics_table')
+    except RenderUnavailable as e:
+        return render_unavailable(e)
     except Exception as e:
         print(f"Error generating metrics table: {e}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/plot/image/<name>')
+def plot_image(name):
+    """
+    Performance plot as an image: /api/plot/image/comparison[.png|.webp|.svg]
+    Without an extension WebP is sent to clients that accept it, PNG otherwise.
+    """
+    try:
+        name, ext = os.path.splitext(name)
+        fmt = ext.lstrip('.').lower() or request.args.get('format', '').lower()
+        negotiated = not fmt
+        if negotiated:
+            fmt = 'webp' if 'webp' in PLOT_FORMATS and 'image/webp' in request.accept_mimetypes.values() else 'png'
+        if fmt not in PLOT_FORMATS:
+            return jsonify({'error': f'Unsupported format: {fmt}',
+                            'formats': sorted(PLOT_FORMATS)}), 406
+
+        metadata = model_registry.current.metadata
+        plot = plot_cache.get(name, metadata, fmt) if metadata else None
+        if plot is None:
+            return jsonify({
+                'error': 'Visualization not found',
+                'message': f'Plot "{name}" not available'
+            }), 404
+
+        response = send_plot(plot)
+        if negotiated:
+            response.vary.add('Accept')
+        return response
+
+    except RenderUnavailable as e:
+        return render_unavailable(e)
+    except Exception as e:
+        print(f"Error rendering plot image {name}: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/available_plots')
 def available_plots():
     """List available visualization plots from training experiments"""
     try:
-        # Get the visual directory path
-        visual_dir = os.path.join(WEBAPP_DIR, 'visual')
-        
-        if not os.path.exists(visual_dir):
+        asset_manifest.ensure()
+        if not asset_manifest.plots:
             return jsonify({
                 'success': False,
                 'plots': [],
                 'message': 'Visualizations directory not found.'
             })
         
-        # Define plot descriptions based on model training experiments
-        plot_descriptions = {
-            'all_models_predictions.png': 'All Models Predictions Comparison - Shows predictions from all trained models (RF, XGBoost, LightGBM, LSTM, GRU, Ensemble)',
-            'all_predictions.png': 'Comprehensive Predictions Overview - Detailed view of all model predictions on test data',
-            'model_performance_comparison_all.png': 'Model Performance Metrics - Comparison of R², MAE, MSE, and RMSE across all models',
-            'model_comparison.png': 'Model Comparison Chart - Visual comparison of different ML model performances',
-            'prediction_vs_actual.png': 'Prediction vs Actual - How well the ensemble model predicts actual gold prices',
-            'enhanced_time_series_all.png': 'Time Series Analysis - Historical gold price trends with technical indicators',
-            'enhanced_correlation_heatmap.png': 'Enhanced Feature Correlation - Detailed correlation matrix of all features',
-            'feature_importance_enhanced.png': 'Feature Importance - Most influential features for price prediction',
-            'lstm_training_history.png': 'LSTM Training History - Training and validation loss over epochs',
-            'data_overview.png': 'Data Overview - Statistical summary of the dataset',
-            'time_series_analysis.png': 'Time Series Decomposition - Trend, seasonal, and residual components'
-        }
-        
-        # Files to exclude
-        exclude_files = ['correlation_heatmap (1).png', 'model_comparison (1).png']
-        
-        # List PNG files in visual directory
-        plots = []
-        for file in os.listdir(visual_dir):
-            if file.endswith('.png') and file not in exclude_files:
-                # Get description or create default one
-                description = plot_descriptions.get(file, 
-                    file.replace('_', ' ').replace('.png', '').strip().title())
-                
-                plots.append({
-                    'name': file.replace('_', ' ').replace('.png', '').strip().title(),
-                    'filename': file,
-                    'description': description,
-                    'path': os.path.join(visual_dir, file)
-                })
-        
-        # Sort by filename for consistency
-        plots.sort(key=lambda x: x['filename'])
-        
-        print(f"✅ Found {len(plots)} visualizations in {visual_dir}")
+        # Indexed once per process - no directory listing per request
+        plots = [asset_manifest.to_json(plot) for plot in asset_manifest.plots]
         
         return jsonify({
             'success': True,
@@ -799,6 +1026,17 @@ def available_plots():
             'message': 'Error loading visualizations'
         }), 500
 
+@app.route('/assets/visual/<asset_name>')
+def serve_visual_asset(asset_name):
+    """Content-hashed visualization variant (never changes, cached for a year)"""
+    asset = asset_manifest.ensure().asset(asset_name)
+    if asset is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    response = send_file(asset.path, mimetype=asset.mimetype, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/api/plot/<filename>')
 def serve_plot(filename):
     """Serve visualization plots from visual directory"""
@@ -806,60 +1044,33 @@ def serve_plot(filename):
         # Security: prevent directory traversal
         filename = os.path.basename(filename)
         
-        # Check visual directory
-        visual_dir = os.path.join(WEBAPP_DIR, 'visual')
-        file_path = os.path.join(visual_dir, filename)
-        
-        if os.path.exists(file_path):
-            print(f"✅ Serving plot: {filename}")
-            return send_file(file_path, mimetype='image/png')
+        # Original training plot
+        visual = asset_manifest.ensure().by_filename.get(filename)
+        if visual is not None:
+            log(f"✅ Serving plot: {filename}")
+            return send_file(visual.path, mimetype='image/png')
         
         # If not found, try to generate dynamic plot
+        metadata = model_registry.current.metadata
         if filename == 'metrics_comparison' and metadata and 'metrics' in metadata:
-            # Generate metrics visualization
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            metrics_data = metadata.get('metrics', {})
-            if metrics_data:
-                metrics_names = list(metrics_data.keys())
-                metrics_values = list(metrics_data.values())
-                
-                colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12']
-                bars = ax.bar(metrics_names, metrics_values, color=colors[:len(metrics_names)])
-                
-                ax.set_title('Model Performance Metrics', fontsize=16, fontweight='bold', pad=20)
-                ax.set_ylabel('Score', fontsize=12)
-                ax.set_ylim(0, 1.0)
-                ax.grid(axis='y', alpha=0.3)
-                
-                # Add value labels on bars
-                for bar in bars:
-                    height = bar.get_height()
-                    ax.text(bar.get_x() + bar.get_width()/2., height,
-                           f'{height:.4f}',
-                           ha='center', va='bottom', fontsize=10)
-                
-                plt.tight_layout()
-                
-                # Convert to base64
-                img_buffer = BytesIO()
-                plt.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
-                img_buffer.seek(0)
-                plt.close()
-                
-                return send_file(img_buffer, mimetype='image/png')
+            plot = plot_cache.get('metrics_comparison', metadata)
+            if plot is not None:
+                return send_plot(plot)
         
         return jsonify({
             'error': 'Visualization not found',
             'message': f'Plot "{filename}" not available'
         }), 404
         
+    except RenderUnavailable as e:
+        return render_unavailable(e)
     except Exception as e:
         print(f"Error serving plot {filename}: {e}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
+def main():
+    """Development server (python -m webapp); production runs gunicorn, see gunicorn.conf.py"""
     print("🚀 Starting Gold Price Prediction API...")
     
     # Load models
@@ -0,0 +1,68 @@
+"""
+Model artifact loading
+In 'mmap' mode every pickle is converted once to an uncompressed joblib
+file, whose NumPy arrays are then memory-mapped read-only. Workers forked
+from a preloading gunicorn master share those pages instead of each
+holding a private copy.
+"""
+import os
+import tempfile
+import joblib
+
+from webapp.market_cache import private_dir
+
+ARTIFACT_MODES = ('pickle', 'mmap')
+
+
+def get_artifact_mode():
+    """Artifact loading mode from GOLDSENSE_ARTIFACT_MODE (pickle or mmap)"""
+    mode = os.environ.get('GOLDSENSE_ARTIFACT_MODE', 'pickle').lower()
+    if mode not in ARTIFACT_MODES:
+        print(f"⚠️  Unknown GOLDSENSE_ARTIFACT_MODE '{mode}', using pickle")
+        mode = 'pickle'
+    return mode
+
+
+def get_mmap_dir():
+    cache_dir = os.environ.get('GOLDSENSE_CACHE_DIR',
+                               os.path.join(tempfile.gettempdir(), 'goldsense_cache'))
+    return os.path.join(cache_dir, 'artifacts')
+
+
+def mmap_copy_path(path, mmap_dir):
+    """Path of the memory-mappable copy of path (changes when the source changes)"""
+    stat = os.stat(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(mmap_dir, f'{name}-{int(stat.st_mtime)}-{stat.st_size}.joblib')
+
+
+def convert_artifact(path, mmap_dir):
+    """Write an uncompressed joblib copy of path (once) and return its path"""
+    # The copies are unpickled, so only this user may write to the directory
+    private_dir(mmap_dir)
+    target = mmap_copy_path(path, mmap_dir)
+    if os.path.exists(target):
+        return target
+
+    obj = joblib.load(path)
+    fd, tmp_path = tempfile.mkstemp(dir=mmap_dir, suffix='.tmp')
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp_path, compress=0)
+        # Atomic so concurrently starting workers never load a partial file
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"🗜️  Converted {os.path.basename(path)} for memory mapping")
+    return target
+
+
+def load_artifact(path, mode='pickle'):
+    """Load a pickled model/scaler/metadata file in the given mode"""
+    if mode == 'mmap':
+        try:
+            return joblib.load(convert_artifact(path, get_mmap_dir()), mmap_mode='r')
+        except OSError as e:
+            print(f"⚠️  Memory mapping unavailable for {os.path.basename(path)} ({e}), loading normally")
+    return joblib.load(path)
@@ -0,0 +1,240 @@
+"""
+Visualization asset manifest
+Indexes webapp/visual once, on first use. Every training plot gets a
+content-hashed name plus resized thumbnail and full-size variants, written
+once to the asset directory. Hashed URLs never change content, so they are
+served with far-future, immutable cache headers and requests need no
+directory listing or existence checks.
+
+Variants that don't exist yet are converted in a background thread; until
+then plots are listed without them and the original images are served.
+Run `python -m webapp.asset_manifest` to build the variants ahead of time
+(e.g. during a Docker build) so they are all available straight away.
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Plot descriptions based on model training experiments
+PLOT_DESCRIPTIONS = {
+    'all_models_predictions.png': 'All Models Predictions Comparison - Shows predictions from all trained models (RF, XGBoost, LightGBM, LSTM, GRU, Ensemble)',
+    'all_predictions.png': 'Comprehensive Predictions Overview - Detailed view of all model predictions on test data',
+    'model_performance_comparison_all.png': 'Model Performance Metrics - Comparison of R², MAE, MSE, and RMSE across all models',
+    'model_comparison.png': 'Model Comparison Chart - Visual comparison of different ML model performances',
+    'prediction_vs_actual.png': 'Prediction vs Actual - How well the ensemble model predicts actual gold prices',
+    'enhanced_time_series_all.png': 'Time Series Analysis - Historical gold price trends with technical indicators',
+    'enhanced_correlation_heatmap.png': 'Enhanced Feature Correlation - Detailed correlation matrix of all features',
+    'feature_importance_enhanced.png': 'Feature Importance - Most influential features for price prediction',
+    'lstm_training_history.png': 'LSTM Training History - Training and validation loss over epochs',
+    'data_overview.png': 'Data Overview - Statistical summary of the dataset',
+    'time_series_analysis.png': 'Time Series Decomposition - Trend, seasonal, and residual components'
+}
+
+# Files to exclude
+EXCLUDE_FILES = ['correlation_heatmap (1).png', 'model_comparison (1).png']
+
+# Variant name -> maximum width in pixels
+VARIANT_WIDTHS = {'thumb': 480, 'full': 1600}
+
+# Encoders for variants: extension -> (Pillow format, mimetype, save options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 85, 'method': 4}),
+    'png': ('PNG', 'image/png', {'compress_level': 6}),  # optimize=True is 4x slower for <1% smaller
+}
+
+# Hashed asset URLs never change, so browsers and CDNs may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+Asset = namedtuple('Asset', ['path', 'mimetype'])
+
+VisualPlot = namedtuple('VisualPlot', [
+    'filename',     # Original file in webapp/visual
+    'name',
+    'description',
+    'path',         # Absolute path of the original
+    'digest',       # Content hash (first 12 hex digits of sha1)
+    'variants',     # {'thumb': {'webp': url, 'png': url}, 'full': {...}}
+])
+
+
+def _file_digest(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()[:12]
+
+
+def _title(filename):
+    return filename.replace('_', ' ').replace('.png', '').strip().title()
+
+
+def _webp_supported():
+    try:
+        from PIL import features
+        return features.check('webp')
+    except ImportError:
+        return False
+
+
+class AssetManifest:
+    """Index of the training visualizations and their resized variants"""
+
+    url_prefix = '/assets/visual/'
+
+    def __init__(self, visual_dir, asset_dir, workers=4):
+        self.visual_dir = visual_dir
+        self.asset_dir = asset_dir
+        self.workers = workers
+        self.plots = []        # VisualPlot, sorted by filename
+        self.by_filename = {}  # Original filename -> VisualPlot
+        self.assets = {}       # Hashed asset name -> Asset
+        self.formats = [ext for ext in VARIANT_FORMATS if ext != 'webp' or _webp_supported()]
+        self._pid = None
+        self._lock = threading.Lock()
+        self._missing = False  # Variants skipped by the last build(convert=False)
+
+    def ensure(self):
+        """
+        Index on first use in this process, without converting anything;
+        missing variants are then built in a background thread
+        """
+        if self._pid == os.getpid():
+            return self
+        with self._lock:
+            if self._pid == os.getpid():
+                return self
+            if not self.plots:
+                self.build(convert=False)
+            self._pid = os.getpid()
+            if self._missing:
+                threading.Thread(target=self.build, name='asset-variants', daemon=True).start()
+        return self
+
+    def build(self, convert=True):
+        """Index the visual directory and create any missing variants (convert=False skips them)"""
+        started = time.time()
+        self._missing = False
+        if not os.path.isdir(self.visual_dir):
+            print(f"⚠️  Visualizations directory not found: {self.visual_dir}")
+            return self
+        try:
+            os.makedirs(self.asset_dir, exist_ok=True)
+        except OSError as e:
+            print(f"⚠️  Asset directory unavailable ({e}), serving original images only")
+
+        files = sorted(f for f in os.listdir(self.visual_dir)
+                       if f.endswith('.png') and f not in EXCLUDE_FILES)
+        # Decoding and resizing release the GIL, so large images convert in parallel
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            plots = list(executor.map(lambda file: self._index(file, convert), files))
+
+        self.plots = [plot for plot in plots if plot is not None]
+        self.by_filename = {plot.filename: plot for plot in self.plots}
+        print(f"🖼️  Indexed {len(self.plots)} visualizations in {time.time() - started:.2f}s")
+        return self
+
+    def _index(self, filename, convert=True):
+        path = os.path.join(self.visual_dir, filename)
+        try:
+            digest = _file_digest(path)
+        except OSError as e:
+            print(f"⚠️  Could not index {filename}: {e}")
+            return None
+
+        stem = os.path.splitext(filename)[0]
+        variants = {}
+        image = None
+        try:
+            for variant, width in VARIANT_WIDTHS.items():
+                urls = {}
+                scaled = None
+                for ext in self.formats:
+                    asset_name = f'{stem}-{digest}.{variant}.{ext}'
+                    asset_path = os.path.join(self.asset_dir, asset_name)
+                    if not os.path.exists(asset_path):
+                        if not convert:
+                            self._missing = True
+                            break
+                        if scaled is None:
+                            if image is None:
+                                image = self._open(path)
+                            scaled = self._scale(image, width)
+                        self._write_variant(scaled, ext, asset_path)
+                    self.assets[asset_name] = Asset(asset_path, VARIANT_FORMATS[ext][1])
+                    urls[ext] = self.url_prefix + asset_name
+                if len(urls) == len(self.formats):
+                    variants[variant] = urls
+        except Exception as e:
+            # The original is still listed and served, just without resized copies
+            print(f"⚠️  Could not create variants for {filename}: {e}")
+
+        return VisualPlot(filename, _title(filename), PLOT_DESCRIPTIONS.get(filename, _title(filename)),
+                          path, digest, variants)
+
+    @staticmethod
+    def _open(path):
+        from PIL import Image
+        image = Image.open(path)
+        image.load()
+        return image
+
+    @staticmethod
+    def _scale(image, width):
+        """image resized down to width (aspect ratio kept)"""
+        from PIL import Image
+        if image.width <= width:
+            return image
+        height = max(1, round(image.height * width / image.width))
+        return image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+
+    def _write_variant(self, image, ext, asset_path):
+        pil_format, _, options = VARIANT_FORMATS[ext]
+        # Write to a temp file and rename so other workers never serve a partial image
+        fd, tmp_path = tempfile.mkstemp(dir=self.asset_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, pil_format, **options)
+            os.replace(tmp_path, asset_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def asset(self, asset_name):
+        """Asset for a hashed name from a variant URL (None if unknown)"""
+        return self.assets.get(asset_name)
+
+    def to_json(self, plot):
+        """available_plots entry for a plot"""
+        return {
+            'name': plot.name,
+            'filename': plot.filename,
+            'description': plot.description,
+            'path': plot.path,
+            'version': plot.digest,
+            'thumbnail': plot.variants.get('thumb'),
+            'full': plot.variants.get('full')
+        }
+
+
+def get_asset_dir():
+    cache_dir = os.environ.get('GOLDSENSE_CACHE_DIR',
+                               os.path.join(tempfile.gettempdir(), 'goldsense_cache'))
+    return os.environ.get('GOLDSENSE_ASSET_DIR', os.path.join(cache_dir, 'assets'))
+
+
+def create_asset_manifest(visual_dir):
+    """The manifest (built on first ensure()), writing variants to GOLDSENSE_ASSET_DIR"""
+    return AssetManifest(visual_dir, get_asset_dir())
+
+
+if __name__ == '__main__':
+    webapp_dir = os.path.dirname(os.path.abspath(__file__))
+    manifest = create_asset_manifest(os.path.join(webapp_dir, 'visual')).build()
+    print(f"✅ {len(manifest.assets)} assets in {manifest.asset_dir}")
+    sys.exit(0 if manifest.plots else 1)
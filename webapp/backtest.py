@@ -0,0 +1,307 @@
+"""
+Streaming backtest
+Replays stored daily history through the served model. Bars are read in
+chunks (from the price store or the bundled CSVs), the features
+fetch_latest_features would have built on each day are recomputed for the
+whole chunk with feature_engine, the chunk is predicted as one batch, and
+every next-day prediction is scored against the following close. Running
+and rolling-window MAE/RMSE/MAPE are reported after each chunk, next to a
+persistence forecast (tomorrow = today) for reference. Memory holds one
+chunk, a 29-bar tail and the rolling window, however long the history is.
+
+    python -m webapp.backtest                                 # whole stored history
+    python -m webapp.backtest --start 2015-01-01 --window 252
+    python -m webapp.backtest --csv gold=XAUUSD_daily.csv --csv silver=XAGUSD_daily.csv
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from webapp.feature_engine import (GOLD_COLUMNS, LOOKBACK, SECONDARY_COLUMNS, as_of_lookup, compute_features,
+                                   to_days)
+from webapp.fetch_engine import GOLD_TICKERS, MARKET_TICKERS
+from webapp.forecasting import predict_rows
+from webapp.price_store import PRICE_COLUMNS, SEED_FILES
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Input series -> stored ticker (the primary tickers fetch_latest_features downloads)
+SERIES = {'gold': GOLD_TICKERS[0][0], **{name: ticker for name, ticker, _ in MARKET_TICKERS}}
+
+# fetch_latest_features downloads 90 days, so older secondary bars are not seen when serving
+MAX_BAR_AGE_DAYS = 90
+
+DEFAULT_CHUNK = 5000
+DEFAULT_WINDOW = 252  # About one trading year
+BASELINE_SEED = 0     # Baseline noise is seeded so runs are repeatable
+
+
+def _has_rows(path):
+    """True when the CSV exists and has more than a header line"""
+    try:
+        with open(path) as f:
+            return bool(f.readline()) and bool(f.readline().strip())
+    except OSError:
+        return False
+
+
+def csv_chunks(path, chunk_size):
+    """Bars from a Date,Open,High,Low,Close,Volume CSV, chunk_size rows at a time"""
+    for chunk in pd.read_csv(path, chunksize=chunk_size, parse_dates=['Date'], index_col='Date'):
+        if len(chunk):
+            yield chunk
+
+
+def ordered(chunks):
+    """OHLCV chunks with normalized, strictly increasing dates (out-of-order rows are dropped)"""
+    last = None
+    for chunk in chunks:
+        chunk = chunk.reindex(columns=PRICE_COLUMNS)
+        index = pd.DatetimeIndex(chunk.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        chunk.index = index.normalize()
+        chunk = chunk[~chunk.index.duplicated(keep='last')].sort_index()
+        if last is not None:
+            chunk = chunk[chunk.index > last]
+        if len(chunk):
+            last = chunk.index[-1]
+            yield chunk
+
+
+def open_sources(store=None, chunk_size=DEFAULT_CHUNK, paths=None, project_dir=PROJECT_DIR):
+    """
+    {series: (description, chunk iterator)} for the backtest inputs. A path
+    given for a series wins, then the price store, then the bundled CSV.
+    Raises ValueError when there is no gold history.
+    """
+    paths = paths or {}
+    sources = {}
+    for name, ticker in SERIES.items():
+        seed = os.path.join(project_dir, SEED_FILES[ticker]) if ticker in SEED_FILES else None
+        if paths.get(name):
+            sources[name] = (paths[name], csv_chunks(paths[name], chunk_size))
+        elif store is not None and store.last_date(ticker) is not None:
+            sources[name] = (f'price store {ticker}', store.iter_chunks(ticker, chunk_size))
+        elif seed and _has_rows(seed):
+            sources[name] = (os.path.basename(seed), csv_chunks(seed, chunk_size))
+    if 'gold' not in sources:
+        raise ValueError(f"No {SERIES['gold']} history in the price store or {SEED_FILES[SERIES['gold']]}")
+    return sources
+
+
+class AsOfSeries:
+    """
+    Latest bar on or before each requested day from a series read forward in
+    chunks, the way build_features sees it (last non-missing value per
+    column). Days must be requested in order; bars that can no longer be
+    the latest are dropped.
+    """
+
+    def __init__(self, chunks, columns, max_age=MAX_BAR_AGE_DAYS):
+        self._chunks = ordered(chunks) if chunks is not None else None
+        self.columns = columns  # {source column: raw feature column}
+        self.max_age = max_age
+        self._dates = np.empty(0, dtype=np.int64)
+        self._values = np.empty((0, len(columns)))
+
+    def _read_until(self, day):
+        while self._chunks is not None and (not len(self._dates) or self._dates[-1] < day):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._chunks = None
+                break
+            values = np.concatenate((self._values, chunk[list(self.columns)].to_numpy(dtype=np.float64)))
+            self._values = pd.DataFrame(values).ffill().to_numpy()
+            self._dates = np.concatenate((self._dates, to_days(chunk.index)))
+
+    def align(self, days):
+        """{raw column: values on each day} (NaN before the first bar or when it is too old)"""
+        if len(days):
+            self._read_until(days[-1])
+        out, pos = as_of_lookup(self._dates, self._values, days, self.max_age)
+        if len(days) and len(self._dates):
+            keep = max(int(pos[-1]), 0)
+            self._dates, self._values = self._dates[keep:], self._values[keep:]
+        return {name: out[:, i] for i, name in enumerate(self.columns.values())}
+
+
+class ErrorStats:
+    """Running and rolling-window MAE, RMSE and MAPE of streamed predictions"""
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.sums = np.zeros(3)  # |error|, error², |error| / actual
+        self._recent = np.empty((0, 3))
+
+    def add(self, predicted, actual):
+        error = predicted - actual
+        terms = np.column_stack((np.abs(error), error * error, np.abs(error / actual) * 100))
+        self.count += len(terms)
+        self.sums += terms.sum(axis=0)
+        self._recent = np.concatenate((self._recent, terms[-self.window:]))[-self.window:]
+
+    @staticmethod
+    def _metrics(count, sums):
+        if not count:
+            return {'n': 0, 'mae': None, 'rmse': None, 'mape': None}
+        return {'n': int(count), 'mae': float(sums[0] / count),
+                'rmse': float(np.sqrt(sums[1] / count)), 'mape': float(sums[2] / count)}
+
+    def report(self):
+        return {**self._metrics(self.count, self.sums),
+                'rolling': self._metrics(len(self._recent), self._recent.sum(axis=0))}
+
+
+def run_backtest(bundle, sources, start=None, end=None, window=DEFAULT_WINDOW, seed=BASELINE_SEED, run=None):
+    """
+    Backtest `bundle` over `sources` (from open_sources), yielding events:
+    'start', one 'chunk' per gold chunk with the metrics so far, then
+    'summary'. Predictions are made for days from `start` through `end`
+    and scored against the next close up to `end`. Model calls go
+    through run(fn, *args) when given (e.g. the inference pool).
+    """
+    run = run or (lambda fn, *args: fn(*args))
+    started = time.time()
+    start = pd.Timestamp(start) if start else None
+    end = pd.Timestamp(end) if end else None
+    rng = np.random.default_rng(seed)
+    secondary = {name: AsOfSeries(sources[name][1] if name in sources else None, columns)
+                 for name, columns in SECONDARY_COLUMNS.items()}
+    model_stats, persistence_stats = ErrorStats(window), ErrorStats(window)
+
+    yield {'event': 'start', 'model_version': bundle.version, 'window': window,
+           'start': start.date().isoformat() if start else None,
+           'end': end.date().isoformat() if end else None,
+           'series': {name: description for name, (description, _) in sources.items()}}
+
+    tail, position, pending = None, 0, None
+    bars = predicted = from_model = 0
+    first = last = None
+    for chunk in ordered(sources['gold'][1]):
+        if end is not None and chunk.index[0] > end:
+            break
+        chunk = chunk[chunk['Close'].notna()]
+        if end is not None:
+            chunk = chunk.loc[:end]
+        if not len(chunk):
+            continue
+        bars += len(chunk)
+
+        raw = {f'Gold_{column}': chunk[column].to_numpy(dtype=np.float64) for column in PRICE_COLUMNS}
+        days = to_days(chunk.index)
+        for aligner in secondary.values():
+            raw.update(aligner.align(days))
+        raw = pd.DataFrame(raw, index=chunk.index)
+        frame = raw if tail is None else pd.concat([tail, raw])
+        # A missing open/high/low/volume means the last known one, as in build_features
+        frame[list(GOLD_COLUMNS)] = frame[list(GOLD_COLUMNS)].ffill()
+        carried = len(frame) - len(raw)
+        features = {name: values[carried:] for name, values in compute_features(frame, position).items()}
+
+        # Days with 30 bars of history on or after start; once reached, every later day
+        warm = position + carried + np.arange(len(raw)) >= LOOKBACK
+        if start is not None:
+            warm &= chunk.index >= start
+        first_row = int(np.argmax(warm)) if warm.any() else len(raw)
+        close = features['Gold_Close']
+        tail = frame.iloc[-LOOKBACK:]
+        position += len(frame) - len(tail)
+
+        n = len(raw) - first_row
+        predictions = np.empty(0)
+        if n:
+            columns = {name: values[first_row:] for name, values in features.items()}
+            X = bundle.layout.fill_columns(columns, n)[0] if bundle.layout is not None else np.empty((n, 0))
+            predictions, mask = run(predict_rows, X, columns['Gold_Close'], columns['Gold_MA7'],
+                                    columns['Gold_MA14'], bundle.model, bundle.scaler_X, bundle.scaler_y,
+                                    rng.uniform(-0.003, 0.005, n), 'backtest')
+            predicted += n
+            from_model += int(mask.sum())
+            if first is None:
+                first = chunk.index[first_row]
+
+        # Each prediction is scored against the next close, which may be in the next chunk
+        made = predictions if pending is None else np.concatenate(([pending[0]], predictions))
+        today = close[first_row:] if pending is None else np.concatenate(([pending[1]], close))
+        if len(made):
+            actual = close[first_row + (0 if pending is not None else 1):]
+            if len(actual):
+                model_stats.add(made[:-1], actual)
+                persistence_stats.add(today[:-1], actual)
+                last = chunk.index[-1]
+            pending = (made[-1], today[-1])
+
+        yield {'event': 'chunk', 'through': chunk.index[-1].date().isoformat(), 'bars': bars,
+               'predicted': predicted, 'model_rows': from_model,
+               'model': model_stats.report(), 'persistence': persistence_stats.report()}
+
+    seconds = time.time() - started
+    yield {'event': 'summary', 'bars': bars, 'predicted': predicted, 'model_rows': from_model,
+           'first': first.date().isoformat() if first is not None else None,
+           'last': last.date().isoformat() if last is not None else None,
+           'model': model_stats.report(), 'persistence': persistence_stats.report(),
+           'seconds': round(seconds, 3), 'bars_per_second': round(bars / seconds, 1) if seconds else None}
+
+
+def _format(metrics):
+    if not metrics['n']:
+        return 'n/a'
+    return f"MAE ${metrics['mae']:.2f}  RMSE ${metrics['rmse']:.2f}  MAPE {metrics['mape']:.2f}%"
+
+
+def main(argv=None):
+    from webapp.model_registry import ModelRegistry
+    from webapp.price_store import create_price_store
+
+    parser = argparse.ArgumentParser(description='Backtest the served model over stored daily history')
+    parser.add_argument('--start', help='First day to predict (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Last day to score (YYYY-MM-DD)')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help='Bars read and predicted per batch')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help='Predictions in the rolling metrics')
+    parser.add_argument('--seed', type=int, default=BASELINE_SEED, help='Seed for the baseline noise')
+    parser.add_argument('--models', default=os.path.join(PROJECT_DIR, 'webapp', 'models'),
+                        help='Model artifacts directory')
+    parser.add_argument('--csv', action='append', default=[], metavar='SERIES=PATH',
+                        help=f"Read a series from a CSV instead ({', '.join(SERIES)})")
+    parser.add_argument('--json', action='store_true', help='Print the events as JSON lines')
+    args = parser.parse_args(argv)
+
+    paths = dict(item.split('=', 1) for item in args.csv)
+    unknown = set(paths) - set(SERIES)
+    if unknown:
+        parser.error(f"unknown series: {', '.join(sorted(unknown))}")
+
+    bundle = ModelRegistry(args.models).load()
+    if bundle is None:
+        return 1
+    try:
+        sources = open_sources(create_price_store(PROJECT_DIR), args.chunk, paths)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    for event in run_backtest(bundle, sources, args.start, args.end, args.window, args.seed):
+        if args.json:
+            print(json.dumps(event))
+        elif event['event'] == 'start':
+            print(f"📊 Backtesting model v{event['model_version']} on "
+                  f"{', '.join(f'{k}: {v}' for k, v in event['series'].items())}")
+        elif event['event'] == 'chunk':
+            print(f"   through {event['through']}: {event['predicted']} predictions, "
+                  f"rolling {_format(event['model']['rolling'])}")
+        else:
+            print(f"✅ {event['predicted']} predictions ({event['model_rows']} model) "
+                  f"from {event['first']} to {event['last']} in {event['seconds']:.2f}s")
+            print(f"   model        {_format(event['model'])}")
+            print(f"   persistence  {_format(event['persistence'])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,470 @@
+"""
+Feature engine
+The single definition of the model's market features, used for serving
+(build_features), batch and historical predictions, the backtest, recursive
+forecasts and training. Two ways to compute the same numbers:
+
+- vectorized: every day of a price history in one NumPy pass, with rolling
+  means and standard deviations from cumulative sums (O(n) for any length)
+- incremental: FeatureState keeps the latest row current as daily bars and
+  intraday ticks arrive, each one an O(1) ring-buffer update
+  (RollingGoldState), with no pandas involved
+
+Input rows are the raw daily values known on each day: gold OHLCV and the
+latest silver, oil and dollar index bars on or before it.
+"""
+import math
+from array import array
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Rolling windows used by the gold technical indicators
+MA_WINDOWS = (7, 14, 30)
+HISTORY_LENGTH = max(MA_WINDOWS)
+
+# Bars before a row that the technical indicators look back over
+LOOKBACK = HISTORY_LENGTH - 1
+
+# Feature dict key holding recent gold closes (oldest first)
+HISTORY_KEY = 'Gold_Close_History'
+
+# Feature dict key holding the gold bar's day (days since 1970-01-01)
+DAY_KEY = 'Gold_Day'
+
+# Raw inputs per day; silver/oil/DXY are NaN before their first bar
+GOLD_COLUMNS = ('Gold_Open', 'Gold_High', 'Gold_Low', 'Gold_Close', 'Gold_Volume')
+SILVER_COLUMNS = ('Silver_Open', 'Silver_High', 'Silver_Low', 'Silver_Close', 'Silver_Volume')
+RAW_COLUMNS = GOLD_COLUMNS + SILVER_COLUMNS + ('Oil_Close', 'DXY_Close')
+
+# Raw columns taken from each secondary series: {series: {source column: raw column}}
+SECONDARY_COLUMNS = {
+    'silver': {column.split('_')[1]: column for column in SILVER_COLUMNS},
+    'oil': {'Close': 'Oil_Close'},
+    'usd': {'Close': 'DXY_Close'},
+}
+
+# Raw columns updated by a bar or tick of each series
+BAR_COLUMNS = {'gold': {column.split('_')[1]: column for column in GOLD_COLUMNS}, **SECONDARY_COLUMNS}
+
+# Values used when a series has no data
+SILVER_DEFAULTS = {'Silver_Open': 31.0, 'Silver_High': 31.5, 'Silver_Low': 30.5,
+                   'Silver_Close': 31.0, 'Silver_Volume': 100000.0}
+RATIO_DEFAULTS = {'G/S_Open': 75.0, 'G/S_High': 76.0, 'G/S_Low': 74.0, 'G/S_Close': 75.0}
+VOLATILITY_DEFAULTS = {7: 10.0, 14: 15.0, 30: 20.0}
+OIL_DEFAULT = 75.0
+DXY_DEFAULT = 105.0
+GOLD_OIL_DEFAULT = 30.0
+
+# Day number meaning "no cut-off" for as-of lookups
+LATEST = np.iinfo(np.int64).max
+EPOCH = date(1970, 1, 1)
+
+
+def to_days(index):
+    """Days since 1970-01-01 for a DatetimeIndex (time of day and time zone dropped)"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values.astype('datetime64[D]').astype(np.int64)
+
+
+def day_number(when):
+    """
+    Day number (as to_days) of a date, datetime or ISO string, using the
+    date as written (time zone dropped), or of epoch seconds in UTC
+    """
+    if isinstance(when, (int, float)):
+        when = datetime.fromtimestamp(when, timezone.utc)
+    elif isinstance(when, str):
+        when = datetime.fromisoformat(when[:-1] if when.endswith('Z') else when)
+    if isinstance(when, datetime):
+        when = when.date()
+    return (when - EPOCH).days
+
+
+def rolling_mean_std(values, window):
+    """
+    Trailing mean and sample (ddof=1) standard deviation over `window` values,
+    NaN until a full window is available. Values are taken relative to the
+    first one so the running sum of squares stays precise over long series.
+    """
+    n = len(values)
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    if n < window:
+        return mean, std
+    shifted = values - values[0]
+    sums = np.concatenate(([0.0], np.cumsum(shifted)))
+    sumsqs = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    s = sums[window:] - sums[:-window]
+    sq = sumsqs[window:] - sumsqs[:-window]
+    mean[window - 1:] = s / window + values[0]
+    std[window - 1:] = np.sqrt(np.maximum((sq - s * s / window) / (window - 1), 0.0))
+    return mean, std
+
+
+def _column(raw, name, n):
+    values = raw.get(name) if hasattr(raw, 'get') else None
+    if values is None:
+        return np.full(n, np.nan)
+    return np.asarray(values, dtype=np.float64)
+
+
+def gold_features(raw, position=0):
+    """
+    Gold OHLCV, moving averages, volatilities and returns for every row of
+    `raw` (oldest first). `position` is the number of bars before raw's
+    first row: rows with fewer than 30 bars of history get default
+    indicators, and rows with enough history whose 29 previous bars are not
+    in `raw` get NaN ones, so carry those bars over when feeding chunks.
+    """
+    n = len(raw['Gold_Close'])
+    features = {name: np.nan_to_num(_column(raw, name, n)) for name in GOLD_COLUMNS}
+    close = features['Gold_Close']
+    warm = position + np.arange(n) >= LOOKBACK
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for w in MA_WINDOWS:
+            mean, std = rolling_mean_std(close, w)
+            features[f'Gold_MA{w}'] = np.where(warm, mean, close)
+            features[f'Gold_Volatility_{w}'] = np.where(warm, std, VOLATILITY_DEFAULTS[w])
+        for days in (1, 7):
+            change = np.full(n, np.nan)
+            change[days:] = (close[days:] - close[:-days]) / close[:-days] * 100
+            features[f'Gold_Return_{days}d'] = np.where(warm, change, 0.0)
+    return features
+
+
+def cross_features(features, raw):
+    """
+    Add the silver, oil and dollar index features and the gold ratios to
+    `features` (gold columns already computed) from raw secondary values
+    for the same rows. Returns features.
+    """
+    n = len(features['Gold_Close'])
+    no_silver = np.isnan(_column(raw, 'Silver_Close', n))
+    for name in SILVER_COLUMNS:
+        features[name] = np.where(no_silver, SILVER_DEFAULTS[name], np.nan_to_num(_column(raw, name, n)))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_silver = features['Silver_Close'] > 0
+        for part in ('Open', 'High', 'Low', 'Close'):
+            silver = features[f'Silver_{part}']
+            ratio = np.where(silver > 0, features[f'Gold_{part}'] / silver, 0.0)
+            features[f'G/S_{part}'] = np.where(has_silver, ratio, RATIO_DEFAULTS[f'G/S_{part}'])
+
+        oil = _column(raw, 'Oil_Close', n)
+        features['Oil_Close'] = np.where(np.isnan(oil), OIL_DEFAULT, oil)
+        dxy = _column(raw, 'DXY_Close', n)
+        features['DXY_Close'] = np.where(np.isnan(dxy), DXY_DEFAULT, dxy)
+        features['Gold_Oil_Ratio'] = np.where(features['Oil_Close'] > 0,
+                                              features['Gold_Close'] / features['Oil_Close'], GOLD_OIL_DEFAULT)
+    return features
+
+
+def compute_features(raw, position=0):
+    """
+    Feature columns ({name: array}) for every row of `raw`, a DataFrame or
+    dict of RAW_COLUMNS arrays ordered oldest first, with gold prices already
+    in USD per ounce. See gold_features for `position`.
+    """
+    return cross_features(gold_features(raw, position), raw)
+
+
+def feature_frame(raw):
+    """compute_features over a whole RAW_COLUMNS DataFrame, as a DataFrame on the same index (training)"""
+    return pd.DataFrame(compute_features(raw), index=raw.index)
+
+
+def as_of_lookup(dates, values, days, max_age=None):
+    """
+    Rows of `values` (dated `dates`, ascending day numbers) that are the
+    latest on or before each of `days`; NaN where there is none, or where it
+    is more than max_age days old. Returns (rows, positions).
+    """
+    out = np.full((len(days), values.shape[1]), np.nan)
+    pos = np.searchsorted(dates, days, 'right') - 1
+    found = pos >= 0
+    if max_age is not None:
+        found[found] = days[found] - dates[pos[found]] <= max_age
+    out[found] = values[pos[found]]
+    return out, pos
+
+
+def _source_column(df, column):
+    """The column build_features has always read: `column`, else Adj Close, else Close"""
+    for name in (column, 'Adj Close', 'Close'):
+        if name in df.columns:
+            return df[name]
+    return None
+
+
+def series_values(df, columns, days):
+    """
+    {raw column: values on each day} from a downloaded series, using the last
+    non-missing value of each column on or before the day (NaN when the
+    series has no data).
+    """
+    n = len(days)
+    if df is None or len(df) == 0:
+        return {raw: np.full(n, np.nan) for raw in columns.values()}
+    values = np.full((len(df), len(columns)), np.nan)
+    for i, source in enumerate(columns):
+        column = _source_column(df, source)
+        if column is not None:
+            values[:, i] = column.ffill().to_numpy(dtype=np.float64, na_value=np.nan)
+    found, _ = as_of_lookup(to_days(df.index), values, days)
+    return {raw: found[:, i] for i, raw in enumerate(columns.values())}
+
+
+def _as_of_days(as_of):
+    return np.array([LATEST if d is None else to_days([pd.Timestamp(d)])[0] for d in as_of], dtype=np.int64)
+
+
+def defaulted_series(market_data, as_of=(None,)):
+    """
+    Per entry of `as_of`, the secondary series ('silver', 'oil', 'usd') with
+    no bar on or before it, whose features market_features filled with defaults
+    """
+    days = _as_of_days(as_of)
+    missing = [[] for _ in days]
+    for series, columns in SECONDARY_COLUMNS.items():
+        values = series_values(market_data.get(series), columns, days)
+        close = next(v for raw, v in values.items() if raw.endswith('_Close'))
+        for i in np.flatnonzero(np.isnan(close)):
+            missing[i].append(series)
+    return missing
+
+
+def market_features(market_data, as_of=(None,)):
+    """
+    Feature dicts from one download (fetch_engine.fetch), one per entry of
+    `as_of` (dates; None = the latest bars), all computed in one pass over
+    the history. Entries with no gold bar on or before them are None.
+    """
+    gold, multiplier, _, _ = market_data['gold']
+    days = _as_of_days(as_of)
+
+    close = _source_column(gold, 'Close')
+    gold = gold[close.notna()] if close is not None else gold.iloc[:0]
+    raw = {}
+    for name in GOLD_COLUMNS:
+        values = _source_column(gold, name.split('_')[1])
+        values = (values.ffill().to_numpy(dtype=np.float64, na_value=np.nan) if values is not None
+                  else np.zeros(len(gold)))
+        raw[name] = values if name == 'Gold_Volume' else values * multiplier
+    technical = gold_features(raw)
+
+    gold_days = to_days(gold.index)
+    _, rows = as_of_lookup(gold_days, np.empty((len(gold), 0)), days)
+    picked = {name: values[np.maximum(rows, 0)] for name, values in technical.items()} if len(gold) else None
+    secondary = {}
+    for series, columns in SECONDARY_COLUMNS.items():
+        secondary.update(series_values(market_data.get(series), columns, days))
+    if picked is not None:
+        cross_features(picked, secondary)
+
+    results = []
+    closes = raw['Gold_Close']
+    for i, row in enumerate(rows):
+        if row < 0:
+            results.append(None)
+            continue
+        features = {name: float(values[i]) for name, values in picked.items()}
+        features[DAY_KEY] = int(gold_days[row])
+        if row >= LOOKBACK:
+            features[HISTORY_KEY] = tuple(float(v) for v in closes[row - LOOKBACK:row + 1])
+        results.append(features)
+    return results
+
+
+def seed_history(features):
+    """
+    Recent gold closes from the feature dict. When only the summary
+    features are known, build a 30-day series that reproduces the current
+    close, MA7, MA14 and MA30 exactly.
+    """
+    history = features.get(HISTORY_KEY)
+    if history is not None and len(history) >= HISTORY_LENGTH:
+        return np.asarray(history[-HISTORY_LENGTH:], dtype=np.float64)
+
+    close = float(features.get('Gold_Close', 2000))
+    ma7 = float(features.get('Gold_MA7', close))
+    ma14 = float(features.get('Gold_MA14', ma7))
+    ma30 = float(features.get('Gold_MA30', ma14))
+    series = np.empty(HISTORY_LENGTH, dtype=np.float64)
+    series[:16] = (30 * ma30 - 14 * ma14) / 16
+    series[16:23] = (14 * ma14 - 7 * ma7) / 7
+    series[23:29] = (7 * ma7 - close) / 6
+    series[29] = close
+    return series
+
+
+class RollingGoldState:
+    """
+    Ring buffer of the last 30 gold closes with a running mean and sum of
+    squared deviations per window (Welford's update, sliding form), so
+    appending a close or revising the latest one updates every indicator
+    in O(1) without the cancellation of a plain sum of squares.
+    """
+
+    __slots__ = ('buffer', 'pos', 'means', 'm2s')
+
+    def __init__(self, closes):
+        closes = np.asarray(closes, dtype=np.float64)[-HISTORY_LENGTH:]
+        self.buffer = array('d', closes)
+        self.pos = 0  # Index of the oldest value
+        self.means = {}
+        self.m2s = {}
+        for w in MA_WINDOWS:
+            window = closes[-w:]
+            self.means[w] = mean = float(window.mean())
+            self.m2s[w] = float(np.dot(window - mean, window - mean))
+
+    def lag(self, k):
+        """Close k days ago (0 = latest)"""
+        return self.buffer[(self.pos - 1 - k) % HISTORY_LENGTH]
+
+    def _swap(self, w, leaving, value):
+        """Replace `leaving` with `value` in window w's mean and M2"""
+        mean = self.means[w]
+        new_mean = mean + (value - leaving) / w
+        self.m2s[w] += (value - leaving) * (value - new_mean + leaving - mean)
+        self.means[w] = new_mean
+
+    def append(self, close):
+        """A new day's close: each window drops its oldest value"""
+        for w in MA_WINDOWS:
+            self._swap(w, self.lag(w - 1), close)
+        self.buffer[self.pos] = close
+        self.pos = (self.pos + 1) % HISTORY_LENGTH
+
+    def replace(self, close):
+        """Revise the latest close (an intraday tick on the same day)"""
+        latest = (self.pos - 1) % HISTORY_LENGTH
+        for w in MA_WINDOWS:
+            self._swap(w, self.buffer[latest], close)
+        self.buffer[latest] = close
+
+    def history(self):
+        """The 30 closes, oldest first"""
+        return np.array(self.buffer[self.pos:] + self.buffer[:self.pos])
+
+    def indicators(self):
+        """Rolling features for the latest close (pandas-style ddof=1 std)"""
+        close = self.lag(0)
+        values = {'Gold_Close': close}
+        for w in MA_WINDOWS:
+            values[f'Gold_MA{w}'] = self.means[w]
+            values[f'Gold_Volatility_{w}'] = math.sqrt(max(self.m2s[w] / (w - 1), 0.0))
+        for days in (1, 7):
+            previous = self.lag(days)
+            values[f'Gold_Return_{days}d'] = (close - previous) / previous * 100 if previous else math.nan
+        return values
+
+
+def path_indicators(closes):
+    """
+    Rolling features for the latest close of each row of `closes` (a
+    (paths, >= 30) matrix, oldest first) - RollingGoldState.indicators for
+    many simulated paths at once.
+    """
+    close = closes[:, -1]
+    values = {'Gold_Close': close}
+    for w in MA_WINDOWS:
+        window = closes[:, -w:]
+        values[f'Gold_MA{w}'] = window.mean(axis=1)
+        values[f'Gold_Volatility_{w}'] = window.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for days in (1, 7):
+            previous = closes[:, -1 - days]
+            values[f'Gold_Return_{days}d'] = (close - previous) / previous * 100
+    return values
+
+
+class FeatureState:
+    """
+    The latest feature row, kept current as bars and intraday ticks arrive.
+    Each series (gold, silver, oil, usd) holds its current bar and the day
+    it is for; gold also feeds the rolling windows. A bar or tick for a
+    later day starts a new bar, one for the current day revises it (O(1)
+    either way), older ones are ignored. features() gives the same dict
+    market_features would build from the full history.
+    """
+
+    __slots__ = ('gold', 'raw', 'days')
+
+    def __init__(self, features):
+        """Start from a feature dict (market_features / build_features output)"""
+        self.gold = RollingGoldState(seed_history(features))
+        self.raw = {name: float(features.get(name, np.nan)) for name in RAW_COLUMNS}
+        # Secondary values are the latest on or before the gold bar's day
+        self.days = dict.fromkeys(BAR_COLUMNS, features.get(DAY_KEY))
+
+    def _starts_bar(self, series, day):
+        """True for a new bar, False for the current one, None for an older day"""
+        current = self.days[series]
+        if day is None or current is None or day > current:
+            return True
+        return False if day == current else None
+
+    def add_bar(self, series, bar, day=None):
+        """
+        A daily bar ({'Open': .., 'Close': .., ...}) for 'gold' (in USD per
+        ounce), 'silver', 'oil' or 'usd', dated by day number (None = the
+        next day). Missing values keep the last one. Returns True if applied.
+        """
+        new_bar = self._starts_bar(series, day)
+        if new_bar is None:
+            return False
+        if series == 'gold':
+            close = float(bar['Close'])
+            self.gold.append(close) if new_bar else self.gold.replace(close)
+        for source, name in BAR_COLUMNS[series].items():
+            value = bar.get(source)
+            if value is not None and not math.isnan(value):
+                self.raw[name] = float(value)
+        if day is not None:
+            self.days[series] = day
+        return True
+
+    def add_tick(self, series, price, day, volume=0.0):
+        """
+        An intraday trade or quote for `series` on `day`: the price becomes
+        the bar's close (and its open on a new day), widens its high/low and
+        adds `volume`. Returns True if applied.
+        """
+        new_bar = self._starts_bar(series, day)
+        if new_bar is None:
+            return False
+        price = float(price)
+        if series == 'gold':
+            self.gold.append(price) if new_bar else self.gold.replace(price)
+        raw = self.raw
+        columns = BAR_COLUMNS[series]
+        for part in ('Open', 'High', 'Low', 'Close', 'Volume'):
+            name = columns.get(part)
+            if name is None:
+                continue
+            value = raw[name]
+            if part == 'Volume':
+                raw[name] = float(volume) + (0.0 if new_bar or math.isnan(value) else value)
+            elif new_bar or part == 'Close' or math.isnan(value):
+                raw[name] = price
+            elif part == 'High':
+                raw[name] = max(value, price)
+            elif part == 'Low':
+                raw[name] = min(value, price)
+        self.days[series] = day
+        return True
+
+    def features(self):
+        raw = {name: np.array([value]) for name, value in self.raw.items()}
+        values = {name: np.nan_to_num(raw[name]) for name in GOLD_COLUMNS}
+        values.update((name, np.array([value])) for name, value in self.gold.indicators().items())
+        features = {name: float(v[0]) for name, v in cross_features(values, raw).items()}
+        features[HISTORY_KEY] = tuple(self.gold.history().tolist())
+        if self.days['gold'] is not None:
+            features[DAY_KEY] = self.days['gold']
+        return features
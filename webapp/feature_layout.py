@@ -0,0 +1,107 @@
+"""
+Compiled feature layout
+Built once from feature_names when models load; turns feature dicts into
+model input rows without rebuilding Python lists on every prediction.
+"""
+import math
+import threading
+from operator import itemgetter
+import numpy as np
+
+# Compiled getters kept for distinct sets of present feature names
+MAX_PLANS = 32
+
+
+class FeatureLayout:
+    """Maps feature dicts onto the model's input column order"""
+
+    def __init__(self, feature_names, default=0.0, dtype=np.float64):
+        self.names = tuple(feature_names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.width = len(self.names)
+        self.dtype = dtype
+        self.defaults = np.full(self.width, default, dtype=dtype)
+        self.defaults.flags.writeable = False
+        # Fetches every feature in one C-level call when none are missing
+        self._getter = itemgetter(*self.names) if self.width > 1 else (lambda d: (d[self.names[0]],))
+        self._local = threading.local()
+        self._plans = {}
+
+    def _buffer(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = np.empty((1, self.width), dtype=self.dtype)
+        return buffer
+
+    def fill(self, features, out=None):
+        """
+        Write features into a (1, width) row and return (row, missing_mask).
+        Without `out` the row is a per-thread buffer that is overwritten by
+        the next call, so use it before filling another row.
+        Bit i of missing_mask is set when names[i] was absent (filled with the default).
+        """
+        row = self._buffer() if out is None else out
+        vector = row.reshape(-1)
+        try:
+            vector[:] = self._getter(features)
+            missing = 0
+        except KeyError:
+            # Some features absent: use a getter compiled for this set of keys
+            getter, positions, missing = self._partial_plan(features)
+            vector[:] = self.defaults
+            vector[positions] = getter(features)
+        # Replace NaN/inf in place (a single sum is cheaper than isfinite().all() on one row)
+        if not math.isfinite(vector.sum()):
+            np.nan_to_num(vector, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        return row, missing
+
+    def _partial_plan(self, features):
+        """(getter, positions, missing_mask) for the feature names present in features"""
+        keys = frozenset(features)
+        plan = self._plans.get(keys)
+        if plan is None:
+            present = [i for i, name in enumerate(self.names) if name in keys]
+            missing = sum(1 << i for i, name in enumerate(self.names) if name not in keys)
+            names = [self.names[i] for i in present]
+            if len(names) > 1:
+                getter = itemgetter(*names)
+            elif names:
+                getter = lambda d, name=names[0]: (d[name],)
+            else:
+                getter = lambda d: ()
+            plan = (getter, np.array(present, dtype=np.intp), missing)
+            if len(self._plans) >= MAX_PLANS:
+                self._plans.clear()
+            self._plans[keys] = plan
+        return plan
+
+    def fill_matrix(self, feature_dicts):
+        """Stack many feature dicts into an (n, width) matrix; returns (X, masks)"""
+        X = np.empty((len(feature_dicts), self.width), dtype=self.dtype)
+        masks = [self.fill(features, out=X[i])[1] for i, features in enumerate(feature_dicts)]
+        return X, masks
+
+    def fill_columns(self, columns, n):
+        """
+        Build an (n, width) matrix from feature columns ({name: array of n}).
+        Returns (X, missing_mask); the mask is shared by every row.
+        """
+        X = np.empty((n, self.width), dtype=self.dtype)
+        X[:] = self.defaults
+        missing = 0
+        for i, name in enumerate(self.names):
+            values = columns.get(name)
+            if values is None:
+                missing |= 1 << i
+            else:
+                X[:, i] = values
+        np.nan_to_num(X, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        return X, missing
+
+    def missing_names(self, mask):
+        """Feature names flagged in a missing mask"""
+        return [name for i, name in enumerate(self.names) if mask >> i & 1]
+
+    @staticmethod
+    def count_missing(mask):
+        return bin(mask).count('1')
@@ -0,0 +1,176 @@
+"""
+Feature snapshots
+A background thread rebuilds the market feature dict on a schedule and
+publishes it as an immutable, versioned snapshot. Request handlers read the
+latest snapshot instead of downloading market data themselves.
+Between rebuilds, intraday bars and ticks are applied to a FeatureState
+seeded from the last build and published without a download.
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from types import MappingProxyType
+
+from webapp.feature_engine import DAY_KEY, FeatureState
+
+
+def feature_digest(features):
+    """Stable hash of a feature dict (order independent)"""
+    items = sorted((str(k), repr(v)) for k, v in features.items())
+    return hashlib.sha1(repr(items).encode('utf-8')).hexdigest()
+
+
+class FeatureSnapshot:
+    """One published set of market features (read-only)"""
+
+    __slots__ = ('version', 'features', 'digest', 'created_at', 'created_ts')
+
+    def __init__(self, version, features):
+        self.version = version
+        self.features = MappingProxyType(dict(features))
+        self.digest = feature_digest(features)
+        self.created_at = datetime.now()
+        self.created_ts = time.time()
+
+    def age_seconds(self):
+        return time.time() - self.created_ts
+
+
+class SnapshotRefresher:
+    """Rebuilds feature snapshots every `interval` seconds in a daemon thread"""
+
+    def __init__(self, build_features, interval=300, max_age=900):
+        self.build_features = build_features
+        self.interval = interval
+        self.max_age = max_age
+        self.last_error = None
+        self._snapshot = None
+        self._version = 0
+        self._built_ts = None  # When the last download-backed build was published
+        self._pid = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.RLock()
+        # Guards publishing and the live state; never held while downloading
+        self._live_lock = threading.Lock()
+        self._live = None
+        self._replay = None  # Updates received while a rebuild is downloading
+        self.updates = {'applied': 0, 'ignored': 0}
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the refresher thread (again, after a fork) if it isn't running"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+        threading.Thread(target=self._run, name='feature-refresher', daemon=True).start()
+        print(f"🔄 Feature refresher started (every {self.interval}s, pid {os.getpid()})")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._build_lock:
+                # A cold-start current() may have just built one - don't download it twice
+                since = time.time() - self._built_ts if self._built_ts is not None else None
+                if since is None or since >= self.interval:
+                    self.refresh()
+                    since = 0.0
+            self._stop.wait(self.interval - since)
+
+    def refresh(self):
+        """Build and publish a new snapshot; keeps the old one on failure"""
+        with self._build_lock:
+            with self._live_lock:
+                self._replay = []
+            try:
+                features = self.build_features()
+                self.last_error = None if features is not None else 'Failed to fetch market data'
+            except Exception as e:
+                features = None
+                self.last_error = str(e)
+            with self._live_lock:
+                replay, self._replay = self._replay, None
+                if features is None:
+                    print(f"⚠️  Feature refresh failed, keeping snapshot v{self._version}")
+                    return self._snapshot
+                self._live = FeatureState(features)
+                # Updates that arrived during the download may be newer than it
+                if sum(self._apply(update) for update in replay):
+                    features = self._live.features()
+                self._built_ts = time.time()
+                return self._publish(features)
+
+    def _publish(self, features):
+        self._version += 1
+        # Single reference assignment - readers see the old or new snapshot, never a mix
+        self._snapshot = FeatureSnapshot(self._version, features)
+        return self._snapshot
+
+    def _apply(self, update):
+        """Apply one ('tick' | 'bar', series, value, day, volume) update to the live state"""
+        kind, series, value, day, volume = update
+        if kind == 'tick':
+            return self._live.add_tick(series, value, day, volume)
+        return self._live.add_bar(series, value, day)
+
+    def ingest(self, updates):
+        """
+        Apply intraday updates (see _apply) to the latest features and
+        publish them as a new snapshot. Returns (applied, ignored); updates
+        older than the current bar of their series are ignored.
+        """
+        self.current()
+        with self._live_lock:
+            if self._live is None:
+                if self._snapshot is None:
+                    return 0, len(updates)
+                self._live = FeatureState(self._snapshot.features)
+            applied = sum(self._apply(update) for update in updates)
+            if self._replay is not None:
+                self._replay.extend(updates)
+            if applied:
+                self._publish(self._live.features())
+            self.updates['applied'] += applied
+            self.updates['ignored'] += len(updates) - applied
+        return applied, len(updates) - applied
+
+    def current(self):
+        """Latest snapshot, building one synchronously on a cold start"""
+        if self._snapshot is None:
+            with self._build_lock:
+                # Another request may have built it while we waited
+                if self._snapshot is None:
+                    self.refresh()
+        return self._snapshot
+
+    def latest(self):
+        """Latest snapshot without building one (may be None)"""
+        return self._snapshot
+
+    def status(self, snapshot):
+        """Staleness fields included in API responses"""
+        age = snapshot.age_seconds()
+        day = snapshot.features.get(DAY_KEY)
+        return {
+            'snapshot_version': snapshot.version,
+            # Date of the newest gold bar (a Saturday rebuild still reports Friday)
+            'data_as_of': (datetime(1970, 1, 1) + timedelta(days=int(day))).date().isoformat()
+                          if day is not None else None,
+            'snapshot_built_at': snapshot.created_at.isoformat(),
+            'data_age_seconds': round(age, 1),
+            'stale': age > self.max_age,
+        }
+
+
+def create_snapshot_refresher(build_features):
+    """Build the refresher from GOLDSENSE_SNAPSHOT_INTERVAL / _MAX_AGE"""
+    interval = float(os.environ.get('GOLDSENSE_SNAPSHOT_INTERVAL', '300'))
+    max_age = float(os.environ.get('GOLDSENSE_SNAPSHOT_MAX_AGE', str(interval * 3)))
+    return SnapshotRefresher(build_features, interval=interval, max_age=max_age)
@@ -0,0 +1,344 @@
+"""
+Market data fetch engine
+Downloads every ticker needed for the feature vector concurrently, so
+feature assembly takes as long as the slowest source instead of the sum
+of all of them. Gold futures are hedged with the GLD ETF when slow.
+With a PriceStore, only bars newer than the stored history are downloaded.
+GOLDSENSE_MARKET_DATA_URL points the engine at an HTTP market data service
+(e.g. the stand-in in benchmarks/upstream_server.py) instead of Yahoo Finance.
+Each source has a circuit breaker: after repeated failures it is skipped
+(gold falls back to the ETF, everything else to cached or stored bars)
+until a cool-down has passed. Client-requested historical ranges use
+their own breakers, so they can't cut off the live feature fetch.
+"""
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+
+from webapp.telemetry import log, telemetry
+from webapp.upstream_guard import CircuitBreaker
+
+# Gold sources in order of preference: (ticker, name, price multiplier)
+GOLD_TICKERS = [
+    ('GC=F', 'Gold Futures', 1.0),     # Direct futures price (most accurate for spot)
+    ('GLD', 'Gold ETF (SPDR)', 10.9),  # GLD typically ~1/10th of gold price
+]
+
+# Other markets used by the feature vector: (key, ticker, name)
+MARKET_TICKERS = [
+    ('silver', 'SI=F', 'Silver'),
+    ('oil', 'CL=F', 'Oil'),
+    ('usd', 'DX-Y.NYB', 'USD Index'),
+]
+
+# Seconds to wait for each ticker before giving up on it
+TICKER_TIMEOUTS = {
+    'GC=F': 10.0,
+    'GLD': 10.0,
+    'SI=F': 8.0,
+    'CL=F': 8.0,
+    'DX-Y.NYB': 8.0,
+}
+DEFAULT_TIMEOUT = 10.0
+
+# Cache/range key of the rolling window the live features are built from
+LIVE_RANGE = '90d'
+
+# Shared pool - timed-out downloads finish in the background without
+# blocking the request that gave up on them
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='fetch')
+
+
+def normalize_frame(data, ticker):
+    """Flatten yfinance's (field, ticker) columns to plain OHLCV columns"""
+    if data is None or len(data) == 0:
+        return None
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker in data.columns.get_level_values(-1):
+            data = data.xs(ticker, axis=1, level=-1)
+        elif ticker in data.columns.get_level_values(0):
+            data = data.xs(ticker, axis=1, level=0)
+        else:
+            data = data.droplevel(-1, axis=1)
+    data = data.dropna(how='all')
+    return data if len(data) > 0 else None
+
+
+def http_download(base_url):
+    """
+    A yf.download replacement reading from an HTTP market data service:
+    GET {base_url}/download?tickers=GC=F+GLD&start=...&end=... answers CSV
+    rows of Date,Ticker,Open,High,Low,Close,Volume.
+    """
+    import requests
+    session = requests.Session()
+    url = base_url.rstrip('/') + '/download'
+
+    def download(tickers, start=None, end=None, progress=False, auto_adjust=True, timeout=DEFAULT_TIMEOUT):
+        params = {'tickers': tickers if isinstance(tickers, str) else ' '.join(tickers)}
+        for name, value in (('start', start), ('end', end)):
+            if value is not None:
+                params[name] = pd.Timestamp(value).strftime('%Y-%m-%d')
+        response = session.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        rows = pd.read_csv(io.StringIO(response.text), parse_dates=['Date'])
+        if rows.empty:
+            return pd.DataFrame()
+        # Same (Price, Ticker) columns as yf.download
+        return rows.pivot(index='Date', columns='Ticker').sort_index()
+
+    return download
+
+
+class FetchEngine:
+    """Concurrent (or single batched call) downloader for all feature tickers"""
+
+    def __init__(self, cache, download=None, mode='concurrent', hedge_delay=2.0, store=None,
+                 breaker_failures=3, breaker_reset=30.0):
+        self.cache = cache
+        self._download = download
+        self.mode = mode
+        self.hedge_delay = hedge_delay
+        self.store = store
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, source, timeout=DEFAULT_TIMEOUT):
+        """The circuit breaker for a ticker (or 'batch' for multi-ticker calls)"""
+        with self._breakers_lock:
+            breaker = self._breakers.get(source)
+            if breaker is None:
+                breaker = self._breakers[source] = CircuitBreaker(
+                    source, self.breaker_failures, self.breaker_reset, slow_call=timeout)
+            return breaker
+
+    def download(self, tickers, start_date, end_date, timeout, live=True):
+        """
+        One upstream call through the source's circuit breaker. Raises
+        CircuitOpen straight away while the source is failing. Historical
+        (live=False) calls go through a separate breaker per source.
+        """
+        source = 'batch' if ' ' in tickers else tickers
+        if not live:
+            source += ' (history)'
+        return self.breaker(source, timeout).call(self._download_checked, tickers,
+                                                  start_date, end_date, timeout)
+
+    def _download_checked(self, tickers, start_date, end_date, timeout):
+        if self._download is not None:
+            download = self._download
+        else:
+            # yfinance (and the HTTP stack under it) loads on the first download, not at boot
+            import yfinance as yf
+            download = yf.download
+        data = download(tickers, start=start_date, end=end_date, progress=False,
+                        auto_adjust=True, timeout=timeout)
+        # yfinance reports most failures as an empty frame, not an exception
+        if data is None or len(data) == 0:
+            raise ValueError(f'No data for {tickers}')
+        return data
+
+    def status(self):
+        """Circuit breaker state per source"""
+        with self._breakers_lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.status() for breaker in breakers}
+
+    def download_start(self, ticker, start_date, end_date):
+        """
+        First date to download for ticker (later than start_date when it is
+        stored), or None when the store already covers start_date..end_date
+        """
+        if self.store is None:
+            return start_date
+        return self.store.refresh_start(ticker, start_date, end_date)
+
+    def merge(self, ticker, data, start_date, end_date):
+        """
+        Save downloaded bars to the store and return start_date..end_date from it.
+        When the download failed (data is None) the stored bars are used instead.
+        """
+        if self.store is None:
+            return data
+        try:
+            if data is not None:
+                self.store.append(ticker, data)
+            stored = self.store.read(ticker, start_date, end_date)
+        except Exception as e:
+            print(f"⚠️  Price store error for {ticker}: {e}")
+            return data
+        if data is None and stored is not None:
+            print(f"📦 {ticker}: download failed, using stored history")
+        return stored if stored is not None else data
+
+    def fetch(self, start_date, end_date, range_key=LIVE_RANGE):
+        """
+        Fetch gold, silver, oil and USD history.
+        range_key names the date range (LIVE_RANGE is the rolling window, the
+        only one kept in the market cache).
+        Returns {'gold': (df, multiplier, ticker, name) or None,
+                 'silver': df or None, 'oil': df or None, 'usd': df or None}
+        """
+        if self.mode == 'batch':
+            fetcher = _BatchFetcher(self, start_date, end_date, range_key)
+        else:
+            fetcher = _TickerFetcher(self, start_date, end_date, range_key)
+
+        started = time.time()
+        futures = {key: _executor.submit(self._cached, fetcher, ticker, name)
+                   for key, ticker, name in MARKET_TICKERS}
+        result = {'gold': self._fetch_gold(fetcher)}
+
+        for key, ticker, name in MARKET_TICKERS:
+            timeout = TICKER_TIMEOUTS.get(ticker, DEFAULT_TIMEOUT)
+            remaining = max(0.0, started + timeout - time.time())
+            try:
+                result[key] = futures[key].result(timeout=remaining)
+            except Exception:
+                print(f"❌ {name}: timed out after {timeout:.0f}s")
+                result[key] = None
+
+        log(f"⏱️  Market data fetched in {time.time() - started:.2f}s ({self.mode})")
+        return result
+
+    def _cached(self, fetcher, ticker, name):
+        try:
+            if fetcher.range_key == LIVE_RANGE:
+                data = self.cache.get(ticker, lambda: fetcher(ticker), key=f'{ticker}:{fetcher.range_key}')
+            else:
+                # Client date ranges are unbounded in number - don't let them fill the
+                # shared cache (the price store keeps their bars)
+                data = fetcher(ticker)
+            last_price = float(data['Close'].iloc[-1])
+            log(f"✅ {name}: {len(data)} days, Last: ${last_price:.2f}")
+            return data
+        except Exception as e:
+            print(f"❌ {name}: {str(e)[:50]}")
+            return None
+
+    def _fetch_gold(self, fetcher):
+        """
+        Hedged gold fetch: start with futures, and if they haven't answered
+        within hedge_delay (or failed) start the ETF too. Futures win ties.
+        """
+        primary, fallback = GOLD_TICKERS[0], GOLD_TICKERS[1]
+        timeout = TICKER_TIMEOUTS.get(primary[0], DEFAULT_TIMEOUT)
+        deadline = time.time() + timeout
+
+        pending = {_executor.submit(self._cached, fetcher, primary[0], primary[1]): primary}
+        done, _ = wait(pending, timeout=self.hedge_delay)
+        for future in done:
+            if future.result() is not None:
+                return self._gold_result(future.result(), primary)
+
+        log(f"⏳ {primary[1]} slow or failed, hedging with {fallback[1]}")
+        pending[_executor.submit(self._cached, fetcher, fallback[0], fallback[1])] = fallback
+
+        remaining = dict(pending)
+        for future in done:
+            remaining.pop(future, None)
+        while remaining:
+            done, _ = wait(remaining, timeout=max(0.0, deadline - time.time()),
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            # Prefer futures if both finished in the same round
+            for future in sorted(done, key=lambda f: GOLD_TICKERS.index(remaining[f])):
+                source = remaining.pop(future)
+                if future.result() is not None:
+                    return self._gold_result(future.result(), source)
+        return None
+
+    def _gold_result(self, data, source):
+        ticker, name, multiplier = source
+        log(f"✅ Using {name} ({ticker}) for gold price (multiplier: {multiplier}x)")
+        return data, multiplier, ticker, name
+
+
+class _TickerFetcher:
+    """One upstream call per ticker"""
+
+    def __init__(self, engine, start_date, end_date, range_key):
+        self.engine = engine
+        self.start_date = start_date
+        self.end_date = end_date
+        self.range_key = range_key
+
+    def __call__(self, ticker):
+        timeout = TICKER_TIMEOUTS.get(ticker, DEFAULT_TIMEOUT)
+        start_date = self.engine.download_start(ticker, self.start_date, self.end_date)
+        data = None
+        if start_date is not None:
+            try:
+                with telemetry.stage('upstream_fetch', ticker=ticker):
+                    data = normalize_frame(
+                        self.engine.download(ticker, start_date, self.end_date, timeout,
+                                             live=self.range_key == LIVE_RANGE), ticker)
+            except Exception:
+                if self.engine.store is None:
+                    raise
+        data = self.engine.merge(ticker, data, self.start_date, self.end_date)
+        if data is None:
+            raise ValueError('No data')
+        return data
+
+
+class _BatchFetcher:
+    """A single upstream call for every ticker, made on the first cache miss"""
+
+    def __init__(self, engine, start_date, end_date, range_key):
+        self.engine = engine
+        self.start_date = start_date
+        self.end_date = end_date
+        self.range_key = range_key
+        self._frames = None
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker):
+        with self._lock:
+            if self._frames is None:
+                tickers = [t for t, _, _ in GOLD_TICKERS] + [t for _, t, _ in MARKET_TICKERS]
+                timeout = max(TICKER_TIMEOUTS.get(t, DEFAULT_TIMEOUT) for t in tickers)
+                # One call, so it has to start at the earliest bar any ticker is missing
+                starts = [self.engine.download_start(t, self.start_date, self.end_date) for t in tickers]
+                missing = [start for start in starts if start is not None]
+                data = None
+                if missing:
+                    try:
+                        with telemetry.stage('upstream_fetch', ticker='batch'):
+                            data = self.engine.download(' '.join(tickers), min(missing), self.end_date,
+                                                        timeout, live=self.range_key == LIVE_RANGE)
+                    except Exception:
+                        if self.engine.store is None:
+                            raise
+                self._frames = {t: self.engine.merge(t, normalize_frame(data, t),
+                                                     self.start_date, self.end_date)
+                                for t in tickers}
+        data = self._frames.get(ticker)
+        if data is None:
+            raise ValueError('No data')
+        return data
+
+
+def create_fetch_engine(cache, store=None):
+    """
+    Build the engine from GOLDSENSE_FETCH_MODE (concurrent or batch),
+    GOLDSENSE_MARKET_DATA_URL and GOLDSENSE_BREAKER_FAILURES / _RESET
+    """
+    mode = os.environ.get('GOLDSENSE_FETCH_MODE', 'concurrent').lower()
+    if mode not in ('concurrent', 'batch'):
+        print(f"⚠️  Unknown GOLDSENSE_FETCH_MODE '{mode}', using concurrent")
+        mode = 'concurrent'
+    hedge_delay = float(os.environ.get('GOLDSENSE_HEDGE_DELAY', '2.0'))
+    url = os.environ.get('GOLDSENSE_MARKET_DATA_URL')
+    if url:
+        print(f"📡 Market data from {url}")
+    download = http_download(url) if url else None
+    return FetchEngine(cache, download=download, mode=mode, hedge_delay=hedge_delay, store=store,
+                       breaker_failures=int(os.environ.get('GOLDSENSE_BREAKER_FAILURES', '3')),
+                       breaker_reset=float(os.environ.get('GOLDSENSE_BREAKER_RESET', '30')))
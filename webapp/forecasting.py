@@ -0,0 +1,277 @@
+"""
+Recursive multi-day forecasting
+Each predicted close is appended to a rolling window of recent gold closes
+(feature_engine.RollingGoldState), and the moving averages, volatilities,
+returns and gold ratios are updated incrementally before the next step, so
+every step of a week/month forecast sees features that are consistent with
+the predicted path.
+Prediction intervals come from thousands of such paths simulated together:
+one (paths x horizon) array, stepped a day at a time with every path in the
+same model call, and summarized as percentile bands per day.
+"""
+import random
+import traceback
+import zlib
+import numpy as np
+
+from webapp.feature_engine import HISTORY_KEY, HISTORY_LENGTH, RollingGoldState, path_indicators, seed_history
+from webapp.telemetry import log, telemetry
+
+# Range of the daily noise added to baseline predictions (-0.3% to +0.5%)
+BASELINE_NOISE = (-0.003, 0.005)
+
+# The observed MA7/MA14 trend loses this share of its weight each forecast day
+TREND_DECAY = 0.8
+
+# Forecasts never drift further than this from today's close (like is_reasonable)
+MAX_DRIFT = 0.15
+
+# Percentiles reported for each forecast day
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Daily returns needed in the close history to bootstrap from them
+MIN_RESIDUALS = 20
+
+# Features recomputed at every forecast step
+ROLLING_FEATURES = (
+    'Gold_Close', 'Gold_MA7', 'Gold_MA14', 'Gold_MA30',
+    'Gold_Volatility_7', 'Gold_Volatility_14', 'Gold_Volatility_30',
+    'Gold_Return_1d', 'Gold_Return_7d', 'G/S_Close', 'Gold_Oil_Ratio',
+)
+
+
+def is_reasonable(y_pred, current_price):
+    """Sanity check: prediction should be within 15% of the current price (scalars or arrays)"""
+    return (y_pred >= 100) & (y_pred <= 10000) & (np.abs(y_pred - current_price) <= current_price * 0.15)
+
+
+def baseline_change(current_price, ma7, ma14, random_factor, trend_weight=1.0):
+    """Relative price change from the dampened MA7/MA14 trend plus noise (scalars or arrays)"""
+    has_trend = (np.abs(ma7 - current_price) > 0.01) & (np.abs(ma14 - current_price) > 0.01)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        trend = np.where(has_trend, (ma7 - ma14) / ma14 * 0.5 * trend_weight, 0.0)  # Dampen the trend
+    return np.clip(trend + random_factor, -0.02, 0.02)  # Cap at ±2%
+
+
+def feature_seed(features):
+    """Random seed derived from the current prices, so the same features always get the same noise"""
+    key = np.array([features.get(k, 0) or 0 for k in ('Gold_Close', 'Gold_MA7', 'Gold_MA14')], dtype=np.float64)
+    return zlib.crc32(key.tobytes())
+
+
+def baseline_noise(features):
+    """The baseline's noise for a feature dict: one uniform draw seeded by feature_seed"""
+    return random.Random(feature_seed(features)).uniform(*BASELINE_NOISE)
+
+
+def model_predict(model, X_scaled):
+    """Run the model on scaled rows - handles both Keras and sklearn models"""
+    try:
+        # For Keras models (LSTM/GRU) - needs 3D input
+        if 'tensorflow' in str(type(model)):
+            # Reshape for LSTM input: (batch, timesteps, features)
+            return model.predict(X_scaled.reshape(len(X_scaled), 1, -1), verbose=0)
+        return model.predict(X_scaled)
+    except Exception:
+        # Fallback - try as-is
+        return model.predict(X_scaled)
+
+
+def predict_rows(X, current, ma7, ma14, model, scaler_X, scaler_y, random_factors, pipeline='batch'):
+    """
+    Next-day predictions for the feature matrix X as one model call.
+    Rows whose model output fails the sanity check (or every row, when the
+    model is unavailable or fails) get the trend + volatility baseline.
+    Returns (predictions, model_mask).
+    """
+    predictions = np.full(len(X), np.nan)
+    if model is not None and hasattr(model, 'predict') and len(X):
+        try:
+            with telemetry.stage('scale', pipeline=pipeline):
+                X_scaled = scaler_X.transform(X)
+            with telemetry.stage('model_predict', pipeline=pipeline):
+                y_scaled = np.asarray(model_predict(model, X_scaled), dtype=np.float64)
+            with telemetry.stage('inverse_transform', pipeline=pipeline):
+                y_pred = scaler_y.inverse_transform(y_scaled.reshape(-1, 1)).ravel()
+            ok = is_reasonable(y_pred, current)
+            predictions[ok] = y_pred[ok]
+        except Exception as e:
+            print(f"❌ Error in {pipeline} prediction: {e}")
+            traceback.print_exc()
+
+    from_model = ~np.isnan(predictions)
+    if not from_model.all():
+        change = baseline_change(current, ma7, ma14, random_factors)
+        predictions[~from_model] = (current * (1 + change))[~from_model]
+    return predictions, from_model
+
+
+def affine_transform(scaler):
+    """(multiplier, offset) arrays equivalent to scaler.transform, if it is affine"""
+    if hasattr(scaler, 'scale_') and hasattr(scaler, 'min_'):  # MinMaxScaler
+        return np.asarray(scaler.scale_, dtype=np.float64), np.asarray(scaler.min_, dtype=np.float64)
+    if hasattr(scaler, 'scale_') and hasattr(scaler, 'mean_'):  # StandardScaler
+        scale = np.asarray(scaler.scale_, dtype=np.float64)
+        mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.mean_ is not None else 0.0
+        return 1.0 / scale, -mean / scale
+    return None
+
+
+def forecast_path(features, horizon, model, scaler_X, scaler_y, layout, seed=None):
+    """
+    Predict `horizon` daily closes recursively. Returns a list of floats.
+    Uses the model where its output passes the sanity check and the
+    trend + volatility baseline otherwise, like predict_next_day. The
+    baseline trend comes from today's observed MAs with a weight decaying
+    by TREND_DECAY per day, so predicted closes don't feed it back, and no
+    close drifts more than MAX_DRIFT from today's.
+    """
+    state = RollingGoldState(seed_history(features))
+    start = state.indicators()
+    start.update({k: float(features[k]) for k in ('Gold_Close', 'Gold_MA7', 'Gold_MA14') if k in features})
+    low, high = start['Gold_Close'] * (1 - MAX_DRIFT), start['Gold_Close'] * (1 + MAX_DRIFT)
+    silver_close = float(features.get('Silver_Close', 0) or 0)
+    oil_close = float(features.get('Oil_Close', 0) or 0)
+
+    use_model = model is not None and hasattr(model, 'predict') and layout is not None
+    if use_model:
+        # Static part of the feature row, built once; rolling columns are patched per step
+        X = np.empty((1, layout.width), dtype=layout.dtype)
+        layout.fill(features, out=X)
+        row = X[0]
+        positions = {f: layout.index[f] for f in ROLLING_FEATURES if f in layout.index}
+        affine = affine_transform(scaler_X)
+
+    if seed is None:
+        seed = feature_seed(features)
+    # All baseline noise for the path in one draw
+    random_factors = np.random.default_rng(seed).uniform(*BASELINE_NOISE, horizon)
+    # Day one is the next-day prediction
+    random_factors[0] = baseline_noise(features)
+
+    predictions = []
+    model_steps = 0
+    for step in range(horizon):
+        current = state.indicators()
+        if step == 0:
+            # Today's indicators are known exactly - prefer them over the seeded series
+            current.update({k: float(features[k]) for k in ROLLING_FEATURES if k in features})
+        current_price = current['Gold_Close']
+        if silver_close > 0:
+            current['G/S_Close'] = current_price / silver_close
+        if oil_close > 0:
+            current['Gold_Oil_Ratio'] = current_price / oil_close
+
+        y_pred = None
+        if use_model:
+            try:
+                for name, i in positions.items():
+                    row[i] = current[name]
+                with telemetry.stage('scale', pipeline='forecast'):
+                    X_scaled = X * affine[0] + affine[1] if affine else scaler_X.transform(X)
+                with telemetry.stage('model_predict', pipeline='forecast'):
+                    y_scaled = np.asarray(model_predict(model, X_scaled), dtype=np.float64)
+                with telemetry.stage('inverse_transform', pipeline='forecast'):
+                    y_pred = float(scaler_y.inverse_transform(y_scaled.reshape(-1, 1))[0][0])
+                if not is_reasonable(y_pred, current_price):
+                    y_pred = None
+                else:
+                    model_steps += 1
+            except Exception as e:
+                print(f"❌ Error predicting step {step + 1}: {e}")
+                y_pred = current_price * 1.001
+
+        if y_pred is None:
+            change = baseline_change(start['Gold_Close'], start['Gold_MA7'], start['Gold_MA14'],
+                                     random_factors[step], TREND_DECAY ** step)
+            y_pred = current_price * (1 + change)
+
+        y_pred = min(max(y_pred, low), high)
+        predictions.append(float(y_pred))
+        state.append(y_pred)
+
+    log(f"✅ Forecast {horizon} days ({model_steps} model, {horizon - model_steps} baseline steps)")
+    return predictions
+
+
+def path_shocks(features, rng, shape):
+    """
+    Relative daily shocks for simulated paths, and how they were drawn:
+    'bootstrap' resamples the demeaned daily returns of the recent close
+    history (the residuals around the trend), 'montecarlo' draws the
+    baseline's uniform noise when there is too little history.
+    """
+    history = features.get(HISTORY_KEY)
+    if history is not None and len(history) > MIN_RESIDUALS:
+        closes = np.asarray(history, dtype=np.float64)
+        returns = np.diff(closes) / closes[:-1]
+        if np.isfinite(returns).all():
+            return rng.choice(returns - returns.mean(), size=shape), 'bootstrap'
+    return rng.uniform(*BASELINE_NOISE, shape), 'montecarlo'
+
+
+def forecast_paths(features, horizon, paths, model, scaler_X, scaler_y, layout, seed=None):
+    """
+    Simulate `paths` recursive forecasts of `horizon` days as one
+    (paths, horizon) array. Each day is a single model call over every
+    path. Every path's close is that day's noise-free step (the model
+    prediction, or the baseline trend as in forecast_path) times one plus
+    its shock, bounded like forecast_path. Returns (closes, method).
+    """
+    rng = np.random.default_rng(feature_seed(features) if seed is None else seed)
+    shocks, method = path_shocks(features, rng, (paths, horizon))
+    silver_close = float(features.get('Silver_Close', 0) or 0)
+    oil_close = float(features.get('Oil_Close', 0) or 0)
+
+    history = seed_history(features)
+    start = RollingGoldState(history).indicators()
+    start.update({k: float(features[k]) for k in ('Gold_Close', 'Gold_MA7', 'Gold_MA14') if k in features})
+    low, high = start['Gold_Close'] * (1 - MAX_DRIFT), start['Gold_Close'] * (1 + MAX_DRIFT)
+
+    closes = np.empty((paths, HISTORY_LENGTH + horizon), dtype=np.float64)
+    closes[:, :HISTORY_LENGTH] = history
+    use_model = model is not None and hasattr(model, 'predict') and layout is not None
+    if use_model:
+        # Static part of every row, filled once; rolling columns are overwritten per day
+        X = np.empty((paths, layout.width), dtype=layout.dtype)
+        X[:] = layout.fill(features)[0]
+    else:
+        X = np.empty((paths, 0))
+
+    model_steps = 0
+    for step in range(horizon):
+        current = path_indicators(closes[:, :HISTORY_LENGTH + step])
+        if step == 0:
+            # Today's indicators are known exactly - prefer them over the seeded series
+            for k in ROLLING_FEATURES:
+                if k in features:
+                    current[k] = np.full(paths, float(features[k]))
+        current_price = current['Gold_Close']
+        if silver_close > 0:
+            current['G/S_Close'] = current_price / silver_close
+        if oil_close > 0:
+            current['Gold_Oil_Ratio'] = current_price / oil_close
+        if use_model:
+            for name in ROLLING_FEATURES:
+                if name in layout.index and name in current:
+                    X[:, layout.index[name]] = current[name]
+            np.nan_to_num(X, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+        trend = baseline_change(start['Gold_Close'], start['Gold_MA7'], start['Gold_MA14'],
+                                0.0, TREND_DECAY ** step)
+        predicted = current_price * (1 + trend)
+        if use_model:
+            y_pred, from_model = predict_rows(X, current_price, current['Gold_MA7'], current['Gold_MA14'],
+                                              model, scaler_X, scaler_y, np.zeros(paths), pipeline='paths')
+            predicted = np.where(from_model, y_pred, predicted)
+            model_steps += int(from_model.any())
+        closes[:, HISTORY_LENGTH + step] = np.clip(predicted * (1 + shocks[:, step]), low, high)
+
+    log(f"✅ Simulated {paths} paths x {horizon} days ({method}, {model_steps} model steps)")
+    return closes[:, HISTORY_LENGTH:], method
+
+
+def percentile_bands(closes, percentiles=PERCENTILES):
+    """{'p5': [...], 'p50': [...], ...}: each percentile across paths for every forecast day"""
+    bands = np.percentile(closes, percentiles, axis=0)
+    return {f'p{p}': band.tolist() for p, band in zip(percentiles, bands)}
@@ -0,0 +1,82 @@
+"""
+Inference pool
+With threaded workers many requests run at once, but only a few model
+calls should: XGBoost and NumPy already use several cores each. Request
+threads hand predictions to this small pool and wait for the result; when
+too many are queued a prediction is refused at once (the route answers
+503) instead of every thread competing for the CPU.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class InferenceUnavailable(RuntimeError):
+    """Too many predictions queued, or one took too long"""
+
+
+class InferencePool:
+    """Bounded thread pool for model calls (threads=0 runs them in the calling thread)"""
+
+    def __init__(self, threads=2, max_pending=64, timeout=30.0, wrap=None):
+        self.threads = threads
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.wrap = wrap  # wrap(fn) -> fn, applied on the request thread (profiling)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.stats = {'calls': 0, 'rejected': 0, 'timeouts': 0}
+
+    def _get_executor(self):
+        """The thread pool for this process (threads don't survive a fork)"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.threads,
+                                                    thread_name_prefix='inference')
+                self._slots = threading.BoundedSemaphore(self.max_pending)
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        """fn(*args) on an inference thread; raises InferenceUnavailable when saturated"""
+        if self.threads <= 0:
+            self.stats['calls'] += 1
+            return fn(*args)
+
+        executor = self._get_executor()
+        slots = self._slots
+        if self.wrap is not None:
+            fn = self.wrap(fn)
+
+        if not slots.acquire(blocking=False):
+            self.stats['rejected'] += 1
+            raise InferenceUnavailable(f'Inference queue full ({self.max_pending} pending)')
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        # The slot is held until the call finishes, even if we stop waiting for it
+        future.add_done_callback(lambda f: slots.release())
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self.stats['timeouts'] += 1
+            raise InferenceUnavailable(f'Prediction timed out after {self.timeout:g}s')
+        self.stats['calls'] += 1
+        return result
+
+    def status(self):
+        return {'threads': self.threads, 'max_pending': self.max_pending,
+                'timeout': self.timeout, **self.stats}
+
+
+def create_inference_pool(wrap=None):
+    """Build the pool from GOLDSENSE_INFERENCE_THREADS, _QUEUE and _TIMEOUT"""
+    return InferencePool(threads=int(os.environ.get('GOLDSENSE_INFERENCE_THREADS', '2')),
+                         max_pending=int(os.environ.get('GOLDSENSE_INFERENCE_QUEUE', '64')),
+                         timeout=float(os.environ.get('GOLDSENSE_INFERENCE_TIMEOUT', '30')),
+                         wrap=wrap)
@@ -0,0 +1,248 @@
+"""
+Market data cache
+Keeps downloaded price history between requests so repeated predictions
+don't hit Yahoo Finance every time. Settled daily bars only change when a
+ticker's session settles, so entries live for a multi-hour intraday TTL
+(sized per ticker) cut off at the ticker's next settlement - a handful of
+downloads per ticker per day, each only the recent tail when the price
+store holds the older bars. Stale entries are served
+while a background refresh runs (stale-while-revalidate). Concurrent misses
+for the same entry share one upstream fetch.
+"""
+import os
+import pickle
+import hashlib
+import stat
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+
+from webapp.upstream_guard import SingleFlight
+
+try:
+    from zoneinfo import ZoneInfo
+    EXCHANGE_TZ = ZoneInfo('America/New_York')
+except Exception:
+    # No tz database: Eastern Standard Time (settlements read an hour late in summer)
+    EXCHANGE_TZ = timezone(timedelta(hours=-5))
+
+# Per-ticker refresh policy: intraday TTL in seconds and when the daily bar settles (New York time)
+TICKER_POLICIES = {
+    'GC=F': {'ttl': 2 * 3600, 'close_et': (13, 30)},      # COMEX gold settlement; the price the app quotes
+    'GLD': {'ttl': 4 * 3600, 'close_et': (16, 0)},        # NYSE Arca close; only a fallback for gold
+    'SI=F': {'ttl': 4 * 3600, 'close_et': (13, 25)},      # COMEX silver settlement
+    'CL=F': {'ttl': 4 * 3600, 'close_et': (14, 30)},      # NYMEX crude settlement
+    'DX-Y.NYB': {'ttl': 6 * 3600, 'close_et': (17, 0)},   # ICE dollar index close
+}
+DEFAULT_POLICY = {'ttl': 4 * 3600, 'close_et': (17, 0)}
+
+# Grace period after the close before the settled daily bar is published
+SETTLE_DELAY = timedelta(minutes=30)
+
+# How long an expired entry may still be served while it is being refreshed
+STALE_WINDOW = timedelta(hours=12)
+
+
+def next_close_boundary(ticker, now):
+    """Return the next time (UTC) a new daily bar for ticker can appear"""
+    hour, minute = TICKER_POLICIES.get(ticker, DEFAULT_POLICY)['close_et']
+    local = now.astimezone(EXCHANGE_TZ)
+    day = local.date()
+    while True:
+        # Settlement on the exchange's wall clock, so daylight saving time is followed
+        boundary = datetime(day.year, day.month, day.day, hour, minute, tzinfo=EXCHANGE_TZ) + SETTLE_DELAY
+        # No daily bars settle on Saturday or Sunday
+        if boundary.weekday() < 5 and boundary > local:
+            return boundary.astimezone(timezone.utc)
+        day += timedelta(days=1)
+
+
+def compute_expiry(ticker, fetched_at, ttl=None):
+    """Expiry for a fetch: the intraday TTL (or ttl seconds), cut off at the next close"""
+    policy = TICKER_POLICIES.get(ticker, DEFAULT_POLICY)
+    boundary = next_close_boundary(ticker, fetched_at)
+    if ttl is not None:
+        # An explicit TTL applies every day (load tests want a steady refresh rate)
+        return min(fetched_at + timedelta(seconds=ttl), boundary)
+    if boundary - fetched_at > timedelta(days=1):
+        # Weekend (or Friday after settlement): nothing changes until the next session settles
+        return boundary
+    return min(fetched_at + timedelta(seconds=policy['ttl']), boundary)
+
+
+class MemoryBackend:
+    """In-process cache store (one copy per worker)"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def private_dir(path):
+    """
+    Create path (mode 0700) and make sure no other local user can add or
+    swap files in it - its files are unpickled, so a planted one would run
+    code. Raises OSError when path, or a non-sticky parent, belongs to or
+    is writable by someone else.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not hasattr(os, 'getuid'):  # Windows: no POSIX owners or modes
+        return path
+    info = os.stat(path)
+    if info.st_uid != os.getuid():
+        raise OSError(f"{path} belongs to another user")
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(path, 0o700)
+    parent = os.path.dirname(os.path.abspath(path))
+    info = os.stat(parent)
+    if info.st_uid not in (os.getuid(), 0):
+        raise OSError(f"{parent} belongs to another user")
+    # A sticky, shared parent like /tmp is fine: others can't rename our directory
+    if info.st_mode & 0o022 and not info.st_mode & stat.S_ISVTX:
+        if info.st_uid != os.getuid():
+            raise OSError(f"{parent} is writable by other users")
+        os.chmod(parent, stat.S_IMODE(info.st_mode) & ~0o022)
+    return path
+
+
+class DiskBackend:
+    """On-disk cache store shared by every gunicorn worker on the host"""
+
+    name = 'disk'
+
+    def __init__(self, cache_dir):
+        self.cache_dir = private_dir(cache_dir)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}.pkl')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key, entry):
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def clear(self):
+        for file in os.listdir(self.cache_dir):
+            if file.endswith('.pkl'):
+                os.remove(os.path.join(self.cache_dir, file))
+
+
+class MarketDataCache:
+    """TTL cache for per-ticker price history with stale-while-revalidate"""
+
+    def __init__(self, backend, ttl=None):
+        self.backend = backend
+        self.ttl = ttl  # Overrides the per-ticker intraday TTL when set
+        self._flight = SingleFlight()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'upstream_calls': 0}
+        self._stats_lock = threading.Lock()  # Request threads count concurrently
+
+    def _count(self, event):
+        with self._stats_lock:
+            self.stats[event] += 1
+
+    @property
+    def coalesced(self):
+        """Misses answered by a fetch another caller already had in flight"""
+        return self._flight.shared
+
+    def get(self, ticker, fetcher, key=None):
+        """
+        Return cached data for ticker, calling fetcher() when needed.
+        fetcher must raise (not return None) when upstream has no data,
+        so failures are never cached.
+        """
+        key = key or ticker
+        now = datetime.now(timezone.utc)
+        entry = self.backend.get(key)
+
+        if entry is not None and now < entry['expires_at']:
+            self._count('hits')
+            return entry['value']
+
+        if entry is not None and now < entry['expires_at'] + STALE_WINDOW:
+            self._count('stale_hits')
+            self._refresh_in_background(ticker, key, fetcher)
+            return entry['value']
+
+        self._count('misses')
+        try:
+            return self._flight.do(key, lambda: self._refresh(ticker, key, fetcher))
+        except Exception:
+            # Upstream failed - an old value is better than nothing
+            if entry is not None:
+                print(f"⚠️  {ticker}: upstream failed, serving cached data from {entry['fetched_at']:%Y-%m-%d %H:%M} UTC")
+                return entry['value']
+            raise
+
+    def _refresh(self, ticker, key, fetcher):
+        self._count('upstream_calls')
+        value = fetcher()
+        fetched_at = datetime.now(timezone.utc)
+        self.backend.set(key, {
+            'value': value,
+            'fetched_at': fetched_at,
+            'expires_at': compute_expiry(ticker, fetched_at, self.ttl),
+        })
+        return value
+
+    def _refresh_in_background(self, ticker, key, fetcher):
+        if self._flight.in_flight(key):
+            return
+
+        def run():
+            try:
+                self._flight.do(key, lambda: self._refresh(ticker, key, fetcher))
+            except Exception as e:
+                print(f"⚠️  Background refresh of {ticker} failed: {str(e)[:50]}")
+
+        threading.Thread(target=run, name=f'refresh-{ticker}', daemon=True).start()
+
+    def clear(self):
+        self.backend.clear()
+
+
+def create_market_cache():
+    """Build the cache from GOLDSENSE_MARKET_CACHE (disk or memory) and GOLDSENSE_MARKET_CACHE_TTL"""
+    backend_name = os.environ.get('GOLDSENSE_MARKET_CACHE', 'disk').lower()
+    ttl = os.environ.get('GOLDSENSE_MARKET_CACHE_TTL')
+    ttl = float(ttl) if ttl else None
+    if backend_name == 'memory':
+        return MarketDataCache(MemoryBackend(), ttl)
+
+    cache_dir = os.environ.get('GOLDSENSE_CACHE_DIR',
+                               os.path.join(tempfile.gettempdir(), 'goldsense_cache'))
+    try:
+        return MarketDataCache(DiskBackend(os.path.join(cache_dir, 'market')), ttl)
+    except OSError as e:
+        print(f"⚠️  Disk cache unavailable ({e}), using in-memory cache")
+        return MarketDataCache(MemoryBackend(), ttl)
@@ -0,0 +1,237 @@
+"""
+Model registry
+Holds the loaded model, scalers, feature layout and metadata as one
+immutable ModelBundle. New artifacts are loaded and validated off to the
+side, then published with a single reference swap, so a request that
+grabbed a bundle keeps using a complete, consistent set of artifacts.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+
+from webapp.artifacts import get_artifact_mode, load_artifact
+from webapp.feature_layout import FeatureLayout
+from webapp.forecasting import model_predict
+
+ModelBundle = namedtuple('ModelBundle', [
+    'version',        # Increments with every successful load in this process
+    'model',
+    'scaler_X',
+    'scaler_y',
+    'feature_names',
+    'layout',         # FeatureLayout compiled from feature_names
+    'metadata',
+    'fingerprint',    # (file, mtime, size) of the artifacts it was loaded from
+    'load_info',      # Timing and mode of the load
+])
+
+# Bundle used until the first successful load
+EMPTY_BUNDLE = ModelBundle(0, None, None, None, None, None, None, None, {})
+
+ARTIFACT_FILES = ('scaler_X.pkl', 'scaler_y.pkl', 'feature_names.pkl', 'metadata.pkl',
+                  'best_model.h5', 'best_model.pkl', 'best_model_metadata.pkl')
+
+
+def artifacts_fingerprint(model_dir):
+    """Identity of the artifacts on disk; changes when any file is replaced"""
+    fingerprint = []
+    for file in ARTIFACT_FILES:
+        try:
+            stat = os.stat(os.path.join(model_dir, file))
+            fingerprint.append((file, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            continue
+    return tuple(fingerprint)
+
+
+def load_bundle(model_dir, version, preloaded=False):
+    """Load every artifact from model_dir into a new (unpublished) bundle"""
+    started = time.time()
+    artifact_mode = get_artifact_mode()
+    fingerprint = artifacts_fingerprint(model_dir)
+
+    # Load scalers and feature names first
+    scaler_X = load_artifact(os.path.join(model_dir, 'scaler_X.pkl'), artifact_mode)
+    scaler_y = load_artifact(os.path.join(model_dir, 'scaler_y.pkl'), artifact_mode)
+    feature_names = load_artifact(os.path.join(model_dir, 'feature_names.pkl'), artifact_mode)
+    print("✅ Loaded scalers and features")
+
+    # Try different model file formats
+    model = None
+
+    # Try loading Keras model (.h5)
+    h5_path = os.path.join(model_dir, 'best_model.h5')
+    if os.path.exists(h5_path):
+        try:
+            from tensorflow import keras
+            model = keras.models.load_model(h5_path)
+            print("✅ Loaded Keras model (best_model.h5)")
+        except Exception as e:
+            print(f"⚠️  Could not load .h5 model: {e}")
+
+    # Try loading pickle model
+    if model is None:
+        for model_file in ['best_model.pkl', 'best_model_metadata.pkl']:
+            model_path = os.path.join(model_dir, model_file)
+            if os.path.exists(model_path):
+                try:
+                    model = load_artifact(model_path, artifact_mode)
+                    print(f"✅ Loaded pickle model ({model_file})")
+                    break
+                except Exception:
+                    continue
+
+    if model is None:
+        raise FileNotFoundError("No model file found!")
+
+    # Try to load metadata (contains performance metrics)
+    try:
+        metadata = load_artifact(os.path.join(model_dir, 'metadata.pkl'), artifact_mode)
+        print("✅ Models and metadata loaded successfully")
+    except Exception:
+        metadata = {
+            'model_type': 'Unknown',
+            'trained_date': 'Unknown',
+            'metrics': {}
+        }
+        print("⚠️  Models loaded, but no metadata found")
+
+    load_info = {
+        'seconds': round(time.time() - started, 3),
+        'artifact_mode': artifact_mode,
+        'loaded_at': datetime.now().isoformat(),
+        'pid': os.getpid(),
+        'preloaded': preloaded
+    }
+    return ModelBundle(version, model, scaler_X, scaler_y, list(feature_names),
+                       FeatureLayout(feature_names), metadata, fingerprint, load_info)
+
+
+def validate_bundle(bundle, canary_features=None):
+    """
+    Run a canary prediction through the bundle; raises if it can't predict.
+    canary_features is a feature dict (e.g. the current market snapshot).
+    """
+    expected = getattr(bundle.scaler_X, 'n_features_in_', bundle.layout.width)
+    if expected != bundle.layout.width:
+        raise ValueError(f"scaler_X expects {expected} features, feature_names has {bundle.layout.width}")
+
+    X = np.empty((1, bundle.layout.width), dtype=bundle.layout.dtype)
+    bundle.layout.fill(canary_features or {}, out=X)
+    y_scaled = np.asarray(model_predict(bundle.model, bundle.scaler_X.transform(X)), dtype=np.float64)
+    y_pred = bundle.scaler_y.inverse_transform(y_scaled.reshape(-1, 1))
+    if y_pred.shape[0] != 1 or not np.isfinite(y_pred).all():
+        raise ValueError(f"Canary prediction is not a finite number: {y_pred.ravel()[:3]}")
+    return float(y_pred[0][0])
+
+
+class ModelRegistry:
+    """Publishes validated model bundles and reloads them when files change"""
+
+    def __init__(self, model_dir, on_swap=None, canary=None, watch_interval=60):
+        self.model_dir = model_dir
+        self.on_swap = on_swap        # Called with the new bundle after a swap
+        self.canary = canary          # Returns a feature dict for validation (or None)
+        self.watch_interval = watch_interval
+        self.current = EMPTY_BUNDLE
+        self.last_error = None
+        self._next_version = 1
+        self._load_lock = threading.Lock()
+        self._first_load_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._reloading = False
+        self._watch_pid = None
+        self._failed_fingerprint = None  # Artifacts that failed to load - not retried by the watcher
+
+    def load(self, preloaded=False):
+        """Load, validate and publish a bundle; returns it, or None on failure"""
+        with self._load_lock:
+            fingerprint = artifacts_fingerprint(self.model_dir)
+            try:
+                print(f"📂 Models directory: {self.model_dir}")
+                bundle = load_bundle(self.model_dir, self._next_version, preloaded)
+                canary = self.canary() if self.canary else None
+                canary_pred = validate_bundle(bundle, canary)
+                print(f"✅ Canary prediction passed (${canary_pred:.2f})")
+            except Exception as e:
+                self.last_error = str(e)
+                self._failed_fingerprint = fingerprint
+                print(f"❌ Error loading models: {e}")
+                if self.current.model is not None:
+                    print(f"↩️  Keeping model v{self.current.version}")
+                return None
+
+            self._next_version += 1
+            self.last_error = None
+            # Single reference swap - requests see the old or the new bundle, never a mix
+            self.current = bundle
+            print(f"⏱️  Model v{bundle.version} loaded in {bundle.load_info['seconds']:.2f}s "
+                  f"({bundle.load_info['artifact_mode']})")
+            if self.on_swap:
+                self.on_swap(bundle)
+            return bundle
+
+    def ensure_loaded(self):
+        """Load models if none are published yet; concurrent callers share one load"""
+        if self.current.model is not None:
+            return True
+        with self._first_load_lock:
+            if self.current.model is not None:
+                return True
+            return self.load() is not None
+
+    def reload_in_background(self):
+        """Start a background reload; returns False if one is already running"""
+        with self._state_lock:
+            if self._reloading:
+                return False
+            self._reloading = True
+
+        def run():
+            try:
+                self.load()
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=run, name='model-reload', daemon=True).start()
+        return True
+
+    def changed_on_disk(self):
+        return artifacts_fingerprint(self.model_dir) != self.current.fingerprint
+
+    def start_watching(self):
+        """Poll the models directory in this process (again, after a fork)"""
+        if self.watch_interval <= 0 or self._watch_pid == os.getpid():
+            return
+        with self._state_lock:
+            if self._watch_pid == os.getpid():
+                return
+            self._watch_pid = os.getpid()
+        threading.Thread(target=self._watch, name='model-watcher', daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            try:
+                fingerprint = artifacts_fingerprint(self.model_dir)
+                if (self.current.model is not None and fingerprint != self.current.fingerprint
+                        and fingerprint != self._failed_fingerprint):
+                    print("🔁 Model files changed, reloading")
+                    self.load()
+            except Exception as e:
+                print(f"⚠️  Model watcher error: {e}")
+
+    def status(self):
+        bundle = self.current
+        return {
+            'model_version': bundle.version,
+            'model_type': (bundle.metadata or {}).get('model_type'),
+            'loaded_at': bundle.load_info.get('loaded_at'),
+            'files': [{'file': f, 'mtime_ns': m, 'size': s} for f, m, s in (bundle.fingerprint or ())],
+            'changed_on_disk': bundle.model is not None and self.changed_on_disk(),
+            'reloading': self._reloading,
+            'last_error': self.last_error
+        }
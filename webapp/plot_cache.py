@@ -0,0 +1,202 @@
+"""
+Rendered plot cache
+The performance charts only depend on metadata['metrics'], so each one is
+drawn once per (metrics digest, plot, format, dpi) and kept in memory and
+on disk (shared by every gunicorn worker). Entries carry an ETag and a
+Last-Modified time so browsers can revalidate instead of re-downloading.
+"""
+import base64
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+from webapp.plots import FORMATS, RENDERERS
+from webapp.render_pool import RenderPool
+from webapp.telemetry import telemetry
+
+RenderedPlot = namedtuple('RenderedPlot', [
+    'data',           # Encoded image bytes
+    'mimetype',
+    'etag',           # Digest of the cache key (same in every worker)
+    'last_modified',  # Unix time the image was rendered
+    'path',           # On-disk copy (None when only cached in memory)
+])
+
+# Text formats worth serving gzip-compressed
+COMPRESSIBLE = ('image/svg+xml',)
+
+# Formats rendered ahead of the first request (SVG is only drawn on demand)
+WARM_FORMATS = ('png', 'webp')
+
+# Rendered images kept in memory per process
+MAX_ENTRIES = 64
+
+
+def metrics_digest(metadata):
+    """Version of the plot input: digest of metadata['metrics']"""
+    metrics = (metadata or {}).get('metrics')
+    if not metrics:
+        return None
+    return hashlib.sha1(repr(sorted(metrics.items(), key=lambda kv: str(kv[0]))).encode('utf-8')).hexdigest()[:16]
+
+
+class PlotCache:
+    """Memory + disk cache of rendered plots"""
+
+    def __init__(self, cache_dir=None, render_pool=None, precompress=True):
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.render_pool = render_pool or RenderPool(workers=0)
+        self.precompress = precompress
+        self._entries = {}
+        self._b64 = {}
+        self._gzip = {}
+        self._lock = threading.Lock()
+        # One lock per plot being drawn, so it isn't drawn twice at once
+        self._key_locks = {}
+        self.stats = {'hits': 0, 'disk_hits': 0, 'renders': 0}
+
+    @staticmethod
+    def key(name, digest, fmt='png', dpi=100):
+        return f'{name}-{digest}-{dpi}.{fmt}'
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key) if self.cache_dir else None
+
+    def _remember(self, key, plot):
+        with self._lock:
+            if len(self._entries) >= MAX_ENTRIES:
+                self._entries.clear()
+                self._b64.clear()
+                self._gzip.clear()
+            self._entries[key] = plot
+
+    def _load(self, key, fmt):
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            last_modified = os.path.getmtime(path)
+        except (OSError, TypeError):
+            return None
+        return RenderedPlot(data, FORMATS[fmt][0], hashlib.sha1(key.encode('utf-8')).hexdigest(),
+                            int(last_modified), path)
+
+    def _save(self, key, data):
+        """Write data to the disk cache; returns its path (None if not saved)"""
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        # Write to a temp file and rename so other workers never read a partial image
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            return path
+        except OSError as e:
+            print(f"⚠️  Could not save rendered plot {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def get(self, name, metadata, fmt='png', dpi=100, inline=False):
+        """
+        RenderedPlot for name from metadata's metrics, or None if there is nothing to plot.
+        Raises RenderUnavailable when the render pool is full or too slow.
+        """
+        digest = metrics_digest(metadata)
+        if digest is None or name not in RENDERERS or fmt not in FORMATS:
+            return None
+        key = self.key(name, digest, fmt, dpi)
+
+        plot = self._entries.get(key)
+        if plot is not None:
+            self.stats['hits'] += 1
+            return plot
+
+        with self._key_lock(key):
+            plot = self._entries.get(key)
+            if plot is not None:
+                self.stats['hits'] += 1
+                return plot
+            plot = self._load(key, fmt)
+            if plot is not None:
+                self.stats['disk_hits'] += 1
+            else:
+                with telemetry.stage('plot_render', plot=name, format=fmt):
+                    data = self.render_pool.render(name, metadata['metrics'], fmt, dpi, inline=inline)
+                if data is None:
+                    return None
+                self.stats['renders'] += 1
+                path = self._save(key, data)
+                plot = RenderedPlot(data, FORMATS[fmt][0], hashlib.sha1(key.encode('utf-8')).hexdigest(),
+                                    int(time.time()), path)
+            self._remember(key, plot)
+            return plot
+
+    def get_base64(self, plot):
+        """Base64 text of a rendered plot (for the JSON endpoints), encoded once"""
+        encoded = self._b64.get(plot.etag)
+        if encoded is None:
+            encoded = self._b64[plot.etag] = base64.b64encode(plot.data).decode()
+        return encoded
+
+    def get_gzip(self, plot):
+        """Gzip-compressed copy of a text plot (e.g. SVG), compressed once; None if not worth it"""
+        if not self.precompress or plot.mimetype not in COMPRESSIBLE:
+            return None
+        compressed = self._gzip.get(plot.etag)
+        if compressed is None:
+            compressed = self._gzip[plot.etag] = gzip.compress(plot.data, compresslevel=9, mtime=0)
+        return compressed
+
+    def warm(self, metadata, inline=False):
+        """
+        Render every plot for metadata ahead of the first request
+        (inline=True draws in this process, e.g. in the gunicorn master)
+        """
+        started = time.time()
+        for name in RENDERERS:
+            for fmt in WARM_FORMATS:
+                if fmt not in FORMATS:
+                    continue
+                try:
+                    self.get(name, metadata, fmt, inline=inline)
+                except Exception as e:
+                    print(f"⚠️  Could not pre-render {name} plot ({fmt}): {e}")
+                    break
+        print(f"🖼️  Plots ready in {time.time() - started:.2f}s")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._b64.clear()
+            self._gzip.clear()
+
+
+def create_plot_cache(render_pool=None):
+    """
+    Build the cache in the plots directory under GOLDSENSE_CACHE_DIR
+    (GOLDSENSE_PLOT_PRECOMPRESS=off disables gzipped SVG variants)
+    """
+    cache_dir = os.environ.get('GOLDSENSE_CACHE_DIR',
+                               os.path.join(tempfile.gettempdir(), 'goldsense_cache'))
+    precompress = os.environ.get('GOLDSENSE_PLOT_PRECOMPRESS', 'on').lower() not in ('0', 'off', 'false')
+    try:
+        return PlotCache(os.path.join(cache_dir, 'plots'), render_pool, precompress)
+    except OSError as e:
+        print(f"⚠️  Plot disk cache unavailable ({e}), caching in memory only")
+        return PlotCache(render_pool=render_pool, precompress=precompress)
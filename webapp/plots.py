@@ -0,0 +1,182 @@
+"""
+Model performance plots
+Each renderer draws one chart from metadata['metrics'] and returns the
+encoded image bytes (None when there is nothing to draw). The web routes
+serve them through PlotCache, so a chart is only drawn once per metrics.
+Figures are built with the object-oriented Figure/Agg API rather than
+pyplot, so there is no global figure state shared between renders.
+matplotlib is imported by the first render (normally in a render pool
+worker), so importing this module for FORMATS/RENDERERS stays cheap.
+"""
+from io import BytesIO
+import pandas as pd
+
+
+# Output format -> (mimetype, extra savefig options)
+FORMATS = {
+    'png': ('image/png', {}),
+    # Lossless WebP is ~3x smaller than PNG for these flat-colour charts
+    'webp': ('image/webp', {'pil_kwargs': {'lossless': True}}),
+    'svg': ('image/svg+xml', {}),
+}
+
+
+def _webp_supported():
+    try:
+        from PIL import features
+        return features.check('webp')
+    except ImportError:
+        return False
+
+
+if not _webp_supported():
+    FORMATS.pop('webp')
+
+
+def _figure(figsize):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _encode(fig, fmt, dpi):
+    img = BytesIO()
+    fig.savefig(img, format=fmt, dpi=dpi, bbox_inches='tight', **FORMATS[fmt][1])
+    return img.getvalue()
+
+
+def render_comparison(metrics, fmt='png', dpi=100):
+    """R² and MAE bar charts for every trained model"""
+    # Prepare data for plotting
+    models = []
+    r2_scores = []
+    mae_scores = []
+
+    for model_name, model_metrics in metrics.items():
+        if isinstance(model_metrics, dict) and 'r2' in model_metrics:
+            models.append(model_name.upper())
+            r2_scores.append(model_metrics['r2'])
+            mae_scores.append(model_metrics['mae'])
+
+    # Create figure with subplots
+    fig = _figure((14, 6))
+    ax1, ax2 = fig.subplots(1, 2)
+
+    # R² Score comparison
+    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#6C5CE7']
+    bars1 = ax1.barh(models, r2_scores, color=colors[:len(models)])
+    ax1.set_xlabel('R² Score', fontsize=12, fontweight='bold')
+    ax1.set_title('Model Performance: R² Score', fontsize=14, fontweight='bold')
+    ax1.set_xlim(0, 1)
+    ax1.grid(True, alpha=0.3, axis='x')
+
+    # Add value labels
+    for i, (bar, score) in enumerate(zip(bars1, r2_scores)):
+        ax1.text(score + 0.01, i, f'{score:.4f}', va='center', fontsize=10)
+
+    # MAE comparison
+    bars2 = ax2.barh(models, mae_scores, color=colors[:len(models)])
+    ax2.set_xlabel('MAE ($)', fontsize=12, fontweight='bold')
+    ax2.set_title('Model Performance: Mean Absolute Error', fontsize=14, fontweight='bold')
+    ax2.grid(True, alpha=0.3, axis='x')
+
+    # Add value labels
+    for i, (bar, score) in enumerate(zip(bars2, mae_scores)):
+        ax2.text(score + 0.5, i, f'${score:.2f}', va='center', fontsize=10)
+
+    fig.tight_layout()
+    return _encode(fig, fmt, dpi)
+
+
+def render_metrics_table(metrics, fmt='png', dpi=100):
+    """Table of R², MAE, RMSE and MAPE per model"""
+    # Prepare data
+    data = []
+    for model_name, model_metrics in metrics.items():
+        if isinstance(model_metrics, dict):
+            data.append({
+                'Model': model_name.upper(),
+                'R² Score': f"{model_metrics.get('r2', 0):.4f}",
+                'MAE ($)': f"${model_metrics.get('mae', 0):.2f}",
+                'RMSE ($)': f"${model_metrics.get('rmse', 0):.2f}",
+                'MAPE (%)': f"{model_metrics.get('mape', 0):.2f}%"
+            })
+
+    df = pd.DataFrame(data)
+
+    # Create figure
+    fig = _figure((12, len(data) * 0.8))
+    ax = fig.subplots()
+    ax.axis('tight')
+    ax.axis('off')
+
+    # Create table
+    table = ax.table(cellText=df.values, colLabels=df.columns,
+                     cellLoc='center', loc='center',
+                     colColours=['#4ECDC4'] * len(df.columns))
+
+    table.auto_set_font_size(False)
+    table.set_fontsize(11)
+    table.scale(1, 2.5)
+
+    # Style header
+    for i in range(len(df.columns)):
+        table[(0, i)].set_facecolor('#2C3E50')
+        table[(0, i)].set_text_props(weight='bold', color='white')
+
+    # Alternate row colors
+    for i in range(1, len(df) + 1):
+        for j in range(len(df.columns)):
+            if i % 2 == 0:
+                table[(i, j)].set_facecolor('#ECF0F1')
+            else:
+                table[(i, j)].set_facecolor('#FFFFFF')
+
+    ax.set_title('Model Performance Comparison', fontsize=16, fontweight='bold', pad=20)
+    return _encode(fig, fmt, dpi)
+
+
+def render_metrics_comparison(metrics, fmt='png', dpi=100):
+    """Single bar chart of the scalar metric values (None when there are none)"""
+    # Per-model metrics are dicts - only top-level numbers can be drawn here
+    scalars = {name: value for name, value in metrics.items() if isinstance(value, (int, float))}
+    if not scalars:
+        return None
+
+    fig = _figure((10, 6))
+    ax = fig.subplots()
+    metrics_names = list(scalars.keys())
+    metrics_values = list(scalars.values())
+
+    colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12']
+    bars = ax.bar(metrics_names, metrics_values, color=colors[:len(metrics_names)])
+
+    ax.set_title('Model Performance Metrics', fontsize=16, fontweight='bold', pad=20)
+    ax.set_ylabel('Score', fontsize=12)
+    ax.set_ylim(0, 1.0)
+    ax.grid(axis='y', alpha=0.3)
+
+    # Add value labels on bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2., height,
+                f'{height:.4f}',
+                ha='center', va='bottom', fontsize=10)
+
+    fig.tight_layout()
+    return _encode(fig, fmt, dpi)
+
+
+# Plot name -> renderer(metrics, fmt, dpi)
+RENDERERS = {
+    'comparison': render_comparison,
+    'metrics_table': render_metrics_table,
+    'metrics_comparison': render_metrics_comparison,
+}
+
+
+def render(name, metrics, fmt='png', dpi=100):
+    """Render plot name (entry point for the render pool's worker processes)"""
+    return RENDERERS[name](metrics, fmt=fmt, dpi=dpi)
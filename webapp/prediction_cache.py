@@ -0,0 +1,53 @@
+"""
+Prediction result cache
+Day/week/month predictions only depend on the loaded model and the market
+features, so results are cached per (model version, feature digest, horizon)
+in a bounded LRU.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Thread-safe LRU of prediction results"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached result for key, or compute() and store it"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        result = compute()
+        if result is None:
+            # Don't cache failures
+            return None
+
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def create_prediction_cache():
+    """Build the cache sized by GOLDSENSE_PREDICTION_CACHE_SIZE"""
+    return PredictionCache(int(os.environ.get('GOLDSENSE_PREDICTION_CACHE_SIZE', '256')))
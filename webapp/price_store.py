@@ -0,0 +1,216 @@
+"""
+Local historical price store
+Daily OHLCV bars per ticker kept as flat binary column files that are
+memory-mapped for reads. New bars are appended in place (re-writing only
+the overlapping tail), and range reads by date are a binary search on the
+date column, so rolling-window features never need a full re-download.
+"""
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows - appends are only serialized within a process
+    fcntl = None
+
+# Column name in the DataFrame -> (file name, dtype)
+COLUMNS = {
+    'Date': ('date.i64', np.int64),      # Days since 1970-01-01
+    'Open': ('open.f64', np.float64),
+    'High': ('high.f64', np.float64),
+    'Low': ('low.f64', np.float64),
+    'Close': ('close.f64', np.float64),
+    'Volume': ('volume.f64', np.float64),
+}
+PRICE_COLUMNS = [c for c in COLUMNS if c != 'Date']
+
+# CSV files shipped with the repo used to seed an empty store
+SEED_FILES = {
+    'GC=F': 'XAUUSD_daily.csv',  # Spot gold stands in for futures history
+    'SI=F': 'XAGUSD_daily.csv',  # Spot silver stands in for futures history
+}
+
+# Recent bars re-downloaded on every sync (today's bar is still changing)
+REFRESH_OVERLAP_DAYS = 5
+
+
+def _to_days(index):
+    return pd.DatetimeIndex(index).tz_localize(None).normalize().values.astype('datetime64[D]').astype(np.int64)
+
+
+class PriceStore:
+    """Columnar, append-only (with tail rewrite) daily bar store"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps = {}  # ticker -> (rows, {column: memmap})
+
+    def _ticker_dir(self, ticker):
+        return os.path.join(self.data_dir, re.sub(r'[^A-Za-z0-9]+', '_', ticker))
+
+    def _rows(self, ticker):
+        return _committed_rows(self._ticker_dir(ticker))
+
+    def _columns(self, ticker):
+        """Memory-mapped columns for the committed rows"""
+        rows = self._rows(ticker)
+        cached = self._maps.get(ticker)
+        if cached is not None and cached[0] == rows:
+            return rows, cached[1]
+        if rows == 0:
+            return 0, None
+        ticker_dir = self._ticker_dir(ticker)
+        columns = {name: np.memmap(os.path.join(ticker_dir, file), dtype=dtype, mode='r', shape=(rows,))
+                   for name, (file, dtype) in COLUMNS.items()}
+        self._maps[ticker] = (rows, columns)
+        return rows, columns
+
+    def first_date(self, ticker):
+        rows, columns = self._columns(ticker)
+        if rows == 0:
+            return None
+        return datetime(1970, 1, 1) + timedelta(days=int(columns['Date'][0]))
+
+    def last_date(self, ticker):
+        rows, columns = self._columns(ticker)
+        if rows == 0:
+            return None
+        return datetime(1970, 1, 1) + timedelta(days=int(columns['Date'][-1]))
+
+    def read(self, ticker, start_date=None, end_date=None):
+        """Bars with start_date <= date <= end_date as an OHLCV DataFrame (None if empty)"""
+        rows, columns = self._columns(ticker)
+        if rows == 0:
+            return None
+        dates = columns['Date']
+        lo = 0 if start_date is None else int(np.searchsorted(dates, _to_days([start_date])[0], 'left'))
+        hi = rows if end_date is None else int(np.searchsorted(dates, _to_days([end_date])[0], 'right'))
+        if hi <= lo:
+            return None
+        return _frame(columns, lo, hi)
+
+    def iter_chunks(self, ticker, chunk_size):
+        """All bars, oldest first, as OHLCV DataFrames of up to chunk_size rows"""
+        rows, columns = self._columns(ticker)
+        for lo in range(0, rows, chunk_size):
+            yield _frame(columns, lo, min(lo + chunk_size, rows))
+
+    def append(self, ticker, data):
+        """
+        Merge bars from an OHLCV DataFrame into the store. New bars replace
+        stored bars on the same date; stored bars on other dates (including
+        any after the new data) are kept, so re-fetching the recent tail or
+        an older range is safe.
+        """
+        if data is None or len(data) == 0:
+            return 0
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        new_dates = _to_days(data.index)
+        ticker_dir = self._ticker_dir(ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+
+        with self._lock, open(os.path.join(ticker_dir, '.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            rows, columns = self._columns(ticker)
+            keep = rows
+            if rows:
+                keep = int(np.searchsorted(columns['Date'], new_dates[0], 'left'))
+            new_values = {name: new_dates if name == 'Date' else
+                          data[name].to_numpy(dtype=np.float64, na_value=np.nan) if name in data.columns else
+                          np.full(len(data), np.nan)
+                          for name in COLUMNS}
+            # Stored bars from the first new date on that the new data doesn't replace
+            tail = {name: np.array(columns[name][keep:rows]) for name in COLUMNS} if keep < rows else None
+            self._maps.pop(ticker, None)
+            if tail is not None:
+                kept = ~np.isin(tail['Date'], new_dates)
+                order = np.argsort(np.concatenate([new_dates, tail['Date'][kept]]), kind='stable')
+                new_values = {name: np.concatenate([new_values[name], tail[name][kept]])[order]
+                              for name in COLUMNS}
+            total = keep + len(new_values['Date'])
+
+            for name, (file, dtype) in COLUMNS.items():
+                path = os.path.join(ticker_dir, file)
+                values = new_values[name]
+                # Overwrite from the replaced tail onwards. Files never shrink, so
+                # readers still mapping the previous row count stay valid
+                with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                    f.seek(keep * np.dtype(dtype).itemsize)
+                    f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+            # Committing the row count makes the new bars visible to readers
+            meta_path = os.path.join(ticker_dir, 'meta.json')
+            with open(meta_path + '.tmp', 'w') as f:
+                json.dump({'rows': total, 'updated_at': datetime.now().isoformat()}, f)
+            os.replace(meta_path + '.tmp', meta_path)
+        return len(data)
+
+    def refresh_start(self, ticker, start_date, end_date):
+        """
+        Where an incremental download of start_date..end_date for ticker
+        should start, or None when the stored bars already cover the range
+        """
+        first, last = self.first_date(ticker), self.last_date(ticker)
+        # A range starting on a weekend or holiday is covered by the next bar
+        if last is None or last < start_date or first > start_date + timedelta(days=REFRESH_OVERLAP_DAYS):
+            return start_date
+        if last >= end_date:
+            return None
+        return max(last - timedelta(days=REFRESH_OVERLAP_DAYS), start_date)
+
+    def seed_from_csv(self, project_dir):
+        """Import the bundled daily CSVs into tickers that have no data yet"""
+        for ticker, file in SEED_FILES.items():
+            path = os.path.join(project_dir, file)
+            if self._rows(ticker) or not os.path.exists(path):
+                continue
+            try:
+                data = pd.read_csv(path, parse_dates=['Date'], index_col='Date')
+            except Exception as e:
+                print(f"⚠️  Could not read {file}: {e}")
+                continue
+            if len(data):
+                self.append(ticker, data)
+                print(f"📥 Seeded {ticker} with {len(data)} bars from {file}")
+
+    def status(self):
+        """Committed bars per stored ticker directory"""
+        return {name: _committed_rows(os.path.join(self.data_dir, name))
+                for name in sorted(os.listdir(self.data_dir))
+                if os.path.isdir(os.path.join(self.data_dir, name))}
+
+
+def _frame(columns, lo, hi):
+    """Rows lo:hi of the mapped columns, copied into a DataFrame"""
+    index = pd.DatetimeIndex(np.asarray(columns['Date'][lo:hi]).astype('datetime64[D]'), name='Date')
+    return pd.DataFrame({c: np.array(columns[c][lo:hi]) for c in PRICE_COLUMNS}, index=index)
+
+
+def _committed_rows(ticker_dir):
+    try:
+        with open(os.path.join(ticker_dir, 'meta.json')) as f:
+            return json.load(f)['rows']
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def create_price_store(project_dir):
+    """Build the store from GOLDSENSE_PRICE_STORE (on/off) and GOLDSENSE_DATA_DIR"""
+    if os.environ.get('GOLDSENSE_PRICE_STORE', 'on').lower() in ('0', 'off', 'false'):
+        return None
+    data_dir = os.environ.get('GOLDSENSE_DATA_DIR', os.path.join(project_dir, 'data', 'prices'))
+    try:
+        store = PriceStore(data_dir)
+        store.seed_from_csv(project_dir)
+        return store
+    except OSError as e:
+        print(f"⚠️  Price store unavailable ({e}), downloading full history instead")
+        return None
@@ -0,0 +1,229 @@
+"""
+Sampling request profiler
+A single sampler thread reads the stacks of the threads working on a
+profiled request (the request thread plus any inference thread running a
+call for it) every few milliseconds. Stacks are counted in the collapsed
+format ("outer;inner;leaf count" per line) that flamegraph.pl, speedscope
+and inferno read directly.
+
+Admins profile a single request with ?profile=1 or an X-Profile header.
+GOLDSENSE_PROFILE_EVERY=N also profiles one in N ordinary requests; those
+profiles go to a rotating directory and can be merged into one aggregate.
+"""
+import itertools
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# Frames from these files are noise in a request profile
+_SKIP_FILES = (os.path.abspath(__file__),)
+
+
+def _frame_label(code):
+    # ';' separates frames and ' ' ends the stack in the collapsed format
+    filename = os.path.basename(code.co_filename).replace(' ', '_')
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+
+def _stack(frame):
+    labels = []
+    while frame is not None:
+        if frame.f_code.co_filename not in _SKIP_FILES:
+            labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Profile:
+    """Collapsed stack counts for one request"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.duration = 0.0
+        self.samples = Counter()
+        self._threads = {}  # thread ident -> role label
+        self._lock = threading.Lock()
+
+    def track(self, ident, role):
+        with self._lock:
+            self._threads[ident] = role
+
+    def untrack(self, ident):
+        with self._lock:
+            self._threads.pop(ident, None)
+
+    def wrap(self, fn):
+        """fn, sampled too while it runs on another thread (e.g. an inference thread)"""
+        def tracked(*args, **kwargs):
+            ident = threading.get_ident()
+            self.track(ident, threading.current_thread().name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.untrack(ident)
+        return tracked
+
+    def sample(self, frames):
+        with self._lock:
+            threads = list(self._threads.items())
+        for ident, role in threads:
+            frame = frames.get(ident)
+            if frame is not None:
+                self.samples[f'{role};{_stack(frame)}'] += 1
+
+    def collapsed(self):
+        """Profile in the collapsed stack format"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+class Sampler:
+    """One background thread sampling every active profile in this process"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._active = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, profile):
+        with self._lock:
+            self._active.add(profile)
+            # Threads don't survive a fork, so check it is still running here
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, profile):
+        with self._lock:
+            self._active.discard(profile)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                self._wake.wait(timeout=1.0)
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            for profile in active:
+                profile.sample(frames)
+            del frames
+            time.sleep(self.interval)
+
+
+class Profiler:
+    """Per-request profiles, stored in a rotating directory"""
+
+    def __init__(self, profile_dir, every=0, keep=200, interval=0.005):
+        self.profile_dir = profile_dir
+        self.every = every
+        self.keep = keep
+        self.sampler = Sampler(interval)
+        self._local = threading.local()
+        self._counter = itertools.count(random.randrange(max(every, 1)))
+        self.stats = {'profiled': 0, 'saved': 0}
+
+    def should_sample(self):
+        """True for one in `every` requests (aggregate mode)"""
+        return self.every > 0 and next(self._counter) % self.every == 0
+
+    def current(self):
+        """The profile running on this thread's request, if any"""
+        return getattr(self._local, 'profile', None)
+
+    def start(self, name):
+        profile = Profile(name)
+        profile.track(threading.get_ident(), 'request')
+        self._local.profile = profile
+        self.sampler.add(profile)
+        return profile
+
+    def stop(self):
+        """Stop this thread's profile and return it (None when none is running)"""
+        profile = self.current()
+        if profile is None:
+            return None
+        self._local.profile = None
+        self.sampler.remove(profile)
+        profile.duration = time.time() - profile.started
+        self.stats['profiled'] += 1
+        return profile
+
+    def wrap(self, fn):
+        """fn tracked by this thread's profile when it runs elsewhere"""
+        profile = self.current()
+        return fn if profile is None else profile.wrap(fn)
+
+    def save(self, profile):
+        """Write the profile to the profile directory and return its id (None on failure)"""
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(profile.started))
+        route = profile.name.strip('/').replace('/', '_') or 'root'
+        profile_id = f'{stamp}-{int(profile.started * 1000) % 1000:03d}-{os.getpid()}-{route}'
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.profile_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(profile.collapsed())
+            os.replace(tmp_path, self.path(profile_id))
+        except OSError as e:
+            print(f"⚠️  Could not save profile: {e}")
+            return None
+        self.stats['saved'] += 1
+        self._rotate()
+        return profile_id
+
+    def path(self, profile_id):
+        return os.path.join(self.profile_dir, os.path.basename(profile_id) + '.collapsed')
+
+    def list(self):
+        """Stored profile ids, oldest first"""
+        try:
+            names = os.listdir(self.profile_dir)
+        except OSError:
+            return []
+        return sorted(name[:-len('.collapsed')] for name in names if name.endswith('.collapsed'))
+
+    def _rotate(self):
+        for profile_id in self.list()[:-self.keep]:
+            try:
+                os.remove(self.path(profile_id))
+            except OSError:
+                pass
+
+    def aggregate(self, route=None):
+        """All stored profiles (optionally for one route) merged into one collapsed profile"""
+        merged = Counter()
+        for profile_id in self.list():
+            if route and not profile_id.endswith('-' + route):
+                continue
+            try:
+                with open(self.path(profile_id)) as f:
+                    for line in f:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        if stack and count.isdigit():
+                            merged[stack] += int(count)
+            except OSError:
+                continue
+        return ''.join(f'{stack} {count}\n' for stack, count in merged.most_common())
+
+    def status(self):
+        return {'every': self.every, 'keep': self.keep, 'interval': self.sampler.interval,
+                'stored': len(self.list()), **self.stats}
+
+
+def create_profiler():
+    """Build the profiler from GOLDSENSE_PROFILE_EVERY, _DIR, _KEEP and _INTERVAL_MS"""
+    cache_dir = os.environ.get('GOLDSENSE_CACHE_DIR',
+                               os.path.join(tempfile.gettempdir(), 'goldsense_cache'))
+    return Profiler(os.environ.get('GOLDSENSE_PROFILE_DIR', os.path.join(cache_dir, 'profiles')),
+                    every=int(os.environ.get('GOLDSENSE_PROFILE_EVERY', '0')),
+                    keep=int(os.environ.get('GOLDSENSE_PROFILE_KEEP', '200')),
+                    interval=float(os.environ.get('GOLDSENSE_PROFILE_INTERVAL_MS', '5')) / 1000)
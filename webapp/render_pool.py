@@ -0,0 +1,108 @@
+"""
+Plot rendering pool
+Chart renders run in separate worker processes, so rasterizing a figure
+never holds the GIL of the process serving /api/predict. The number of
+queued renders is bounded: when the pool is full a render is refused
+straight away (the route answers 503) instead of piling up requests.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from webapp.plots import render
+
+
+class RenderUnavailable(RuntimeError):
+    """The render pool is full or the render took too long"""
+
+
+# Loaded once in the fork server, so every render worker starts with matplotlib imported
+WORKER_PRELOAD = ['webapp.plots', 'matplotlib.figure', 'matplotlib.backends.backend_agg']
+
+
+def _pool_context():
+    # Workers are forked from a clean server process, not from this
+    # (multi-threaded) app process
+    methods = multiprocessing.get_all_start_methods()
+    if 'forkserver' not in methods:
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(WORKER_PRELOAD)
+    return context
+
+
+class RenderPool:
+    """Bounded process pool for plot renders (workers=0 renders in the calling thread)"""
+
+    def __init__(self, workers=1, max_pending=4, timeout=20.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.stats = {'renders': 0, 'rejected': 0, 'timeouts': 0}
+
+    def _get_executor(self):
+        """The process pool for this process (a new one after a fork)"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=_pool_context())
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def render(self, name, metrics, fmt='png', dpi=100, inline=False):
+        """
+        Encoded image for plot name. inline=True renders in this thread
+        (used for warm-up before any request is served).
+        """
+        if inline or self.workers <= 0:
+            self.stats['renders'] += 1
+            return render(name, metrics, fmt, dpi)
+
+        if not self._slots.acquire(blocking=False):
+            self.stats['rejected'] += 1
+            raise RenderUnavailable(f'Render queue full ({self.max_pending} pending)')
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(render, name, metrics, fmt, dpi)
+        except Exception:
+            self._slots.release()
+            self._reset(executor)
+            raise
+        # The slot is held until the render finishes, even if we stop waiting for it
+        future.add_done_callback(lambda f: self._slots.release())
+
+        try:
+            data = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self.stats['timeouts'] += 1
+            raise RenderUnavailable(f'Render of {name} timed out after {self.timeout:g}s')
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory) - start a fresh pool next time
+            self._reset(executor)
+            raise RenderUnavailable(f'Render worker for {name} crashed')
+        self.stats['renders'] += 1
+        return data
+
+    def status(self):
+        return {'workers': self.workers, 'max_pending': self.max_pending,
+                'timeout': self.timeout, **self.stats}
+
+
+def create_render_pool():
+    """Build the pool from GOLDSENSE_RENDER_WORKERS, GOLDSENSE_RENDER_QUEUE and GOLDSENSE_RENDER_TIMEOUT"""
+    return RenderPool(workers=int(os.environ.get('GOLDSENSE_RENDER_WORKERS', '1')),
+                      max_pending=int(os.environ.get('GOLDSENSE_RENDER_QUEUE', '4')),
+                      timeout=float(os.environ.get('GOLDSENSE_RENDER_TIMEOUT', '20')))
@@ -0,0 +1,130 @@
+"""
+Request and stage latency telemetry
+Times each stage of the prediction pipeline (upstream fetch per ticker,
+feature build, scaling, model call, inverse transform, plot render,
+serialization) into fixed-bucket histograms and renders them, along with
+cache and pool counters, in the Prometheus text format for /metrics.
+Metrics are kept per process, so each gunicorn worker reports its own.
+"""
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Histogram upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PREFIX = 'goldsense_'
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set (Prometheus semantics)"""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series = {}  # labels tuple -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            # First bucket with value <= bound (len(buckets) is the +Inf bucket)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: list(series) for labels, series in self._series.items()}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(labels)} {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{_labels(labels)} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+class Telemetry:
+    """Stage/request histograms plus collectors for counters owned by other modules"""
+
+    def __init__(self, sample_rate=1.0, enabled=True):
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+        self.stages = Histogram(PREFIX + 'stage_seconds', 'Time spent in each pipeline stage')
+        self.requests = Histogram(PREFIX + 'request_seconds', 'HTTP request latency by route')
+        self._collectors = []
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """Time the enclosed block as stage `name` (a sampled fraction of calls)"""
+        if not self.enabled or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.observe(time.perf_counter() - started,
+                                (('stage', name),) + tuple(sorted(labels.items())))
+
+    def observe_request(self, route, method, status, seconds):
+        if self.enabled:
+            self.requests.observe(seconds, (('method', method), ('route', route), ('status', str(status))))
+
+    def add_collector(self, collect):
+        """collect() returns [(name, type, help, [(labels dict, value), ...]), ...]"""
+        self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = self.stages.render() + self.requests.render()
+        for collect in self._collectors:
+            try:
+                metrics = collect()
+            except Exception as e:
+                print(f"⚠️  Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, samples in metrics:
+                lines.append(f'# HELP {PREFIX}{name} {help_text}')
+                lines.append(f'# TYPE {PREFIX}{name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{PREFIX}{name}{_labels(tuple(sorted(labels.items())))} {float(value):g}')
+        return '\n'.join(lines) + '\n'
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() not in ('0', 'off', 'false', 'no')
+
+
+# Shared by every module in this process
+telemetry = Telemetry(sample_rate=float(os.environ.get('GOLDSENSE_METRICS_SAMPLE_RATE', '1.0')),
+                      enabled=_env_flag('GOLDSENSE_METRICS', 'on'))
+
+# Per-request stdout lines (request/response/prediction); warnings and errors always print
+REQUEST_LOG = _env_flag('GOLDSENSE_REQUEST_LOG', 'on')
+
+
+def log(message):
+    """Print a per-request log line unless GOLDSENSE_REQUEST_LOG=off"""
+    if REQUEST_LOG:
+        print(message)
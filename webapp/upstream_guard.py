@@ -0,0 +1,132 @@
+"""
+Upstream guards
+SingleFlight lets concurrent callers that need the same thing share one
+in-flight call instead of each starting their own download. CircuitBreaker
+stops calling a source after repeated failures (or calls slower than its
+timeout) and fails fast until a cool-down has passed; then a single trial
+call decides whether the source is healthy again.
+"""
+import threading
+import time
+
+
+class CircuitOpen(RuntimeError):
+    """The source failed repeatedly and is not being called for now"""
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Concurrent do() calls with the same key share one execution"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0  # Calls answered by another caller's execution
+
+    def do(self, key, fn):
+        """fn() once per key at a time; callers arriving meanwhile get its result (or error)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+# Breaker states, also the gauge values exported to /metrics
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+STATE_NAMES = {CLOSED: 'closed', HALF_OPEN: 'half_open', OPEN: 'open'}
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one upstream source"""
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0, slow_call=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call = slow_call  # Successful calls slower than this count as failures
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'failed': 0, 'rejected': 0, 'opened': 0}
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._trial_running:
+                    self.stats['rejected'] += 1
+                    raise CircuitOpen(f'{self.name}: circuit half-open, trial call running')
+                self._trial_running = True
+            elif self.state == OPEN:
+                self.stats['rejected'] += 1
+                retry_in = self.reset_timeout - (time.time() - self.opened_at)
+                raise CircuitOpen(f'{self.name}: circuit open, retrying in {retry_in:.0f}s')
+            self.stats['calls'] += 1
+
+    def _after_call(self, ok):
+        with self._lock:
+            self._trial_running = False
+            if ok:
+                if self.state != CLOSED:
+                    print(f"✅ {self.name}: upstream recovered, circuit closed")
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            self.stats['failed'] += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats['opened'] += 1
+                    print(f"🔌 {self.name}: {self.failures} failures, circuit open for {self.reset_timeout:g}s")
+                self.state = OPEN
+                self.opened_at = time.time()
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs) through the breaker; raises CircuitOpen without calling it when open"""
+        self._before_call()
+        started = time.time()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            self._after_call(False)
+            raise
+        self._after_call(self.slow_call is None or time.time() - started <= self.slow_call)
+        return result
+
+    def status(self):
+        return {'state': STATE_NAMES[self.state], 'failures': self.failures, **self.stats}